@@ -121,16 +121,18 @@ export interface NewsResponse {
   page?: number;
   limit?: number;
   pages?: number;
+  next_cursor?: string | null;
 }
 
 export const fetchNews = async (
   category?: string, 
   page: number = 1, 
   limit: number = 20,
-  useCache: boolean = true
+  useCache: boolean = true,
+  cursor?: string
 ): Promise<NewsResponse> => {
   try {
-    const cacheKey = `news_${category || 'all'}_${page}_${limit}`;
+    const cacheKey = `news_${category || 'all'}_${cursor || page}_${limit}`;
     
     if (useCache) {
       const cachedData = getFromCache(cacheKey);
@@ -142,7 +144,12 @@ export const fetchNews = async (
     const params = new URLSearchParams();
     if (category && category !== 'all') params.append('category', category);
     params.append('limit', limit.toString());
-    params.append('offset', ((page - 1) * limit).toString());
+    if (cursor) {
+      params.append('cursor', cursor);
+      params.append('include_total', 'false');
+    } else {
+      params.append('offset', ((page - 1) * limit).toString());
+    }
 
     const url = `${currentAPI}?${params.toString()}`;
 
@@ -8,6 +8,7 @@ export const useNews = (category: string = 'all') => {
   const [error, setError] = useState<string | null>(null);
   const [page, setPage] = useState(1);
   const [hasMore, setHasMore] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loadingMore, setLoadingMore] = useState(false);
   const [initialized, setInitialized] = useState(false);
 
@@ -32,6 +33,7 @@ export const useNews = (category: string = 'all') => {
           setNews(response.data);
         }
         setHasMore(response.data.length === 20);
+        setNextCursor(response.next_cursor || null);
       }
     } catch (error) {
       console.error('Ошибка загрузки новостей:', error);
@@ -53,11 +55,13 @@ export const useNews = (category: string = 'all') => {
           category === 'all' ? undefined : category,
           nextPage,
           20,
-          false
+          false,
+          nextCursor || undefined
         );
         
         setNews(prev => [...prev, ...response.data]);
-        setHasMore(response.data.length === 20 && (response.total || 0) > nextPage * 20);
+        setNextCursor(response.next_cursor || null);
+        setHasMore(Boolean(response.next_cursor));
         
 
       } catch (err) {
@@ -74,6 +78,7 @@ export const useNews = (category: string = 'all') => {
       setLoading(true);
       setPage(1);
       setHasMore(true);
+      setNextCursor(null);
       await getNews();
       setInitialized(true);
     }
@@ -83,6 +88,7 @@ export const useNews = (category: string = 'all') => {
     if (category !== 'all') {
       setPage(1);
       setHasMore(true);
+      setNextCursor(null);
       setNews([]);
       setInitialized(false);
       getNews();
@@ -0,0 +1,23 @@
+"""add_news_pagination_indexes
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Составные индексы для keyset-пагинации по (publish_date, id)
+    op.create_index('ix_news_items_publish_date_id', 'news_items', ['publish_date', 'id'])
+    op.create_index('ix_news_items_category_publish_date_id', 'news_items', ['category', 'publish_date', 'id'])
+
+def downgrade():
+    op.drop_index('ix_news_items_category_publish_date_id', table_name='news_items')
+    op.drop_index('ix_news_items_publish_date_id', table_name='news_items')
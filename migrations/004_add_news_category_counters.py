@@ -0,0 +1,32 @@
+"""add_news_category_counters
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Таблица счетчиков новостей по категориям, поддерживается при ingest
+    op.create_table(
+        'news_category_counters',
+        sa.Column('category', sa.String(100), primary_key=True),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+    # Начальное заполнение одним GROUP BY
+    op.execute("""
+        INSERT INTO news_category_counters (category, count)
+        SELECT category, COUNT(*) FROM news_items GROUP BY category
+    """)
+
+def downgrade():
+    op.drop_table('news_category_counters')
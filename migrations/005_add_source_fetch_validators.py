@@ -0,0 +1,26 @@
+"""add_source_fetch_validators
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Валидаторы условных запросов (ETag / Last-Modified) и хэш содержимого источника
+    op.add_column('news_sources', sa.Column('etag', sa.String(500), nullable=True))
+    op.add_column('news_sources', sa.Column('last_modified', sa.String(100), nullable=True))
+    op.add_column('news_sources', sa.Column('content_hash', sa.String(64), nullable=True))
+
+def downgrade():
+    op.drop_column('news_sources', 'content_hash')
+    op.drop_column('news_sources', 'last_modified')
+    op.drop_column('news_sources', 'etag')
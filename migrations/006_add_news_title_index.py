@@ -0,0 +1,21 @@
+"""add_news_title_index
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Индекс для пакетной проверки уже сохраненных новостей по заголовку
+    op.create_index('ix_news_items_title', 'news_items', ['title'])
+
+def downgrade():
+    op.drop_index('ix_news_items_title', table_name='news_items')
@@ -0,0 +1,27 @@
+"""add_news_content_hash
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Естественный ключ новости (источник + id сообщения/ссылка + нормализованный текст).
+    # Уже сохраненные новости заполняет scripts/backfill_content_hash.py (NULL индекс не нарушает)
+    op.add_column('news_items', sa.Column('content_hash', sa.String(64), nullable=True))
+    op.drop_index('ix_news_items_title', table_name='news_items')
+    op.create_index('ix_news_items_content_hash', 'news_items', ['content_hash'], unique=True)
+
+def downgrade():
+    op.drop_index('ix_news_items_content_hash', table_name='news_items')
+    op.create_index('ix_news_items_title', 'news_items', ['title'])
+    op.drop_column('news_items', 'content_hash')
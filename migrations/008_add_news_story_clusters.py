@@ -0,0 +1,27 @@
+"""add_news_story_clusters
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # SimHash заголовка и лида и ссылка на первую новость истории (почти-дубликаты)
+    op.add_column('news_items', sa.Column('simhash', sa.BigInteger(), nullable=True))
+    op.add_column('news_items', sa.Column('duplicate_of', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_news_items_duplicate_of', 'news_items', 'news_items',
+                          ['duplicate_of'], ['id'], ondelete='SET NULL')
+
+def downgrade():
+    op.drop_constraint('fk_news_items_duplicate_of', 'news_items', type_='foreignkey')
+    op.drop_column('news_items', 'duplicate_of')
+    op.drop_column('news_items', 'simhash')
@@ -0,0 +1,22 @@
+"""add_source_last_message_id
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Номер последнего обработанного сообщения Telegram канала (инкрементальный разбор)
+    op.add_column('news_sources', sa.Column('last_message_id', sa.Integer(), nullable=True))
+
+def downgrade():
+    op.drop_column('news_sources', 'last_message_id')
@@ -0,0 +1,31 @@
+"""add_telegram_backfill_checkpoints
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Прогресс загрузки истории Telegram каналов (scripts/backfill_telegram.py)
+    op.create_table(
+        'telegram_backfill_checkpoints',
+        sa.Column('channel', sa.String(255), primary_key=True),
+        sa.Column('next_before', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(20), nullable=False, server_default='running'),
+        sa.Column('pages_done', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('posts_saved', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+
+def downgrade():
+    op.drop_table('telegram_backfill_checkpoints')
@@ -0,0 +1,34 @@
+"""add_source_health
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Здоровье источника и состояние circuit breaker
+    op.add_column('news_sources', sa.Column('breaker_state', sa.String(20), nullable=True, server_default='closed'))
+    op.add_column('news_sources', sa.Column('consecutive_failures', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('news_sources', sa.Column('breaker_opened_at', sa.DateTime(), nullable=True))
+    op.add_column('news_sources', sa.Column('last_latency_ms', sa.Integer(), nullable=True))
+    op.add_column('news_sources', sa.Column('last_error', sa.Text(), nullable=True))
+    op.add_column('news_sources', sa.Column('last_success_at', sa.DateTime(), nullable=True))
+    op.add_column('news_sources', sa.Column('last_failure_at', sa.DateTime(), nullable=True))
+
+def downgrade():
+    op.drop_column('news_sources', 'last_failure_at')
+    op.drop_column('news_sources', 'last_success_at')
+    op.drop_column('news_sources', 'last_error')
+    op.drop_column('news_sources', 'last_latency_ms')
+    op.drop_column('news_sources', 'breaker_opened_at')
+    op.drop_column('news_sources', 'consecutive_failures')
+    op.drop_column('news_sources', 'breaker_state')
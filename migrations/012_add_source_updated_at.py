@@ -0,0 +1,23 @@
+"""add_source_updated_at
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # news_sources - единственный реестр источников; по max(updated_at) он перезагружается без перезапуска.
+    # Источники по умолчанию регистрирует register_default_sources (apply_data_migrations)
+    op.add_column('news_sources', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+def downgrade():
+    op.drop_column('news_sources', 'updated_at')
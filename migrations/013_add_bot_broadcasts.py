@@ -0,0 +1,42 @@
+"""add_bot_broadcasts
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Подписки чатов на дайджесты категорий
+    op.create_table(
+        'bot_subscriptions',
+        sa.Column('chat_id', sa.BigInteger(), primary_key=True),
+        sa.Column('category', sa.String(100), primary_key=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    # Рассылки дайджестов с позицией для продолжения после перезапуска
+    op.create_table(
+        'broadcasts',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('category', sa.String(100), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, server_default='pending'),
+        sa.Column('last_chat_id', sa.BigInteger(), nullable=True),
+        sa.Column('sent', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('failed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+
+def downgrade():
+    op.drop_table('broadcasts')
+    op.drop_table('bot_subscriptions')
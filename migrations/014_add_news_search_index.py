@@ -0,0 +1,46 @@
+"""add_news_search_index
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        # Вектор для полнотекстового поиска (русская + английская конфигурации),
+        # пересчитывается базой при каждой вставке
+        op.execute(
+            "ALTER TABLE news_items ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(content, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(content, '')), 'B')) STORED"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_news_items_search_vector ON news_items USING GIN (search_vector)")
+    elif bind.dialect.name == 'sqlite':
+        # Локально - FTS5 таблица с rowid = news_items.id, пополняется при ingest
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS news_items_fts USING fts5("
+            "title, content, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        op.execute(
+            "INSERT INTO news_items_fts (rowid, title, content) "
+            "SELECT id, coalesce(title, ''), coalesce(content, '') FROM news_items"
+        )
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_news_items_search_vector")
+        op.execute("ALTER TABLE news_items DROP COLUMN IF EXISTS search_vector")
+    elif bind.dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS news_items_fts")
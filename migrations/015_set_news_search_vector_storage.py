@@ -0,0 +1,27 @@
+"""set_news_search_vector_storage
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-18 23:30:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        # Вектор хранится в строке, а не в TOAST: поиск проверяет его у каждой свежей новости.
+        # Уже сохраненные векторы переезжают при перезаписи строк
+        op.execute("ALTER TABLE news_items ALTER COLUMN search_vector SET STORAGE MAIN")
+        op.execute("UPDATE news_items SET title = title")
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("ALTER TABLE news_items ALTER COLUMN search_vector SET STORAGE EXTENDED")
@@ -8,6 +8,7 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from server.db import SessionLocal, NewsItem, NewsSource
+from server.utils.dedup import news_content_hash
 from datetime import datetime
 import json
 
@@ -99,10 +100,8 @@ def add_test_news_with_media():
         # Добавляем тестовые новости
         for i, news_data in enumerate(test_news):
             # Проверяем, существует ли уже такая новость
-            existing = db.query(NewsItem).filter(
-                NewsItem.title == news_data["title"],
-                NewsItem.source_id == test_source.id
-            ).first()
+            item_hash = news_content_hash(test_source.name, news_data["link"], news_data["content"])
+            existing = db.query(NewsItem).filter(NewsItem.content_hash == item_hash).first()
             
             if not existing:
                 news_item = NewsItem(
@@ -116,7 +115,8 @@ def add_test_news_with_media():
                     media=news_data["media"],
                     reading_time=2,
                     views_count=0,
-                    author="Test Author"
+                    author="Test Author",
+                    content_hash=item_hash
                 )
                 db.add(news_item)
                 print(f"Добавлена тестовая новость: {news_data['title']}")
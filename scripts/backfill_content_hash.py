@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Скрипт для заполнения content_hash у новостей, сохраненных до его появления
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.db import SessionLocal
+from server.services.news_service import backfill_content_hashes
+
+def backfill():
+    """Заполняет content_hash; дубликаты остаются с NULL"""
+    print("🔧 Заполнение content_hash...")
+
+    db = SessionLocal()
+    try:
+        updated = backfill_content_hashes(db)
+        print(f"✅ Обновлено новостей: {updated}")
+
+    except Exception as e:
+        print(f"❌ Ошибка: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    backfill()
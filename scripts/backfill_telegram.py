@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Загрузка истории Telegram канала (страницы t.me/s/<channel>?before=N).
+Прогресс сохраняется в telegram_backfill_checkpoints: повторный запуск продолжает с места остановки.
+
+Использование:
+    python scripts/backfill_telegram.py nextgen_NFT [--max-pages 50] [--restart]
+"""
+
+import sys
+import os
+import asyncio
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.db import SessionLocal, TelegramBackfillCheckpoint, create_tables
+from server.parsers.telegram_news_service import TelegramNewsService
+from server.services.telegram_backfill import backfill_channel
+
+async def backfill(channel: str, max_pages: int = None, restart: bool = False):
+    """Загружает историю канала до начала или до max_pages страниц"""
+    print(f"📥 Загрузка истории @{channel}...")
+
+    if restart:
+        db = SessionLocal()
+        try:
+            db.query(TelegramBackfillCheckpoint).filter(TelegramBackfillCheckpoint.channel == channel).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    service = TelegramNewsService()
+    await service.start()
+    try:
+        checkpoint = await backfill_channel(service, channel, max_pages=max_pages)
+        print(f"📊 Статус: {checkpoint['status']}, страниц: {checkpoint['pages_done']}, "
+              f"новых постов: {checkpoint['posts_saved']}, следующая страница: before={checkpoint['next_before']}")
+        if checkpoint['error']:
+            print(f"❌ Ошибка: {checkpoint['error']}")
+    finally:
+        await service.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Загрузка истории Telegram канала")
+    parser.add_argument("channel", help="username канала (без @)")
+    parser.add_argument("--max-pages", type=int, default=None, help="сколько страниц загрузить за этот запуск")
+    parser.add_argument("--restart", action="store_true", help="начать заново, сбросив сохраненный прогресс")
+    args = parser.parse_args()
+
+    create_tables()
+    asyncio.run(backfill(args.channel.lstrip('@'), args.max_pages, args.restart))
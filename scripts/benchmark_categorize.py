@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк категоризатора: прежний поиск подстрок по каждому ключевому слову
+против скомпилированного KeywordCategorizer на длинных постах Telegram
+"""
+
+import sys
+import os
+import timeit
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.utils.categorize import CATEGORY_KEYWORDS, CATEGORY_PRIORITY, KeywordCategorizer, categorizer
+
+PARAGRAPHS = [
+    "🔼Торговый объем растёт!❤️Portals - 380 456❤️🥈Tonnel - 358 995❤️💸MRKT - 138 946❤️🏴‍☠️Fragment - 2 293",
+    "🎁Торговый объем увеличивается благодаря активным торгам новыми подарками от Снуп Дога!",
+    "📈 Анализ рынка: Bitcoin показывает рост на 5%, курс ETH и альткоинов следует за ним.",
+    "🖼️ Новая коллекция NFT от известного художника уже в продаже, минт открыт для всех держателей.",
+    "💻 Стартапы в сфере ИИ привлекли рекордные инвестиции, разработка приложений ускоряется.",
+    "👥 Обсуждение актуальных тем в нашем сообществе: анонс встречи и новые правила чата.",
+]
+
+
+def naive_categorize(text: str, keyword_table=CATEGORY_KEYWORDS) -> str:
+    """Прежняя реализация categorize_content"""
+    content = text.lower()
+    category_scores = {}
+    for category, keywords in keyword_table.items():
+        score = sum(1 for keyword in keywords if keyword in content)
+        if score > 0:
+            category_scores[category] = score
+    if not category_scores:
+        return 'general'
+    max_score = max(category_scores.values())
+    best_categories = [cat for cat, score in category_scores.items() if score == max_score]
+    for priority_cat in CATEGORY_PRIORITY:
+        if priority_cat in best_categories:
+            return priority_cat
+    return list(category_scores.keys())[0]
+
+
+def make_posts(paragraphs_per_post: int, count: int = 50):
+    return [
+        "\n".join(PARAGRAPHS[(i + j) % len(PARAGRAPHS)] for j in range(paragraphs_per_post))
+        for i in range(count)
+    ]
+
+
+def run_benchmark():
+    print("📊 Категоризация: подстроки vs скомпилированный категоризатор")
+    for paragraphs_per_post in (2, 10, 50, 200):
+        posts = make_posts(paragraphs_per_post)
+        average_length = sum(map(len, posts)) // len(posts)
+
+        naive_time = min(timeit.repeat(lambda: [naive_categorize(post) for post in posts], number=5, repeat=3))
+        compiled_time = min(timeit.repeat(lambda: [categorizer.categorize(post) for post in posts], number=5, repeat=3))
+        per_post = 1e6 / (5 * len(posts))
+
+        # Расхождения ожидаемы: короткие слова ("it", "eth") теперь ищутся только целиком
+        same = sum(naive_categorize(post) == categorizer.categorize(post) for post in posts)
+
+        print(f"  ~{average_length:>6} символов: подстроки {naive_time * per_post:8.1f} мкс/пост, "
+              f"категоризатор {compiled_time * per_post:8.1f} мкс/пост "
+              f"(x{naive_time / compiled_time:.2f}), совпадение категорий {same}/{len(posts)}")
+
+
+def run_scaling_benchmark(multiplier: int = 20):
+    """
+    Прежний поиск растет с числом ключевых слов (категории x слова x длина текста),
+    скомпилированный - почти нет. Таблица расширяется синтетическими словами
+    """
+    keyword_table = {
+        category: keywords + [f"{keyword}{suffix}" for keyword in keywords for suffix in range(multiplier)]
+        for category, keywords in CATEGORY_KEYWORDS.items()
+    }
+    large_categorizer = KeywordCategorizer(keyword_table)
+    keyword_count = sum(map(len, keyword_table.values()))
+
+    posts = make_posts(50)
+    naive_time = min(timeit.repeat(lambda: [naive_categorize(post, keyword_table) for post in posts], number=3, repeat=3))
+    compiled_time = min(timeit.repeat(lambda: [large_categorizer.categorize(post) for post in posts], number=3, repeat=3))
+    per_post = 1e6 / (3 * len(posts))
+
+    print(f"📈 {keyword_count} ключевых слов: подстроки {naive_time * per_post:8.1f} мкс/пост, "
+          f"категоризатор {compiled_time * per_post:8.1f} мкс/пост (x{naive_time / compiled_time:.2f})")
+
+if __name__ == "__main__":
+    run_benchmark()
+    run_scaling_benchmark()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк полнотекстового поиска (GET /api/search): заполняет базу синтетическими
+новостями через тот же путь, что и ingest, и меряет задержку search_news
+для частых и редких слов, с фильтром категории и по курсору.
+Без DATABASE_URL работает на временной SQLite базе (FTS5).
+
+Использование:
+    python scripts/benchmark_search.py [--items 100000] [--queries 200]
+    DATABASE_URL=postgresql://... python scripts/benchmark_search.py --items 1000000
+"""
+
+import sys
+import os
+import asyncio
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# База должна быть задана до импорта server.*
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp()}/search_benchmark.db")
+
+WORDS = [
+    "подарки", "подарок", "telegram", "nft", "коллекция", "биткоин", "bitcoin", "рынок", "торги", "объем",
+    "стартап", "инвестиции", "разработка", "приложение", "сообщество", "обновление", "market", "gifts",
+    "снуп", "дог", "модель", "эмодзи", "фрагмент", "portals", "tonnel", "ethereum", "курс", "рост",
+]
+# Частоты слов в текстах распределены по Ципфу: впереди служебные слова (в, и, на...),
+# затем слова запросов и длинный хвост редких
+VOCABULARY = [f"служебное{number}" for number in range(50)] + WORDS + [f"слово{number}" for number in range(50000)]
+CUM_WEIGHTS = []
+for rank in range(len(VOCABULARY)):
+    CUM_WEIGHTS.append((CUM_WEIGHTS[-1] if CUM_WEIGHTS else 0) + 1 / (rank + 1))
+CATEGORIES = ['gifts', 'crypto', 'nft', 'tech', 'community', 'general']
+QUERIES = ["подарки", "nft коллекция", "bitcoin курс", "снуп дог", "portals", "редкоеслово", "market gifts"]
+
+
+def fill(items: int, batch_size: int = 5000):
+    from server.db import NewsSource, engine, get_db_session
+    from server.services.news_service import insert_news_items
+    from server.services.search_service import create_search_index, index_news_items
+
+    with engine.connect() as connection:
+        create_search_index(connection)
+        connection.commit()
+
+    rng = random.Random(42)
+    started = datetime(2026, 1, 1)
+    with get_db_session() as db:
+        source = NewsSource(name='Benchmark', url='https://t.me/benchmark', source_type='telegram', category='general')
+        db.add(source)
+        db.flush()
+        for offset in range(0, items, batch_size):
+            rows = []
+            for number in range(offset, min(items, offset + batch_size)):
+                title = ' '.join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=8))
+                content = ' '.join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=80))
+                if number % 10000 == 0:
+                    content += ' редкоеслово'
+                rows.append({
+                    'source_id': source.id, 'title': title, 'content': content, 'link': f'https://t.me/benchmark/{number}',
+                    'publish_date': started + timedelta(minutes=number), 'category': rng.choice(CATEGORIES),
+                    'content_hash': f'benchmark-{number}'
+                })
+            inserted = insert_news_items(db, rows)
+            by_hash = {row['content_hash']: row for row in rows}
+            index_news_items(db, [(item_id, by_hash[item_hash]['title'], by_hash[item_hash]['content']) for item_id, _, item_hash in inserted])
+            db.commit()
+            print(f"  {offset + len(rows)}/{items}", end='\r')
+    print()
+
+
+async def measure(queries: int):
+    from server.db import AsyncSessionLocal
+    from server.services.search_service import search_news
+
+    rng = random.Random(7)
+    latencies = []
+    async with AsyncSessionLocal() as db:
+        for _ in range(queries):
+            query = rng.choice(QUERIES)
+            category = rng.choice([None, None, *CATEGORIES])
+            started = time.perf_counter()
+            items, scores, has_more = await search_news(db, query, category, 20)
+            if has_more:
+                # Вторая страница по курсору
+                await search_news(db, query, category, 20, (scores[-1], items[-1].id))
+            latencies.append((time.perf_counter() - started) * 1000 / (2 if has_more else 1))
+
+    latencies.sort()
+    print(f"🔎 {queries} запросов: p50={latencies[len(latencies) // 2]:.1f}ms "
+          f"p95={latencies[int(len(latencies) * 0.95)]:.1f}ms max={latencies[-1]:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк полнотекстового поиска")
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    from server.db import create_tables
+    create_tables()
+    print(f"📥 Заполнение базы: {args.items} новостей")
+    fill(args.items)
+    asyncio.run(measure(args.queries))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Проверка рассылки дайджестов против локального stub Bot API (scripts/stub_bot_api.py).
+Работает на временной SQLite базе: создает подписчиков, запускает рассылку,
+прерывает ее посередине и продолжает, затем проверяет, что каждый незаблокированный
+чат получил дайджест хотя бы один раз, повторно - не больше одной пачки чатов
+(прерванной до сохранения прогресса), а подписки чатов, ответивших 403, удалены.
+Число ответов 429 от stub'а выводится для сведения, но не проверяется.
+
+Использование:
+    python scripts/check_broadcast.py [--subscribers 300] [--rate 30]
+"""
+
+import sys
+import os
+import asyncio
+import argparse
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STUB_PORT = 8091
+
+# База и адрес Bot API должны быть заданы до импорта server.*
+os.environ['DATABASE_URL'] = f"sqlite:///{tempfile.mkdtemp()}/broadcast_check.db"
+os.environ['TELEGRAM_API_URL'] = f"http://127.0.0.1:{STUB_PORT}"
+
+from aiohttp import web
+
+from scripts.stub_bot_api import create_app
+
+async def check(subscribers: int, rate: float):
+    from server.db import BotSubscription, create_tables, get_db_session
+    from server.bot import bot
+    from server.services.broadcast import BroadcastEngine, create_broadcasts, get_broadcast
+
+    create_tables()
+    blocked = {7, 13}
+    with get_db_session() as db:
+        for chat_id in range(1, subscribers + 1):
+            db.add(BotSubscription(chat_id=chat_id, category='nft'))
+            if chat_id % 3 == 0:  # часть чатов подписана на две категории
+                db.add(BotSubscription(chat_id=chat_id, category='all'))
+        db.commit()
+
+    app = create_app(rate=rate, blocked=blocked, latency=0.02)
+    batch_size = 50
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', STUB_PORT).start()
+
+    try:
+        # Лимит движка выше лимита stub'а, чтобы проверить обработку 429
+        engine = BroadcastEngine(bot, rate=rate * 1.5, batch_size=batch_size)
+        broadcast_ids = create_broadcasts(bot, ['nft', 'all'])
+        started = time.monotonic()
+
+        # Прерываем рассылку, как при перезапуске сервиса, и продолжаем новым движком
+        interrupted = asyncio.create_task(engine.run_pending())
+        await asyncio.sleep(2)
+        interrupted.cancel()
+        await asyncio.gather(interrupted, return_exceptions=True)
+        print(f"⏸ Прервано: {get_broadcast(broadcast_ids[0])}")
+
+        await BroadcastEngine(bot, rate=rate * 1.5, batch_size=batch_size).run_pending()
+        elapsed = time.monotonic() - started
+    finally:
+        await bot.close()
+        await runner.cleanup()
+
+    stats = app['stats']
+    delivered = stats['delivered']
+    expected = {chat_id: 1 + (chat_id % 3 == 0) for chat_id in range(1, subscribers + 1) if chat_id not in blocked}
+    duplicates = {chat_id: count for chat_id, count in delivered.items() if count > expected.get(chat_id, 0)}
+    missing = [chat_id for chat_id, count in expected.items() if delivered.get(chat_id, 0) < count]
+
+    for broadcast_id in broadcast_ids:
+        print(f"📊 {get_broadcast(broadcast_id)}")
+    with get_db_session() as db:
+        remaining_blocked = db.query(BotSubscription).filter(BotSubscription.chat_id.in_(blocked)).count()
+
+    print(f"📨 Доставлено {sum(delivered.values())} сообщений за {elapsed:.1f}s "
+          f"({sum(delivered.values()) / elapsed:.1f}/с), 429: {stats['too_many_requests']}, 403: {stats['forbidden']}")
+    print(f"{'✅' if not missing else '❌'} Не доставлено: {len(missing)}")
+    # Пачка, прерванная до сохранения прогресса, отправляется повторно - допустимо не больше одной пачки
+    print(f"{'✅' if len(duplicates) <= batch_size else '❌'} Повторных доставок: {len(duplicates)} (допустимо до {batch_size})")
+    print(f"{'✅' if not remaining_blocked else '❌'} Подписки заблокировавших бота чатов удалены")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Проверка рассылки дайджестов")
+    parser.add_argument("--subscribers", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=30)
+    args = parser.parse_args()
+    asyncio.run(check(args.subscribers, args.rate))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Проверка склейки почти-дубликатов на временной SQLite базе: сохраняет посты
+через save_to_database и сверяет duplicate_of. Одна история из разных каналов
+должна склеиться, а шаблонные посты одного канала (ежедневный обзор, отличающийся
+только цифрами) - остаться отдельными новостями, и в одном пакете, и в разных.
+
+Использование:
+    python scripts/check_story_clusters.py
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# База должна быть задана до импорта server.*
+os.environ['DATABASE_URL'] = f"sqlite:///{tempfile.mkdtemp()}/story_clusters_check.db"
+
+
+def market_review(channel: str, number: int, portals: str, tonnel: str, day: int) -> dict:
+    return {
+        'title': 'Обзор рынка подарков',
+        'text': f'Обзор рынка подарков за день. Торговый объем маркетплейсов: Portals {portals} TON, '
+                f'Tonnel {tonnel} TON. Самые активные коллекции недели остаются прежними',
+        'link': f'https://t.me/{channel}/{number}',
+        'channel': channel,
+        'source': channel,
+        'category': 'gifts',
+        'date': f'2026-10-{day:02d}T12:00:00+00:00',
+    }
+
+
+async def check():
+    from sqlalchemy import select
+    from server.db import NewsItem, create_tables, engine, get_db_session
+    from server.parsers.telegram_news_service import TelegramNewsService
+    from server.services.search_service import create_search_index
+    from server.utils.simhash import hamming_distance, simhash
+
+    create_tables()
+    with engine.connect() as connection:
+        create_search_index(connection)
+        connection.commit()
+    service = TelegramNewsService()
+
+    first = market_review('gift_newstg', 100, '380 456', '358 995', 15)
+    second = market_review('gift_newstg', 101, '391 002', '362 417', 16)
+    third = market_review('gift_newstg', 102, '402 318', '370 150', 17)
+    # Та же история, перепощенная другим каналом
+    repost = market_review('nextgen_NFT', 500, '380 456', '358 995', 15)
+
+    distance = hamming_distance(simhash(first['title'], first['text']), simhash(second['title'], second['text']))
+    print(f"ℹ️ Расстояние Хэмминга между шаблонными постами одного канала: {distance}")
+
+    await service.save_to_database([first])
+    await service.save_to_database([second, repost])
+    await service.save_to_database([third])
+
+    with get_db_session() as db:
+        items = {item.link: item for item in db.scalars(select(NewsItem))}
+
+    same_source = [items[post['link']] for post in (first, second, third)]
+    separate = all(item.duplicate_of is None for item in same_source)
+    folded = items[repost['link']].duplicate_of == items[first['link']].id
+
+    print(f"{'✅' if separate else '❌'} Шаблонные посты одного канала не склеены: "
+          f"{[item.duplicate_of for item in same_source]}")
+    print(f"{'✅' if folded else '❌'} Репост из другого канала склеен с первой новостью истории: "
+          f"{items[repost['link']].duplicate_of} (ожидается {items[first['link']].id})")
+    return separate and folded
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(check()) else 1)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Скрипт для сверки парсеров страницы Telegram канала: lxml против BeautifulSoup.
+Без аргументов проверяет сохраненные страницы t.me/s/<channel> из scripts/fixtures/telegram,
+можно передать свои файлы или каталоги. --live скачивает страницы каналов
+из TelegramNewsService, --save DIR сохраняет скачанные страницы как фикстуры.
+Завершается с кодом 1 при любом расхождении, кроме сериализации <br>.
+
+Использование:
+    python scripts/check_telegram_parser_parity.py
+    python scripts/check_telegram_parser_parity.py --live --save scripts/fixtures/telegram
+"""
+
+import sys
+import os
+import re
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from server.parsers import telegram_html
+from server.parsers.telegram_news_service import TelegramNewsService
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'telegram')
+
+# Единственное допустимое расхождение - сериализация <br>: lxml пишет <br>, html.parser - <br/>
+# и не сохраняет отступ перед тегом
+BR_TAG_RE = re.compile(r'\s*<br\s*/?>\s*')
+
+
+def normalize_html(html: str) -> str:
+    return BR_TAG_RE.sub('<br>', html)
+
+
+def fixture_paths(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.html'))
+        else:
+            yield path
+
+
+def load_pages(args):
+    save_dir = None
+    if '--save' in args:
+        save_dir = args[args.index('--save') + 1]
+        args = [arg for arg in args if arg not in ('--save', save_dir)]
+        os.makedirs(save_dir, exist_ok=True)
+
+    if '--live' not in args:
+        for path in fixture_paths(args or [FIXTURES_DIR]):
+            with open(path, encoding='utf-8') as page:
+                yield path, page.read()
+        return
+
+    for channel in TelegramNewsService().channels:
+        url = f"https://t.me/s/{channel['username']}"
+        html = requests.get(url, timeout=10).text
+        if save_dir:
+            with open(os.path.join(save_dir, f"{channel['username']}.html"), 'w', encoding='utf-8') as page:
+                page.write(html)
+        yield url, html
+
+
+def compare(name: str, html: str) -> bool:
+    fast = telegram_html.parse_messages_lxml(html)
+    reference = telegram_html.parse_messages_bs4(html)
+
+    ok = len(fast) == len(reference)
+    if not ok:
+        print(f"❌ {name}: сообщений lxml={len(fast)}, bs4={len(reference)}")
+
+    for fast_message, reference_message in zip(fast, reference):
+        for field, reference_value in reference_message.items():
+            fast_value = fast_message[field]
+            if field == 'html':
+                fast_value, reference_value = normalize_html(fast_value), normalize_html(reference_value)
+            if fast_value != reference_value:
+                ok = False
+                print(f"❌ {name} [{reference_message['message_id']}] {field}:\n   lxml: {fast_value!r}\n   bs4:  {reference_value!r}")
+
+    timings = []
+    for parser in (telegram_html.parse_messages_lxml, telegram_html.parse_messages_bs4):
+        started = time.perf_counter()
+        for _ in range(20):
+            parser(html)
+        timings.append((time.perf_counter() - started) / 20 * 1000)
+
+    status = "✅" if ok else "❌"
+    print(f"{status} {name}: {len(reference)} сообщений, lxml {timings[0]:.1f} мс, bs4 {timings[1]:.1f} мс")
+    return ok
+
+
+def check_parity():
+    if telegram_html.lxml is None:
+        print("❌ lxml/cssselect не установлены")
+        return False
+
+    results = [compare(name, html) for name, html in load_pages(sys.argv[1:])]
+    if not results:
+        print("❌ Нет страниц для сверки")
+        return False
+    return all(results)
+
+if __name__ == "__main__":
+    sys.exit(0 if check_parity() else 1)
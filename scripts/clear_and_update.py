@@ -9,6 +9,7 @@ import asyncio
 
 sys.path.append(os.path.join(os.path.dirname(__file__), 'server'))
 from server.db import get_db_session, NewsItem, NewsSource
+from server.services.stats_service import rebuild_category_counters
 
 async def clear_and_update():
     """Очистка базы данных и обновление с медиа"""
@@ -26,6 +27,7 @@ async def clear_and_update():
                 session.delete(item)
             
             session.commit()
+            rebuild_category_counters(session)
             print(f"✅ Удалено {deleted_count} новостей от NextGen NFT")
         
         print("🔄 Обновление новостей с медиа...")
@@ -52,6 +54,7 @@ async def clear_and_update():
         # Сохраняем в базу данных
         print("💾 Сохранение в базу данных...")
         await service.save_to_database(posts)
+        await service.close()
         
         print("✅ Обновление завершено!")
         
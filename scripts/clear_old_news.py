@@ -74,6 +74,13 @@ def clear_old_news():
                 print(f"   • {row[0][:50]}... ({row[2]}) - {row[1]}")
             
             connection.commit()
+
+            # Пересчитываем счетчики категорий после удаления
+            from server.db import get_db_session
+            from server.services.stats_service import rebuild_category_counters
+            with get_db_session() as session:
+                rebuild_category_counters(session)
+
             print(f"\n✅ Очистка завершена успешно!")
             
     except Exception as e:
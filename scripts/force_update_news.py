@@ -14,9 +14,8 @@ async def force_update():
     """Принудительное обновление новостей"""
     print("🔄 Принудительное обновление новостей...")
     
+    service = TelegramNewsService()
     try:
-        service = TelegramNewsService()
-        
         # Получаем посты из канала
         print("📡 Получение постов из @nextgen_NFT...")
         posts = await service.fetch_telegram_channel('nextgen_NFT')
@@ -42,6 +41,8 @@ async def force_update():
         print(f"❌ Ошибка: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        await service.close()
 
 if __name__ == "__main__":
     asyncio.run(force_update()) 
\ No newline at end of file
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Управление источниками новостей в news_sources.
+Запущенный сервер подхватывает изменения без перезапуска (реестр сверяется раз в минуту).
+
+Использование:
+    python scripts/manage_sources.py list
+    python scripts/manage_sources.py add-channel nextgen_NFT "NextGen NFT" nft
+    python scripts/manage_sources.py add-rss https://vc.ru/rss VC.ru tech
+    python scripts/manage_sources.py disable "VC.ru"
+    python scripts/manage_sources.py enable "VC.ru"
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.db import SessionLocal, NewsSource, create_tables
+from server.services.source_registry import channel_url
+
+def list_sources():
+    db = SessionLocal()
+    try:
+        for source in db.query(NewsSource).order_by(NewsSource.source_type, NewsSource.name):
+            status = "✅" if source.is_active is not False else "⏸"
+            print(f"{status} [{source.source_type}] {source.name} ({source.category}) {source.url} "
+                  f"breaker={source.breaker_state or 'closed'}")
+    finally:
+        db.close()
+
+def add_source(name: str, url: str, source_type: str, category: str):
+    db = SessionLocal()
+    try:
+        source = db.query(NewsSource).filter(NewsSource.name == name).first()
+        if source is None:
+            source = NewsSource(name=name)
+            db.add(source)
+        source.url = url
+        source.source_type = source_type
+        source.category = category
+        source.is_active = True
+        source.updated_at = datetime.utcnow()
+        db.commit()
+        print(f"✅ Источник {name} сохранен: {url}")
+    finally:
+        db.close()
+
+def set_active(name: str, is_active: bool):
+    db = SessionLocal()
+    try:
+        source = db.query(NewsSource).filter(NewsSource.name == name).first()
+        if source is None:
+            print(f"❌ Источник {name} не найден")
+            return
+        source.is_active = is_active
+        source.updated_at = datetime.utcnow()
+        db.commit()
+        print(f"✅ Источник {name} {'включен' if is_active else 'отключен'}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Управление источниками новостей")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="список источников")
+    add_channel = commands.add_parser("add-channel", help="добавить Telegram канал")
+    add_channel.add_argument("username", help="username канала (без @)")
+    add_channel.add_argument("name")
+    add_channel.add_argument("category")
+    add_rss = commands.add_parser("add-rss", help="добавить RSS ленту")
+    add_rss.add_argument("url")
+    add_rss.add_argument("name")
+    add_rss.add_argument("category")
+    for command in ("disable", "enable"):
+        commands.add_parser(command, help=f"{'отключить' if command == 'disable' else 'включить'} источник").add_argument("name")
+    args = parser.parse_args()
+
+    create_tables()
+    if args.command == "list":
+        list_sources()
+    elif args.command == "add-channel":
+        add_source(args.name, channel_url(args.username.lstrip('@')), 'telegram', args.category)
+    elif args.command == "add-rss":
+        add_source(args.name, args.url, 'rss', args.category)
+    else:
+        set_active(args.name, args.command == "enable")
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Скрипт для приведения медиа уже сохраненных новостей к каноническому виду
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.db import SessionLocal, NewsItem
+from server.utils.media import normalize_media
+
+BATCH_SIZE = 500
+
+def normalize_media_in_database():
+    """Переписывает поле media всех новостей в формат списка MediaItem"""
+    print("🔧 Нормализация медиа в базе данных...")
+
+    db = SessionLocal()
+    try:
+        updated = 0
+        last_id = 0
+        while True:
+            news_items = db.query(NewsItem).filter(NewsItem.id > last_id).order_by(NewsItem.id).limit(BATCH_SIZE).all()
+            if not news_items:
+                break
+
+            for news in news_items:
+                media_list = normalize_media(news.media, news.image_url, news.video_url)
+                if news.media != media_list:
+                    news.media = media_list
+                    updated += 1
+
+            db.commit()
+            last_id = news_items[-1].id
+
+        print(f"✅ Обновлено новостей: {updated}")
+
+    except Exception as e:
+        print(f"❌ Ошибка: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    normalize_media_in_database()
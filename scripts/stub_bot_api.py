@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Локальный stub Telegram Bot API для проверки рассылок без обращения к Telegram.
+Отвечает на любые методы /bot<token>/<method>, как Telegram: 429 с retry_after при
+превышении общего лимита или лимита на чат, 403 для "заблокировавших" бота чатов.
+
+Использование:
+    python scripts/stub_bot_api.py [--port 8081] [--rate 30] [--blocked 7,13] [--latency 0.05]
+    TELEGRAM_API_URL=http://127.0.0.1:8081 uvicorn server.main:app
+
+GET /stats - сколько сообщений принято по чатам и сколько раз отвечено 429/403
+"""
+
+import asyncio
+import argparse
+import time
+from collections import Counter, deque
+
+from aiohttp import web
+
+def create_app(rate: float = 30, per_chat_interval: float = 1.0, blocked=(), latency: float = 0.0) -> web.Application:
+    recent = deque()  # время принятых сообщений за последнюю секунду
+    last_by_chat = {}
+    stats = {'delivered': Counter(), 'too_many_requests': 0, 'forbidden': 0}
+
+    async def method(request: web.Request) -> web.Response:
+        if latency:
+            await asyncio.sleep(latency)
+        data = await request.json() if request.can_read_body else {}
+        if request.match_info['method'] != 'sendMessage':
+            return web.json_response({'ok': True, 'result': {'id': 1, 'is_bot': True, 'username': 'stub_bot'}})
+
+        chat_id = data.get('chat_id')
+        if chat_id in blocked:
+            stats['forbidden'] += 1
+            return web.json_response({'ok': False, 'error_code': 403,
+                                      'description': 'Forbidden: bot was blocked by the user'}, status=403)
+
+        now = time.monotonic()
+        while recent and recent[0] <= now - 1:
+            recent.popleft()
+        chat_wait = last_by_chat.get(chat_id, 0) + per_chat_interval - now
+        if len(recent) >= rate or chat_wait > 0:
+            stats['too_many_requests'] += 1
+            retry_after = max(1, int(chat_wait + 0.999))
+            return web.json_response({'ok': False, 'error_code': 429,
+                                      'description': f'Too Many Requests: retry after {retry_after}',
+                                      'parameters': {'retry_after': retry_after}}, status=429)
+
+        recent.append(now)
+        last_by_chat[chat_id] = now
+        stats['delivered'][chat_id] += 1
+        return web.json_response({'ok': True, 'result': {'message_id': sum(stats['delivered'].values()),
+                                                         'chat': {'id': chat_id}, 'text': data.get('text')}})
+
+    async def get_stats(request: web.Request) -> web.Response:
+        delivered = stats['delivered']
+        return web.json_response({
+            'messages': sum(delivered.values()),
+            'chats': len(delivered),
+            'duplicates': sum(count - 1 for count in delivered.values() if count > 1),
+            'too_many_requests': stats['too_many_requests'],
+            'forbidden': stats['forbidden'],
+            'delivered': {str(chat_id): count for chat_id, count in delivered.items()}
+        })
+
+    app = web.Application()
+    app['stats'] = stats
+    app.router.add_get('/stats', get_stats)
+    app.router.add_post('/bot{token}/{method}', method)
+    return app
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Telegram Bot API")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--rate", type=float, default=30, help="сообщений в секунду до ответа 429")
+    parser.add_argument("--per-chat-interval", type=float, default=1.0)
+    parser.add_argument("--blocked", default="", help="chat_id через запятую, которым отвечать 403")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, сек")
+    args = parser.parse_args()
+
+    blocked = {int(chat_id) for chat_id in args.blocked.split(',') if chat_id}
+    print(f"🤖 Stub Bot API на http://127.0.0.1:{args.port} (лимит {args.rate}/с)")
+    web.run_app(create_app(args.rate, args.per_chat_interval, blocked, args.latency), host='127.0.0.1', port=args.port)
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, select, tuple_
 from typing import List, Optional
 from datetime import datetime
 import logging
 
-from server.db import get_db, NewsItem, NewsSource, recreate_engine, recreate_models
-from server.models import NewsResponse, NewsItemResponse, MediaItem
+from server.db import get_async_db, NewsItem, NewsSource
+from server.models import NewsResponse, NewsItemResponse, SourceHealthResponse
+from server.services.news_serializer import serialize_news_item, serialize_news_items
+from server.services.response_cache import news_cache, etag_matches
+from server.services.search_service import search_news
+from server.services.stats_service import count_news, count_stories, get_category_counts_async
+from server.utils.pagination import encode_cursor, decode_cursor, encode_rank_cursor, decode_rank_cursor
 
 logger = logging.getLogger(__name__)
 
@@ -15,234 +20,171 @@ router = APIRouter()
 
 @router.get("/news/", response_model=NewsResponse)
 async def get_news(
+        request: Request,
         category: Optional[str] = Query(None, description="Фильтр по категории"),
         limit: int = Query(50, description="Количество новостей", le=100),
         offset: int = Query(0, description="Смещение для пагинации"),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor из прошлого ответа)"),
+        include_total: bool = Query(True, description="Возвращать ли общее количество новостей"),
+        collapse_duplicates: bool = Query(False, description="Показывать только первую новость каждой истории"),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Получить список новостей с фильтрацией"""
     try:
-        logger.info(f"Запрос новостей: category={category}, limit={limit}, offset={offset}")
+        logger.info(f"Запрос новостей: category={category}, limit={limit}, offset={offset}, cursor={cursor}")
 
-        # Принудительно обновляем метаданные и модели
-        recreate_engine()
-        NewsItem, NewsSource = recreate_models()
+        category_filter = category if category and category != "all" else None
+
+        # Готовый ответ из кэша: без запросов к БД и сериализации
+        cache_key = (category_filter, cursor, None if cursor else offset, limit, include_total, collapse_duplicates)
+        cached = news_cache.get(cache_key)
+        if cached:
+            return _cached_response(request, cached)
 
         # Базовый запрос
-        query = db.query(NewsItem)
+        query = select(NewsItem)
 
         # Фильтр по категории
-        if category and category != "all":
-            query = query.filter(NewsItem.category == category)
+        if category_filter:
+            query = query.where(NewsItem.category == category_filter)
+
+        # Почти-дубликаты из других источников скрываются за первой новостью истории
+        if collapse_duplicates:
+            query = query.where(NewsItem.duplicate_of.is_(None))
+
+        # Keyset-пагинация: берем строки строго "после" позиции курсора
+        if cursor:
+            try:
+                cursor_date, cursor_id = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Некорректный курсор")
+            query = query.where(tuple_(NewsItem.publish_date, NewsItem.id) < (cursor_date, cursor_id))
+
+        # Сортировка по дате публикации (id - для стабильного порядка при равных датах)
+        query = query.order_by(desc(NewsItem.publish_date), desc(NewsItem.id))
 
-        # Сортировка по дате публикации
-        query = query.order_by(desc(NewsItem.publish_date))
+        if not cursor:
+            query = query.offset(offset)
 
-        # Пагинация
-        total = query.count()
-        news_items = query.offset(offset).limit(limit).all()
+        # Берем на одну запись больше, чтобы понять, есть ли следующая страница
+        news_items = (await db.execute(query.limit(limit + 1))).scalars().all()
+        has_more = len(news_items) > limit
+        news_items = news_items[:limit]
+        next_cursor = encode_cursor(news_items[-1].publish_date, news_items[-1].id) if has_more else None
 
-        logger.info(f"Найдено {len(news_items)} новостей из {total} общих")
+        # Общее количество берем из кэшированного счетчика, а не COUNT(*) на каждый запрос.
+        # Счетчики считают все новости, поэтому для свернутой ленты нужен COUNT
+        total = None
+        if include_total and collapse_duplicates:
+            total = await count_stories(db, category_filter)
+        elif include_total:
+            total = await count_news(db, category_filter)
+
+        logger.info(f"Найдено {len(news_items)} новостей, total={total}")
 
         # Соберем source_id для всех новостей
         source_ids = [item.source_id for item in news_items if item.source_id is not None]
         sources = {}
         if source_ids:
-            sources_list = db.query(NewsSource).filter(NewsSource.id.in_(source_ids)).all()
+            sources_list = (await db.execute(select(NewsSource).where(NewsSource.id.in_(source_ids)))).scalars().all()
             sources = {source.id: source for source in sources_list}
 
-        # Преобразование в response модель
-        news_data = []
-        for item in news_items:
-            try:
-                                # Получаем медиа из JSON поля
-                media_list = []
-                if item.media:
-                    try:
-                        # Добавляем отладочную информацию
-                        logger.info(f"Processing media for item {item.id}: {type(item.media)} - {item.media}")
-                        
-                        # Если media это строка JSON, парсим её
-                        if isinstance(item.media, str):
-                            import json
-                            media_data = json.loads(item.media)
-                        else:
-                            media_data = item.media
-                        
-                        # Проверяем, является ли media_data списком или одним объектом
-                        if isinstance(media_data, list):
-                            media_list = [MediaItem(**media) for media in media_data]
-                        else:
-                            # Если это один объект, оборачиваем в список
-                            media_list = [MediaItem(**media_data)]
-                            
-                        logger.info(f"Successfully parsed media for {item.id}: {len(media_list)} items")
-                    except Exception as e:
-                        logger.warning(f"Error parsing media for {item.id}: {e}")
-                        logger.warning(f"Media data: {item.media}")
-                        # Пробуем создать медиа из image_url и video_url как fallback
-                        if item.image_url:
-                            media_list = [MediaItem(
-                                type='photo',
-                                url=item.image_url,
-                                thumbnail=item.image_url
-                            )]
-                            logger.info(f"Created fallback photo media for {item.id}")
-                        elif item.video_url:
-                            media_list = [MediaItem(
-                                type='video',
-                                url=item.video_url,
-                                thumbnail=item.image_url
-                            )]
-                            logger.info(f"Created fallback video media for {item.id}")
-                else:
-                    # Если медиа нет, пробуем создать из image_url и video_url
-                    if item.image_url:
-                        media_list = [MediaItem(
-                            type='photo',
-                            url=item.image_url,
-                            thumbnail=item.image_url
-                        )]
-                        logger.info(f"Created photo media from image_url for {item.id}")
-                    elif item.video_url:
-                        media_list = [MediaItem(
-                            type='video',
-                            url=item.video_url,
-                            thumbnail=item.image_url
-                        )]
-                        logger.info(f"Created video media from video_url for {item.id}")
-
-                # Получаем источник
-                source = sources.get(item.source_id)
-                source_name = source.name if source else None
-                source_url = source.url if source else None
-
-                news_data.append(NewsItemResponse(
-                    id=item.id,
-                    title=item.title or "",
-                    content=item.content or "",  # Plain text
-                    content_html=item.content_html or "",  # HTML контент
-                    link=item.link or "",
-                    publish_date=item.publish_date.isoformat() if item.publish_date else datetime.now().isoformat(),
-                    category=item.category or "general",
-                    media=media_list,
-                    reading_time=item.reading_time,
-                    views_count=item.views_count or 0,
-                    author=item.author,
-                    source_name=source_name,
-                    source_url=source_url,
-                    source=source  # <-- добавлено, чтобы поле source было заполнено
-                ))
-            except Exception as e:
-                logger.warning(f"Ошибка при обработке новости {item.id}: {e}")
-                continue
-
-        return NewsResponse(
+        # Преобразование в response модель одним проходом
+        news_data = serialize_news_items(news_items, sources)
+
+        response = NewsResponse(
             data=news_data,
             total=total,
-            page=offset // limit + 1,
-            pages=(total + limit - 1) // limit
+            page=None if cursor else offset // limit + 1,
+            pages=(total + limit - 1) // limit if total is not None else None,
+            next_cursor=next_cursor
         )
 
+        cached = news_cache.set(cache_key, response.model_dump_json().encode())
+        return _cached_response(request, cached)
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Ошибка при получении новостей: {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка при получении новостей: {str(e)}")
 
 
+def _cached_response(request: Request, cached) -> Response:
+    """Отдает закэшированный JSON или 304, если ETag клиента совпал"""
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+@router.get("/search", response_model=NewsResponse)
+async def search(
+        q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос"),
+        category: Optional[str] = Query(None, description="Фильтр по категории"),
+        limit: int = Query(20, description="Количество результатов", ge=1, le=100),
+        cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor из прошлого ответа)"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Полнотекстовый поиск новостей, результаты по релевантности.
+    Курсор (score, id) стабилен, только пока не появились новые новости: их сохранение
+    меняет набор ранжируемых кандидатов и (в SQLite) IDF в bm25, поэтому между страницами
+    результаты могут повториться или пропасть
+    """
+    try:
+        category_filter = category if category and category != "all" else None
+
+        position = None
+        if cursor:
+            try:
+                position = decode_rank_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+        news_items, scores, has_more = await search_news(db, q, category_filter, limit, position)
+        next_cursor = encode_rank_cursor(scores[-1], news_items[-1].id) if has_more and news_items else None
+
+        source_ids = {item.source_id for item in news_items if item.source_id is not None}
+        sources = {}
+        if source_ids:
+            sources_list = (await db.execute(select(NewsSource).where(NewsSource.id.in_(source_ids)))).scalars().all()
+            sources = {source.id: source for source in sources_list}
+
+        return NewsResponse(data=serialize_news_items(news_items, sources), next_cursor=next_cursor)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка поиска новостей: {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка поиска новостей: {str(e)}")
+
+
 @router.get("/news/{news_id}", response_model=NewsItemResponse)
 async def get_news_item(
         news_id: int,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Получить конкретную новость по ID"""
     try:
-        news_item = db.query(NewsItem).filter(NewsItem.id == news_id).first()
+        news_item = await db.get(NewsItem, news_id)
 
         if not news_item:
             raise HTTPException(status_code=404, detail="Новость не найдена")
 
-        # Получаем источник
-        source = db.query(NewsSource).get(news_item.source_id) if news_item.source_id else None
+        # Получаем источник: без него новость не отдается (source в ответе обязателен)
+        source = await db.get(NewsSource, news_item.source_id) if news_item.source_id else None
+        if not source:
+            raise HTTPException(status_code=404, detail="Источник новости не найден")
 
-        # Получаем медиа
-        media_list = []
-        if news_item.media:
-            try:
-                # Добавляем отладочную информацию
-                logger.info(f"Processing media for item {news_item.id}: {type(news_item.media)} - {news_item.media}")
-                
-                # Если media это строка JSON, парсим её
-                if isinstance(news_item.media, str):
-                    import json
-                    media_data = json.loads(news_item.media)
-                else:
-                    media_data = news_item.media
-                
-                # Проверяем, является ли media_data списком или одним объектом
-                if isinstance(media_data, list):
-                    media_list = [MediaItem(**media) for media in media_data]
-                else:
-                    # Если это один объект, оборачиваем в список
-                    media_list = [MediaItem(**media_data)]
-                    
-                logger.info(f"Successfully parsed media for {news_item.id}: {len(media_list)} items")
-            except Exception as e:
-                logger.warning(f"Error parsing media for {news_item.id}: {e}")
-                logger.warning(f"Media data: {news_item.media}")
-                # Пробуем создать медиа из image_url и video_url как fallback
-                if news_item.image_url:
-                    media_list = [MediaItem(
-                        type='photo',
-                        url=news_item.image_url,
-                        thumbnail=news_item.image_url
-                    )]
-                    logger.info(f"Created fallback photo media for {news_item.id}")
-                elif news_item.video_url:
-                    media_list = [MediaItem(
-                        type='video',
-                        url=news_item.video_url,
-                        thumbnail=news_item.image_url
-                    )]
-                    logger.info(f"Created fallback video media for {news_item.id}")
-        else:
-            # Если медиа нет, пробуем создать из image_url и video_url
-            if news_item.image_url:
-                media_list = [MediaItem(
-                    type='photo',
-                    url=news_item.image_url,
-                    thumbnail=news_item.image_url
-                )]
-                logger.info(f"Created photo media from image_url for {news_item.id}")
-            elif news_item.video_url:
-                media_list = [MediaItem(
-                    type='video',
-                    url=news_item.video_url,
-                    thumbnail=news_item.image_url
-                )]
-                logger.info(f"Created video media from video_url for {news_item.id}")
-
-        # Увеличиваем счетчик просмотров
+        # Увеличиваем счетчик просмотров. Кэш ленты ради него не сбрасывается:
+        # views_count в /news/ обновится по истечении RESPONSE_CACHE_TTL
         if news_item.views_count is None:
             news_item.views_count = 0
         news_item.views_count += 1
-        db.commit()
-
-        return NewsItemResponse(
-            id=news_item.id,
-            title=news_item.title or "",
-            content=news_item.content or "",
-            content_html=news_item.content_html or "",
-            link=news_item.link or "",
-            publish_date=news_item.publish_date.isoformat() if news_item.publish_date else datetime.now().isoformat(),
-            category=news_item.category or "general",
-            media=media_list,
-            reading_time=news_item.reading_time,
-            views_count=news_item.views_count,
-            author=news_item.author,
-            source_name=source.name if source else None,
-            source_url=source.url if source else None,
-            source=source  # Добавляем полную информацию об источнике
-        )
+        await db.commit()
+
+        return serialize_news_item(news_item, source)
 
     except HTTPException:
         raise
@@ -252,10 +194,10 @@ async def get_news_item(
 
 
 @router.get("/categories/")
-async def get_categories(db: Session = Depends(get_db)):
+async def get_categories(db: AsyncSession = Depends(get_async_db)):
     """Получить список доступных категорий"""
     try:
-        categories = db.query(NewsItem.category).distinct().all()
+        categories = (await db.execute(select(NewsItem.category).distinct())).all()
         return {"categories": [cat[0] for cat in categories if cat[0]]}
     except Exception as e:
         logger.error(f"Ошибка при получении категорий: {e}")
@@ -263,19 +205,12 @@ async def get_categories(db: Session = Depends(get_db)):
 
 
 @router.get("/stats/")
-async def get_stats(db: Session = Depends(get_db)):
+async def get_stats(db: AsyncSession = Depends(get_async_db)):
     """Получить статистику новостей"""
     try:
-        total_news = db.query(NewsItem).count()
-
-        # Статистика по категориям
-        categories_stats = {}
-        categories = db.query(NewsItem.category).distinct().all()
-
-        for cat in categories:
-            if cat[0]:
-                count = db.query(NewsItem).filter(NewsItem.category == cat[0]).count()
-                categories_stats[cat[0]] = count
+        # Один запрос к таблице счетчиков, кэшируемый между циклами ingest
+        categories_stats = await get_category_counts_async(db)
+        total_news = sum(categories_stats.values())
 
         return {
             "total_news": total_news,
@@ -285,4 +220,30 @@ async def get_stats(db: Session = Depends(get_db)):
 
     except Exception as e:
         logger.error(f"Ошибка при получении статистики: {e}")
-        raise HTTPException(status_code=500, detail="Ошибка при получении статистики")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Ошибка при получении статистики")
+
+
+@router.get("/sources/health", response_model=List[SourceHealthResponse])
+async def get_sources_health(db: AsyncSession = Depends(get_async_db)):
+    """Здоровье источников: ошибки подряд, последняя задержка и состояние circuit breaker"""
+    try:
+        sources = (await db.execute(select(NewsSource).order_by(NewsSource.id))).scalars().all()
+        return [
+            SourceHealthResponse(
+                id=source.id,
+                name=source.name,
+                source_type=source.source_type,
+                is_active=bool(source.is_active),
+                breaker_state=source.breaker_state or 'closed',
+                consecutive_failures=source.consecutive_failures or 0,
+                breaker_opened_at=source.breaker_opened_at,
+                last_latency_ms=source.last_latency_ms,
+                last_error=source.last_error,
+                last_success_at=source.last_success_at,
+                last_failure_at=source.last_failure_at
+            )
+            for source in sources
+        ]
+    except Exception as e:
+        logger.error(f"Ошибка при получении здоровья источников: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка при получении здоровья источников")
@@ -3,15 +3,24 @@
 API endpoints для Telegram Bot
 """
 
+import asyncio
 import logging
-from typing import Dict, Any
-from fastapi import APIRouter, Request, HTTPException
+from typing import Dict, Any, List, Optional
+from fastapi import APIRouter, Query, Request, HTTPException
 from pydantic import BaseModel
-from server.bot import bot
+from server.bot import bot, run_db
+from server.services.update_queue import UpdateQueue
+from server.services.broadcast import (
+    DIGEST_CATEGORIES, BroadcastEngine, create_broadcasts, get_broadcast, subscribed_categories
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+broadcast_engine = BroadcastEngine(bot)
+# Ссылки на фоновые рассылки, чтобы задачи не собрал сборщик мусора
+_broadcast_tasks = set()
+
 class TelegramUpdate(BaseModel):
     update_id: int
     message: Dict[str, Any] = None
@@ -19,23 +28,37 @@ class TelegramUpdate(BaseModel):
 
 @router.post("/webhook")
 async def telegram_webhook(update: TelegramUpdate):
-    """Обработка webhook от Telegram"""
-    try:
-        logger.info(f"Получен webhook: {update.update_id}")
-        
-        # Обработка сообщений
-        if update.message:
-            await handle_message(update.message)
-        
-        # Обработка callback query (кнопки)
-        elif update.callback_query:
-            await handle_callback_query(update.callback_query)
-        
-        return {"status": "ok"}
-        
-    except Exception as e:
-        logger.error(f"Ошибка обработки webhook: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+    """
+    Обработка webhook от Telegram.
+    Обновление только ставится в очередь - ответ Telegram не ждет ни базы, ни Bot API.
+    Повторная доставка того же update_id отбрасывается; при заполненной очереди
+    отвечаем 503, и Telegram повторит доставку позже
+    """
+    logger.info(f"Получен webhook: {update.update_id}")
+    if not update_queue.submit(update.update_id, update):
+        logger.warning(f"Очередь обновлений заполнена, update {update.update_id} отклонен")
+        raise HTTPException(status_code=503, detail="Update queue is full", headers={"Retry-After": "1"})
+    return {"status": "ok"}
+
+async def process_update(update: TelegramUpdate):
+    """
+    Обработка одного обновления воркером очереди. Ошибки обработчиков не глушатся:
+    их считает воркер (failed в /telegram/queue-metrics)
+    """
+    # Обработка сообщений
+    if update.message:
+        await handle_message(update.message)
+
+    # Обработка callback query (кнопки)
+    elif update.callback_query:
+        await handle_callback_query(update.callback_query)
+
+update_queue = UpdateQueue(process_update)
+
+@router.get("/queue-metrics")
+async def get_queue_metrics():
+    """Глубина очереди обновлений, счетчики и задержка обработки"""
+    return update_queue.metrics()
 
 async def handle_message(message: Dict[str, Any]):
     """Обработка входящих сообщений"""
@@ -55,7 +78,7 @@ async def handle_message(message: Dict[str, Any]):
             command = command_parts[0]
             args = command_parts[1:] if len(command_parts) > 1 else []
             
-            bot.handle_command(chat_id, command, args)
+            await bot.handle_command(chat_id, command, args)
         else:
             # Обычное сообщение
             response_text = """
@@ -73,13 +96,15 @@ async def handle_message(message: Dict[str, Any]):
 
 Бот автоматически обновляет новости каждые 5 минут!
 """
-            bot.send_message(chat_id, response_text)
+            await bot.send_message(chat_id, response_text)
             
     except Exception as e:
         logger.error(f"Ошибка обработки сообщения: {e}")
+        raise
 
 async def handle_callback_query(callback_query: Dict[str, Any]):
     """Обработка callback query (нажатия на кнопки)"""
+    chat_id = None
     try:
         chat_id = callback_query.get("message", {}).get("chat", {}).get("id")
         data = callback_query.get("data")
@@ -92,51 +117,49 @@ async def handle_callback_query(callback_query: Dict[str, Any]):
         
         # Обработка различных типов callback data
         if data == "news":
-            text = bot.get_news_summary(5)
-            bot.send_message(chat_id, text)
+            text = await run_db(bot.get_news_summary, 5)
+            await bot.send_message(chat_id, text)
             
         elif data == "nft":
-            text = bot.get_news_by_category("nft", 5)
-            bot.send_message(chat_id, text)
+            text = await run_db(bot.get_news_by_category, "nft", 5)
+            await bot.send_message(chat_id, text)
             
         elif data == "crypto":
-            text = bot.get_news_by_category("crypto", 5)
-            bot.send_message(chat_id, text)
+            text = await run_db(bot.get_news_by_category, "crypto", 5)
+            await bot.send_message(chat_id, text)
             
         elif data == "stats":
-            text = bot.get_news_stats()
-            bot.send_message(chat_id, text)
+            text = await run_db(bot.get_news_stats)
+            await bot.send_message(chat_id, text)
             
         elif data.startswith("news_"):
             # Обработка выбора конкретной новости
             try:
                 news_id = int(data.split("_")[1])
-                bot.send_news_with_media(chat_id, news_id)
+                await bot.send_news_with_media(chat_id, news_id)
             except (ValueError, IndexError):
-                bot.send_message(chat_id, "❌ Ошибка получения новости")
+                await bot.send_message(chat_id, "❌ Ошибка получения новости")
         
         else:
-            bot.send_message(chat_id, "❓ Неизвестная команда")
+            await bot.send_message(chat_id, "❓ Неизвестная команда")
             
     except Exception as e:
         logger.error(f"Ошибка обработки callback query: {e}")
+        if chat_id:
+            await bot.send_message(chat_id, "❌ Произошла ошибка при обработке запроса")
+        raise
 
 @router.get("/bot-info")
 async def get_bot_info():
     """Получение информации о боте"""
     try:
-        import requests
-        from server.config import TOKEN
-        
-        url = f"https://api.telegram.org/bot{TOKEN}/getMe"
-        response = requests.get(url, timeout=10)
+        bot_info = await bot.get_me()
         
-        if response.status_code == 200:
-            bot_info = response.json()
+        if bot_info is not None:
             return {
                 "status": "ok",
-                "bot_info": bot_info.get("result", {}),
-                "webhook_url": f"{bot_info.get('result', {}).get('username', 'unknown')} bot"
+                "bot_info": bot_info,
+                "webhook_url": f"{bot_info.get('username', 'unknown')} bot"
             }
         else:
             return {
@@ -157,11 +180,11 @@ async def send_news_to_chat(chat_id: int, news_id: int = None):
     try:
         if news_id:
             # Отправка конкретной новости
-            success = bot.send_news_with_media(chat_id, news_id)
+            success = await bot.send_news_with_media(chat_id, news_id)
         else:
             # Отправка сводки новостей
-            text = bot.get_news_summary(3)
-            success = bot.send_message(chat_id, text)
+            text = await run_db(bot.get_news_summary, 3)
+            success = await bot.send_message(chat_id, text)
         
         return {
             "status": "ok" if success else "error",
@@ -174,4 +197,30 @@ async def send_news_to_chat(chat_id: int, news_id: int = None):
         return {
             "status": "error",
             "message": str(e)
-        } 
\ No newline at end of file
+        } 
+
+@router.post("/broadcast-digest")
+async def broadcast_digest(categories: Optional[List[str]] = Query(None)):
+    """
+    Рассылка дайджестов подписчикам. Без categories - во все категории, на которые есть подписчики.
+    Текст каждого дайджеста рендерится один раз; отправка идет в фоне с лимитами Telegram
+    """
+    categories = categories or await run_db(subscribed_categories)
+    unknown = [category for category in categories if category not in DIGEST_CATEGORIES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Неизвестные категории: {', '.join(unknown)}")
+
+    broadcast_ids = await run_db(create_broadcasts, bot, categories)
+    task = asyncio.create_task(broadcast_engine.run_pending())
+    _broadcast_tasks.add(task)
+    task.add_done_callback(_broadcast_tasks.discard)
+
+    return {"status": "ok", "broadcast_ids": broadcast_ids}
+
+@router.get("/broadcasts/{broadcast_id}")
+async def get_broadcast_status(broadcast_id: int):
+    """Прогресс рассылки"""
+    broadcast = await run_db(get_broadcast, broadcast_id)
+    if broadcast is None:
+        raise HTTPException(status_code=404, detail="Рассылка не найдена")
+    return broadcast
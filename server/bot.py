@@ -3,71 +3,128 @@
 Telegram Bot для Gift Propaganda News
 """
 
+import asyncio
 import logging
-import requests
-from typing import Dict, List, Optional
-from server.config import TOKEN, WEBHOOK_URL
+import re
+import aiohttp
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from server.config import (
+    TOKEN, WEBHOOK_URL, TELEGRAM_API_URL, HTTP_TIMEOUT, HTTP_CONNECT_TIMEOUT, HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_KEEPALIVE_TIMEOUT, HTTP_DNS_CACHE_TTL, UPDATE_QUEUE_WORKERS
+)
 from server.db import get_db_session
 from server.db import NewsItem, NewsSource
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from server.utils.media import normalize_media
+from sqlalchemy.orm import Session, joinedload
+from server.services.stats_service import get_category_counts
+from server.services.response_cache import bot_summary_cache
+from server.services.broadcast import DIGEST_CATEGORIES, get_subscriptions, subscribe, unsubscribe
 
 logger = logging.getLogger(__name__)
 
+# Синхронные запросы к базе из обработчиков бота выполняются в отдельном пуле,
+# чтобы не блокировать event loop и остальных воркеров очереди обновлений
+_db_executor = ThreadPoolExecutor(max_workers=UPDATE_QUEUE_WORKERS, thread_name_prefix="bot-db")
+
+
+async def run_db(func: Callable[..., Any], *args) -> Any:
+    """Выполняет синхронную функцию, работающую с базой, в пуле потоков бота"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, func, *args)
+
 class TelegramBot:
     def __init__(self):
         self.token = TOKEN
-        self.base_url = f"https://api.telegram.org/bot{self.token}"
-        
-    def send_message(self, chat_id: int, text: str, parse_mode: str = "HTML") -> bool:
+        self.base_url = f"{TELEGRAM_API_URL}/bot{self.token}"
+        # Общий HTTP клиент для Bot API (создается в start()): keep-alive соединения
+        # переиспользуются, и ответ бота не блокирует event loop
+        self.http_session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        """Создает долгоживущий HTTP клиент. Вызывается из lifespan в server/main.py"""
+        if self.http_session is None or self.http_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL
+            )
+            timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+            self.http_session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self):
+        """Закрывает HTTP клиент и его пул соединений"""
+        if self.http_session and not self.http_session.closed:
+            await self.http_session.close()
+        self.http_session = None
+
+    async def _get_http_session(self) -> aiohttp.ClientSession:
+        """Общий HTTP клиент; создается лениво, если бот используется вне lifespan (скрипты)"""
+        if self.http_session is None or self.http_session.closed:
+            await self.start()
+        return self.http_session
+
+    async def request(self, method: str, data: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """Вызов метода Bot API: HTTP статус и тело ответа (при 429 в нем parameters.retry_after)"""
+        session = await self._get_http_session()
+        async with session.post(f"{self.base_url}/{method}", json=data) as response:
+            try:
+                payload = await response.json(content_type=None)
+            except ValueError:
+                payload = {}
+            return response.status, payload or {}
+
+    async def _call(self, method: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Вызов метода Bot API. Возвращает ответ Telegram или None, если запрос не удался"""
+        status, payload = await self.request(method, data)
+        if status != 200:
+            logger.warning(f"Telegram {method} вернул {status}: {payload.get('description')}")
+            return None
+        return payload
+
+    async def send_message(self, chat_id: int, text: str, parse_mode: str = "HTML") -> bool:
         """Отправка сообщения в Telegram"""
         try:
-            url = f"{self.base_url}/sendMessage"
             data = {
                 "chat_id": chat_id,
                 "text": text,
                 "parse_mode": parse_mode
             }
-            response = requests.post(url, json=data, timeout=10)
-            return response.status_code == 200
+            return await self._call("sendMessage", data) is not None
         except Exception as e:
             logger.error(f"Ошибка отправки сообщения: {e}")
             return False
     
-    def send_photo(self, chat_id: int, photo_url: str, caption: str = "", parse_mode: str = "HTML") -> bool:
+    async def send_photo(self, chat_id: int, photo_url: str, caption: str = "", parse_mode: str = "HTML") -> bool:
         """Отправка фото в Telegram"""
         try:
-            url = f"{self.base_url}/sendPhoto"
             data = {
                 "chat_id": chat_id,
                 "photo": photo_url,
                 "caption": caption,
                 "parse_mode": parse_mode
             }
-            response = requests.post(url, json=data, timeout=10)
-            return response.status_code == 200
+            return await self._call("sendPhoto", data) is not None
         except Exception as e:
             logger.error(f"Ошибка отправки фото: {e}")
             return False
     
-    def send_media_group(self, chat_id: int, media: List[Dict]) -> bool:
+    async def send_media_group(self, chat_id: int, media: List[Dict]) -> bool:
         """Отправка группы медиа в Telegram"""
         try:
-            url = f"{self.base_url}/sendMediaGroup"
             data = {
                 "chat_id": chat_id,
                 "media": media
             }
-            response = requests.post(url, json=data, timeout=10)
-            return response.status_code == 200
+            return await self._call("sendMediaGroup", data) is not None
         except Exception as e:
             logger.error(f"Ошибка отправки медиа группы: {e}")
             return False
     
-    def send_inline_keyboard(self, chat_id: int, text: str, keyboard: List[List[Dict]]) -> bool:
+    async def send_inline_keyboard(self, chat_id: int, text: str, keyboard: List[List[Dict]]) -> bool:
         """Отправка сообщения с inline клавиатурой"""
         try:
-            url = f"{self.base_url}/sendMessage"
             data = {
                 "chat_id": chat_id,
                 "text": text,
@@ -76,137 +133,152 @@ class TelegramBot:
                     "inline_keyboard": keyboard
                 }
             }
-            response = requests.post(url, json=data, timeout=10)
-            return response.status_code == 200
+            return await self._call("sendMessage", data) is not None
         except Exception as e:
             logger.error(f"Ошибка отправки клавиатуры: {e}")
             return False
+
+    async def set_webhook(self, url: str) -> bool:
+        """Регистрация webhook бота"""
+        try:
+            return await self._call("setWebhook", {"url": url}) is not None
+        except Exception as e:
+            logger.error(f"Ошибка при установке webhook: {e}")
+            return False
+
+    async def get_me(self) -> Optional[Dict[str, Any]]:
+        """Информация о боте (getMe)"""
+        response = await self._call("getMe", {})
+        return response.get("result", {}) if response else None
     
+    def _cached_render(self, category: str, limit: int, render: Callable[[List[NewsItem]], str]) -> str:
+        """
+        Готовый текст сводки из кэша по (категория, limit). Кэш сбрасывается, когда ingest
+        сохраняет новые новости; при промахе - один запрос с источниками через JOIN
+        """
+        key = (category, limit)
+        text = bot_summary_cache.get(key)
+        if text is None:
+            with get_db_session() as session:
+                query = session.query(NewsItem).options(joinedload(NewsItem.source))
+                if category != 'all':
+                    query = query.filter(NewsItem.category == category)
+                news_items = query.order_by(NewsItem.publish_date.desc()).limit(limit).all()
+                text = render(news_items)
+            bot_summary_cache.set(key, text)
+        return text
+
     def get_news_summary(self, limit: int = 5) -> str:
         """Получение сводки новостей"""
-        try:
-            with get_db_session() as session:
-                news_items = session.query(NewsItem).order_by(NewsItem.publish_date.desc()).limit(limit).all()
-                
-                if not news_items:
-                    return "📰 Новостей пока нет"
-                
-                summary = f"📰 <b>Последние {len(news_items)} новостей:</b>\n\n"
-                
-                for i, news in enumerate(news_items, 1):
-                    # Ограничиваем длину заголовка
-                    title = news.title[:50] + "..." if len(news.title) > 50 else news.title
-                    source = news.source.name if news.source else "Unknown"
-                    category = news.category or "general"
-                    
-                    summary += f"{i}. <b>{title}</b>\n"
-                    summary += f"   📍 {source} | #{category}\n"
-                    summary += f"   📅 {news.publish_date.strftime('%d.%m.%Y %H:%M')}\n\n"
-                
-                return summary
-        except Exception as e:
-            logger.error(f"Ошибка получения сводки новостей: {e}")
-            return "❌ Ошибка получения новостей"
+        def render(news_items: List[NewsItem]) -> str:
+            if not news_items:
+                return "📰 Новостей пока нет"
+
+            lines = [f"📰 <b>Последние {len(news_items)} новостей:</b>\n"]
+            for i, news in enumerate(news_items, 1):
+                # Ограничиваем длину заголовка
+                title = news.title[:50] + "..." if len(news.title) > 50 else news.title
+                source = news.source.name if news.source else "Unknown"
+                category = news.category or "general"
+
+                lines.append(f"{i}. <b>{title}</b>")
+                lines.append(f"   📍 {source} | #{category}")
+                lines.append(f"   📅 {news.publish_date.strftime('%d.%m.%Y %H:%M')}\n")
+            return "\n".join(lines) + "\n"
+
+        return self._cached_render('all', limit, render)
     
     def get_news_by_category(self, category: str, limit: int = 5) -> str:
         """Получение новостей по категории"""
-        try:
-            with get_db_session() as session:
-                news_items = session.query(NewsItem).filter(
-                    NewsItem.category == category
-                ).order_by(NewsItem.publish_date.desc()).limit(limit).all()
-                
-                if not news_items:
-                    return f"📰 Новостей в категории #{category} пока нет"
-                
-                summary = f"📰 <b>Новости #{category}:</b>\n\n"
-                
-                for i, news in enumerate(news_items, 1):
-                    title = news.title[:50] + "..." if len(news.title) > 50 else news.title
-                    source = news.source.name if news.source else "Unknown"
-                    
-                    summary += f"{i}. <b>{title}</b>\n"
-                    summary += f"   📍 {source}\n"
-                    summary += f"   📅 {news.publish_date.strftime('%d.%m.%Y %H:%M')}\n\n"
-                
-                return summary
-        except Exception as e:
-            logger.error(f"Ошибка получения новостей по категории: {e}")
-            return f"❌ Ошибка получения новостей #{category}"
+        def render(news_items: List[NewsItem]) -> str:
+            if not news_items:
+                return f"📰 Новостей в категории #{category} пока нет"
+
+            lines = [f"📰 <b>Новости #{category}:</b>\n"]
+            for i, news in enumerate(news_items, 1):
+                title = news.title[:50] + "..." if len(news.title) > 50 else news.title
+                source = news.source.name if news.source else "Unknown"
+
+                lines.append(f"{i}. <b>{title}</b>")
+                lines.append(f"   📍 {source}")
+                lines.append(f"   📅 {news.publish_date.strftime('%d.%m.%Y %H:%M')}\n")
+            return "\n".join(lines) + "\n"
+
+        return self._cached_render(category, limit, render)
     
     def get_news_stats(self) -> str:
         """Получение статистики новостей"""
-        try:
-            with get_db_session() as session:
-                total_news = session.query(NewsItem).count()
-                
-                # Статистика по категориям
-                categories = session.query(NewsItem.category, func.count(NewsItem.id)).group_by(NewsItem.category).all()
-                
-                stats = f"📊 <b>Статистика новостей:</b>\n\n"
-                stats += f"📰 Всего новостей: <b>{total_news}</b>\n\n"
-                
-                if categories:
-                    stats += "📈 По категориям:\n"
-                    for category, count in categories:
-                        if category:
-                            stats += f"   #{category}: <b>{count}</b>\n"
-                
-                # Последние источники
-                recent_sources = session.query(NewsSource).filter(NewsSource.is_active == True).limit(5).all()
-                if recent_sources:
-                    stats += f"\n📡 Активные источники: <b>{len(recent_sources)}</b>\n"
-                    for source in recent_sources:
-                        stats += f"   • {source.name}\n"
-                
-                return stats
-        except Exception as e:
-            logger.error(f"Ошибка получения статистики: {e}")
-            return "❌ Ошибка получения статистики"
-    
-    def send_news_with_media(self, chat_id: int, news_id: int) -> bool:
-        """Отправка конкретной новости с медиа"""
-        try:
-            with get_db_session() as session:
-                news = session.query(NewsItem).filter(NewsItem.id == news_id).first()
-                
-                if not news:
-                    self.send_message(chat_id, "❌ Новость не найдена")
-                    return False
-                
-                # Формируем текст новости
-                text = f"📰 <b>{news.title}</b>\n\n"
-                
-                if news.content_html:
-                    # Убираем HTML теги для Telegram
-                    import re
-                    clean_content = re.sub(r'<[^>]+>', '', news.content_html)
-                    text += f"{clean_content[:500]}...\n\n" if len(clean_content) > 500 else f"{clean_content}\n\n"
-                elif news.content:
-                    text += f"{news.content[:500]}...\n\n" if len(news.content) > 500 else f"{news.content}\n\n"
-                
-                text += f"📍 Источник: {news.source.name if news.source else 'Unknown'}\n"
-                text += f"📅 Дата: {news.publish_date.strftime('%d.%m.%Y %H:%M')}\n"
-                text += f"🏷️ Категория: #{news.category or 'general'}\n"
-                
-                if news.link:
-                    text += f"🔗 <a href='{news.link}'>Читать полностью</a>"
-                
-                # Если есть медиа, отправляем с фото
-                if news.media and isinstance(news.media, list) and len(news.media) > 0:
-                    media_item = news.media[0]
-                    if media_item.get('type') == 'photo' and media_item.get('url'):
-                        return self.send_photo(chat_id, media_item['url'], text)
-                
-                # Иначе отправляем просто текст
-                return self.send_message(chat_id, text)
-                
-        except Exception as e:
-            logger.error(f"Ошибка отправки новости: {e}")
+        with get_db_session() as session:
+            # Статистика по категориям - общие с API счетчики
+            categories = get_category_counts(session)
+            total_news = sum(categories.values())
+
+            stats = f"📊 <b>Статистика новостей:</b>\n\n"
+            stats += f"📰 Всего новостей: <b>{total_news}</b>\n\n"
+
+            if categories:
+                stats += "📈 По категориям:\n"
+                for category, count in categories.items():
+                    stats += f"   #{category}: <b>{count}</b>\n"
+
+            # Последние источники
+            recent_sources = session.query(NewsSource).filter(NewsSource.is_active == True).limit(5).all()
+            if recent_sources:
+                stats += f"\n📡 Активные источники: <b>{len(recent_sources)}</b>\n"
+                for source in recent_sources:
+                    stats += f"   • {source.name}\n"
+
+            return stats
+
+    def get_news_message(self, news_id: int) -> Optional[Tuple[str, Optional[str]]]:
+        """Текст новости для чата и url фото (если есть); None - новость не найдена"""
+        with get_db_session() as session:
+            news = session.query(NewsItem).options(joinedload(NewsItem.source)).filter(NewsItem.id == news_id).first()
+            if not news:
+                return None
+
+            # Формируем текст новости
+            text = f"📰 <b>{news.title}</b>\n\n"
+
+            if news.content_html:
+                # Убираем HTML теги для Telegram
+                clean_content = re.sub(r'<[^>]+>', '', news.content_html)
+                text += f"{clean_content[:500]}...\n\n" if len(clean_content) > 500 else f"{clean_content}\n\n"
+            elif news.content:
+                text += f"{news.content[:500]}...\n\n" if len(news.content) > 500 else f"{news.content}\n\n"
+
+            text += f"📍 Источник: {news.source.name if news.source else 'Unknown'}\n"
+            text += f"📅 Дата: {news.publish_date.strftime('%d.%m.%Y %H:%M')}\n"
+            text += f"🏷️ Категория: #{news.category or 'general'}\n"
+
+            if news.link:
+                text += f"🔗 <a href='{news.link}'>Читать полностью</a>"
+
+            media_list = normalize_media(news.media, news.image_url, news.video_url)
+            photo_url = None
+            if media_list and media_list[0]['type'] == 'photo' and media_list[0]['url']:
+                photo_url = media_list[0]['url']
+            return text, photo_url
+
+    async def send_news_with_media(self, chat_id: int, news_id: int) -> bool:
+        """Отправка конкретной новости с медиа. Ошибки базы пробрасываются вызывающему"""
+        message = await run_db(self.get_news_message, news_id)
+        if message is None:
+            await self.send_message(chat_id, "❌ Новость не найдена")
             return False
-    
-    def handle_command(self, chat_id: int, command: str, args: List[str] = None) -> bool:
-        """Обработка команд бота"""
+
+        text, photo_url = message
+        # Если есть фото, отправляем с ним, иначе просто текст
+        if photo_url:
+            return await self.send_photo(chat_id, photo_url, text)
+        return await self.send_message(chat_id, text)
+
+    async def handle_command(self, chat_id: int, command: str, args: List[str] = None) -> bool:
+        """
+        Обработка команд бота. Запросы к базе выполняются в пуле потоков (run_db).
+        При ошибке пользователь получает сообщение о ней, а исключение пробрасывается
+        дальше - воркер очереди обновлений учитывает его в метриках
+        """
         try:
             if command == "/start":
                 welcome_text = """
@@ -220,6 +292,7 @@ class TelegramBot:
 /nft - Новости NFT
 /crypto - Крипто новости
 /stats - Статистика
+/subscribe - Подписаться на дайджест
 /help - Помощь
 
 Нажмите на кнопки ниже для быстрого доступа к новостям!
@@ -229,24 +302,45 @@ class TelegramBot:
                     [{"text": "🖼️ NFT", "callback_data": "nft"}, {"text": "₿ Крипто", "callback_data": "crypto"}],
                     [{"text": "📊 Статистика", "callback_data": "stats"}]
                 ]
-                return self.send_inline_keyboard(chat_id, welcome_text, keyboard)
+                return await self.send_inline_keyboard(chat_id, welcome_text, keyboard)
             
             elif command == "/news":
-                text = self.get_news_summary(5)
-                return self.send_message(chat_id, text)
+                text = await run_db(self.get_news_summary, 5)
+                return await self.send_message(chat_id, text)
             
             elif command == "/nft":
-                text = self.get_news_by_category("nft", 5)
-                return self.send_message(chat_id, text)
+                text = await run_db(self.get_news_by_category, "nft", 5)
+                return await self.send_message(chat_id, text)
             
             elif command == "/crypto":
-                text = self.get_news_by_category("crypto", 5)
-                return self.send_message(chat_id, text)
+                text = await run_db(self.get_news_by_category, "crypto", 5)
+                return await self.send_message(chat_id, text)
             
             elif command == "/stats":
-                text = self.get_news_stats()
-                return self.send_message(chat_id, text)
+                text = await run_db(self.get_news_stats)
+                return await self.send_message(chat_id, text)
             
+            elif command == "/subscribe":
+                category = args[0].lstrip('#').lower() if args else 'all'
+                if category not in DIGEST_CATEGORIES:
+                    return await self.send_message(chat_id, f"❓ Неизвестная категория. Доступны: {', '.join(DIGEST_CATEGORIES)}")
+                if await run_db(subscribe, chat_id, category):
+                    return await self.send_message(chat_id, f"✅ Вы подписались на дайджест #{category}")
+                return await self.send_message(chat_id, f"ℹ️ Вы уже подписаны на дайджест #{category}")
+
+            elif command == "/unsubscribe":
+                category = args[0].lstrip('#').lower() if args else None
+                removed = await run_db(unsubscribe, chat_id, category)
+                if removed:
+                    return await self.send_message(chat_id, "✅ Подписка отменена")
+                return await self.send_message(chat_id, "ℹ️ Подписок не найдено")
+
+            elif command == "/subscriptions":
+                categories = await run_db(get_subscriptions, chat_id)
+                if not categories:
+                    return await self.send_message(chat_id, "ℹ️ Подписок нет. Используйте /subscribe [категория]")
+                return await self.send_message(chat_id, "📬 Ваши подписки: " + ", ".join(f"#{category}" for category in categories))
+
             elif command == "/help":
                 help_text = """
 ❓ <b>Помощь по использованию бота</b>
@@ -256,6 +350,9 @@ class TelegramBot:
 /nft - Новости из категории NFT
 /crypto - Криптовалютные новости
 /stats - Статистика новостей
+/subscribe [категория] - Дайджест категории (без категории - общая сводка)
+/unsubscribe [категория] - Отменить подписку (без категории - все)
+/subscriptions - Ваши подписки
 
 <b>Автоматические обновления:</b>
 Бот проверяет новые посты каждые 5 минут и автоматически добавляет их в базу данных.
@@ -266,14 +363,15 @@ class TelegramBot:
 
 По всем вопросам обращайтесь к администратору.
 """
-                return self.send_message(chat_id, help_text)
+                return await self.send_message(chat_id, help_text)
             
             else:
-                return self.send_message(chat_id, "❓ Неизвестная команда. Используйте /help для справки.")
+                return await self.send_message(chat_id, "❓ Неизвестная команда. Используйте /help для справки.")
                 
         except Exception as e:
             logger.error(f"Ошибка обработки команды: {e}")
-            return self.send_message(chat_id, "❌ Произошла ошибка при обработке команды")
+            await self.send_message(chat_id, "❌ Произошла ошибка при обработке команды")
+            raise
 
 # Создаем глобальный экземпляр бота
 bot = TelegramBot() 
\ No newline at end of file
@@ -13,6 +13,73 @@ WEBHOOK_URL = os.getenv("WEBHOOK_URL", "https://t-minigames.onrender.com")
 # Настройки Redis (если используется)
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 
+# Настройки HTTP клиента для загрузки источников (Telegram, RSS)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))  # общий таймаут запроса, сек
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))  # всего соединений в пуле
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "4"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "60"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+
+# Потоки для разбора RSS (feedparser блокирующий, поэтому выполняется вне event loop)
+FEED_PARSER_WORKERS = int(os.getenv("FEED_PARSER_WORKERS", "2"))
+
+# Параллельная загрузка источников в цикле обновления
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "8"))  # одновременно загружаемых источников
+INGEST_SOURCE_TIMEOUT = float(os.getenv("INGEST_SOURCE_TIMEOUT", "15"))  # лимит на один источник, сек
+
+# Догрузка пропущенных сообщений Telegram (?before=) после простоя: максимум страниц за цикл
+TELEGRAM_GAP_MAX_PAGES = int(os.getenv("TELEGRAM_GAP_MAX_PAGES", "5"))
+
+# Загрузка истории Telegram каналов (scripts/backfill_telegram.py)
+TELEGRAM_BACKFILL_CONCURRENCY = int(os.getenv("TELEGRAM_BACKFILL_CONCURRENCY", "2"))  # страниц одновременно
+TELEGRAM_BACKFILL_RATE = float(os.getenv("TELEGRAM_BACKFILL_RATE", "1"))  # запросов к t.me в секунду
+TELEGRAM_BACKFILL_PAGE_SIZE = 20  # сообщений на странице t.me/s/
+
+# Адаптивный планировщик обновления источников (server/services/scheduler.py):
+# границы интервала опроса по типу источника, сек. Новый источник опрашивается раз в SCHEDULER_INITIAL_INTERVAL
+SCHEDULER_INITIAL_INTERVAL = float(os.getenv("SCHEDULER_INITIAL_INTERVAL", "300"))
+SCHEDULER_INTERVALS = {
+    'telegram': (float(os.getenv("SCHEDULER_TELEGRAM_MIN_INTERVAL", "60")), float(os.getenv("SCHEDULER_TELEGRAM_MAX_INTERVAL", "1800"))),
+    'rss': (float(os.getenv("SCHEDULER_RSS_MIN_INTERVAL", "180")), float(os.getenv("SCHEDULER_RSS_MAX_INTERVAL", "3600"))),
+}
+
+# Circuit breaker источников: после стольких ошибок подряд источник не загружается BREAKER_RESET_TIMEOUT сек
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "600"))
+
+# Мок посты вместо недоступного канала - только для локальной разработки, в ingest они не попадают никогда
+ALLOW_MOCK_DATA = os.getenv("ALLOW_MOCK_DATA", "False").lower() == "true"
+
+# Очередь обновлений Telegram webhook (server/services/update_queue.py)
+UPDATE_QUEUE_WORKERS = int(os.getenv("UPDATE_QUEUE_WORKERS", "4"))
+UPDATE_QUEUE_MAXSIZE = int(os.getenv("UPDATE_QUEUE_MAXSIZE", "1000"))  # при заполнении webhook отвечает 503
+UPDATE_DEDUP_SIZE = int(os.getenv("UPDATE_DEDUP_SIZE", "10000"))  # сколько последних update_id помнить
+
+# Bot API: базовый URL можно заменить на локальный stub (scripts/stub_bot_api.py)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
+
+# Рассылка дайджестов подписчикам: лимиты Telegram - около 30 сообщений в секунду всего
+# и не больше 1 сообщения в секунду в один чат
+BROADCAST_GLOBAL_RATE = float(os.getenv("BROADCAST_GLOBAL_RATE", "25"))
+BROADCAST_PER_CHAT_INTERVAL = float(os.getenv("BROADCAST_PER_CHAT_INTERVAL", "1"))
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "10"))  # одновременных запросов к Bot API
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "100"))  # подписчиков между сохранениями прогресса
+BROADCAST_MAX_ATTEMPTS = 3  # попыток на чат при 429 и сетевых ошибках
+BROADCAST_RETRY_DELAY = float(os.getenv("BROADCAST_RETRY_DELAY", "1"))  # пауза перед повтором после сетевой ошибки, удваивается
+
+# Поиск почти-дубликатов (SimHash): сколько последних новостей держать в индексе
+NEAR_DUPLICATE_INDEX_SIZE = int(os.getenv("NEAR_DUPLICATE_INDEX_SIZE", "5000"))
+
+# Кэш ответов /api/news/ и сводок бота (server/services/response_cache.py): in-process,
+# поэтому изменения из других воркеров и скриптов видны не позже чем через TTL
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "60"))  # секунд
+
+# Полнотекстовый поиск: сколько самых свежих совпадений ранжировать на запрос
+SEARCH_CANDIDATE_LIMIT = int(os.getenv("SEARCH_CANDIDATE_LIMIT", "500"))
+# PostgreSQL: среди скольких самых свежих новостей сначала искать совпадения
+SEARCH_RECENT_WINDOW = int(os.getenv("SEARCH_RECENT_WINDOW", "3000"))
+
 # Другие настройки
 DEBUG = os.getenv("DEBUG", "True").lower() == "true"
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
@@ -1,25 +1,35 @@
 # server/db.py
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, JSON, ForeignKey, text
+from sqlalchemy import create_engine, Column, Integer, BigInteger, String, Text, DateTime, Boolean, JSON, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session, relationship
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from datetime import datetime
+from typing import AsyncIterator, Callable
+import logging
 import os
+import threading
+
+logger = logging.getLogger(__name__)
 
 # Получаем URL базы данных из переменных окружения
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./giftpropaganda.db")
 
-# Создаем движок базы данных
-if DATABASE_URL.startswith("sqlite"):
-    # Для SQLite не нужны SSL параметры
-    engine = create_engine(
-        DATABASE_URL,
-        echo=False,
-        connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-    )
-else:
+# Версия схемы, которую ожидает код. Увеличивается вместе с каждой миграцией в server/main.py
+SCHEMA_VERSION = 15
+
+
+def _create_engine():
+    """Создает движок базы данных. Вызывается один раз на процесс"""
+    if DATABASE_URL.startswith("sqlite"):
+        # Для SQLite не нужны SSL параметры
+        return create_engine(
+            DATABASE_URL,
+            echo=False,
+            connect_args={"check_same_thread": False}
+        )
     # Для PostgreSQL используем SSL
-    engine = create_engine(
+    return create_engine(
         DATABASE_URL,
         connect_args={"sslmode": "require"},
         echo=False,
@@ -28,8 +38,42 @@ else:
         pool_reset_on_return='commit'
     )
 
+
+def _async_database_url(url: str) -> str:
+    """Подставляет асинхронный драйвер: aiosqlite для SQLite, asyncpg для PostgreSQL"""
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    return url
+
+
+ASYNC_DATABASE_URL = _async_database_url(DATABASE_URL)
+
+
+def _create_async_engine():
+    """Создает асинхронный движок для обработчиков FastAPI"""
+    if ASYNC_DATABASE_URL.startswith("sqlite"):
+        return create_async_engine(ASYNC_DATABASE_URL, echo=False)
+    # asyncpg принимает ssl вместо sslmode
+    return create_async_engine(
+        ASYNC_DATABASE_URL,
+        connect_args={"ssl": "require"},
+        echo=False,
+        pool_pre_ping=True,
+        pool_recycle=300
+    )
+
+
+# Единый движок и пул соединений на весь процесс
+engine = _create_engine()
+async_engine = _create_async_engine()
+
 # Сессии
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 
@@ -42,6 +86,23 @@ class NewsSource(Base):
     category = Column(String(100))
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Валидаторы условных запросов: пропускаем разбор, если источник не изменился
+    etag = Column(String(500), nullable=True)
+    last_modified = Column(String(100), nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    # Номер последнего обработанного сообщения Telegram (из data-post): разбираются только более новые
+    last_message_id = Column(Integer, nullable=True)
+    # Здоровье источника и circuit breaker (server/services/source_health.py)
+    breaker_state = Column(String(20), default='closed')  # closed | open | half_open
+    consecutive_failures = Column(Integer, default=0)
+    breaker_opened_at = Column(DateTime, nullable=True)
+    last_latency_ms = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+    last_success_at = Column(DateTime, nullable=True)
+    last_failure_at = Column(DateTime, nullable=True)
+    # Время изменения настроек источника (url, категория, is_active). Реестр источников
+    # перечитывает таблицу, когда меняется max(updated_at), поэтому служебные поля выше его не трогают
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
 
 class NewsItem(Base):
@@ -61,20 +122,88 @@ class NewsItem(Base):
     views_count = Column(Integer, default=0)
     author = Column(String(200), nullable=True)
     subtitle = Column(String(500), nullable=True)
+    content_hash = Column(String(64), nullable=True)  # Естественный ключ для дедупликации (server.utils.dedup)
+    simhash = Column(BigInteger, nullable=True)  # SimHash заголовка и лида (server.utils.simhash), знаковый
+    duplicate_of = Column(Integer, ForeignKey('news_items.id', ondelete='SET NULL'), nullable=True)  # Первая новость истории
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     source = relationship("NewsSource")  # Для удобного доступа
 
+    # Составные индексы под keyset-пагинацию (publish_date DESC, id DESC)
+    __table_args__ = (
+        Index('ix_news_items_publish_date_id', 'publish_date', 'id'),
+        Index('ix_news_items_category_publish_date_id', 'category', 'publish_date', 'id'),
+        # Дедупликация при ingest - проба по уникальному индексу (ON CONFLICT)
+        Index('ix_news_items_content_hash', 'content_hash', unique=True),
+    )
+
+
+
+class NewsCategoryCounter(Base):
+    """Поддерживаемый при ingest счётчик новостей по категориям (для /stats и total)"""
+    __tablename__ = 'news_category_counters'
+    category = Column(String(100), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class TelegramBackfillCheckpoint(Base):
+    """Прогресс загрузки истории Telegram канала (server/services/telegram_backfill.py)"""
+    __tablename__ = 'telegram_backfill_checkpoints'
+    channel = Column(String(255), primary_key=True)
+    next_before = Column(Integer, nullable=True)  # Следующая страница ?before=; NULL - еще не начата
+    status = Column(String(20), nullable=False, default='running')  # running / paused / done / failed
+    pages_done = Column(Integer, nullable=False, default=0)
+    posts_saved = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class BotSubscription(Base):
+    """Подписка чата на дайджест категории ('all' - общая сводка)"""
+    __tablename__ = 'bot_subscriptions'
+    chat_id = Column(BigInteger, primary_key=True)
+    category = Column(String(100), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class Broadcast(Base):
+    """Рассылка дайджеста подписчикам категории (server/services/broadcast.py)"""
+    __tablename__ = 'broadcasts'
+    id = Column(Integer, primary_key=True)
+    category = Column(String(100), nullable=False)
+    text = Column(Text, nullable=False)  # Текст дайджеста рендерится один раз на рассылку
+    status = Column(String(20), nullable=False, default='pending')  # pending / running / done / failed
+    # Подписчики обходятся по возрастанию chat_id; last_chat_id - позиция для продолжения после перезапуска
+    last_chat_id = Column(BigInteger, nullable=True)
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class SchemaVersion(Base):
+    __tablename__ = 'schema_version'
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+
 def get_db() -> Session:
     db = SessionLocal()
     try:
-        # Принудительно обновляем метаданные при каждом запросе
-        db.execute(text("SELECT 1"))
         yield db
     finally:
         db.close()
 
 
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Асинхронная сессия для обработчиков FastAPI - запросы не блокируют event loop"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def create_tables():
     Base.metadata.create_all(bind=engine)
 
@@ -87,38 +216,50 @@ def refresh_metadata():
     Base.metadata.reflect(bind=engine)
     print("Метаданные SQLAlchemy обновлены")
 
-# Принудительно обновляем метаданные при импорте
-try:
-    refresh_metadata()
-except Exception as e:
-    print(f"Ошибка при обновлении метаданных: {e}")
 
-# Пересоздаем движок с обновленными метаданными
-def recreate_engine():
-    """Пересоздает движок базы данных с обновленными метаданными"""
-    global engine, SessionLocal
-    if DATABASE_URL.startswith("sqlite"):
-        engine = create_engine(
-            DATABASE_URL,
-            echo=False,
-            connect_args={"check_same_thread": False}
-        )
-    else:
-        engine = create_engine(
-            DATABASE_URL,
-            connect_args={"sslmode": "require"},
-            echo=False,
-            pool_pre_ping=True,
-            pool_recycle=300,
-            pool_reset_on_return='commit'
-        )
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_schema_lock = threading.Lock()
+_schema_checked = False
+
+
+def get_schema_version() -> int:
+    """Возвращает версию схемы, записанную в базе (0, если записи нет)"""
+    with get_db_session() as session:
+        row = session.query(SchemaVersion).order_by(SchemaVersion.version.desc()).first()
+        return row.version if row else 0
+
+
+def on_schema_migrated(version: int = SCHEMA_VERSION):
+    """
+    Событие миграции: фиксирует новую версию схемы и обновляет метаданные.
+    Это единственное место, где выполняется reflect.
+    """
+    with get_db_session() as session:
+        session.add(SchemaVersion(version=version))
+        session.commit()
     refresh_metadata()
-    return engine
+    logger.info(f"Схема базы данных обновлена до версии {version}")
 
-# Пересоздаем модель с обновленными метаданными
-def recreate_models():
-    """Пересоздает модели с обновленными метаданными"""
-    global NewsItem, NewsSource
-    Base.metadata.reflect(bind=engine)
-    return NewsItem, NewsSource
+
+def ensure_schema(migrate: Callable[[], bool]):
+    """
+    Проверяет версию схемы один раз за процесс.
+    Миграции и обновление метаданных запускаются, только если база отстает от SCHEMA_VERSION.
+    Версия записывается, только если migrate вернул True: неудавшаяся миграция
+    повторится при следующем запуске, а не будет отмечена выполненной.
+    """
+    global _schema_checked
+    with _schema_lock:
+        if _schema_checked:
+            return
+
+        current_version = get_schema_version()
+        if current_version < SCHEMA_VERSION:
+            logger.info(f"Версия схемы {current_version} < {SCHEMA_VERSION}, применяем миграции")
+            if migrate():
+                on_schema_migrated(SCHEMA_VERSION)
+            else:
+                logger.error(f"Миграции до версии {SCHEMA_VERSION} выполнены с ошибками, версия схемы не обновлена")
+        else:
+            logger.info(f"Схема базы данных актуальна (версия {current_version})")
+
+        _schema_checked = True
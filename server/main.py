@@ -4,14 +4,21 @@ import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import inspect, text
 import time
 
 # Исправленные импорты
-from server.db import Base, NewsItem, NewsSource, engine, SessionLocal, create_tables, recreate_engine
+from server.db import engine, async_engine, create_tables, ensure_schema, get_db_session
+from server.services.stats_service import rebuild_category_counters
+from server.services.news_service import backfill_content_hashes
+from server.services.story_clusters import backfill_story_clusters
 from server.parsers.telegram_news_service import TelegramNewsService
-from server.config import TOKEN, WEBHOOK_URL
+from server.services.telegram_backfill import resume_backfills
+from server.services.scheduler import AdaptiveScheduler
+from server.services.source_registry import register_default_sources
+from server.services.search_service import backfill_search_index, create_search_index
+from server.bot import bot
+from server.config import WEBHOOK_URL
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -32,10 +39,6 @@ def init_db():
     max_attempts = 10
     for attempt in range(1, max_attempts + 1):
         try:
-            # Пересоздаем движок с обновленными метаданными
-            global engine, SessionLocal
-            engine = recreate_engine()
-            
             # Проверяем подключение
             with engine.connect() as connection:
                 logger.info("Успешное подключение к базе данных")
@@ -54,57 +57,163 @@ def init_db():
 
     raise Exception("Не удалось подключиться к базе данных после нескольких попыток")
 
-def apply_migrations():
-    """Применяет миграции базы данных"""
+def apply_migrations() -> bool:
+    """
+    Применяет миграции базы данных. Ошибки не прерывают запуск приложения,
+    но возвращается False - тогда версия схемы не записывается и миграции
+    повторятся при следующем запуске
+    """
+    success = True
     try:
         logger.info("Проверка и применение миграций...")
 
         with engine.connect() as connection:
-            # Проверяем, существуют ли новые поля
-            result = connection.execute(text("""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_name = 'news_items' 
-                AND column_name IN (
-                    'image_url', 'video_url', 'reading_time', 'views_count', 
-                    'author', 'subtitle', 'created_at', 'updated_at', 'content_html'
-                )
-            """))
-
-            existing_columns = [row[0] for row in result.fetchall()]
-            logger.info(f"Существующие новые поля: {existing_columns}")
-
-            # Добавляем поля, которых еще нет
-            fields_to_add = [
-                ('image_url', 'VARCHAR(1000)'),
-                ('video_url', 'VARCHAR(1000)'),
-                ('reading_time', 'INTEGER'),
-                ('views_count', 'INTEGER'),
-                ('author', 'VARCHAR(200)'),
-                ('subtitle', 'VARCHAR(500)'),
-                ('created_at', 'TIMESTAMP DEFAULT NOW()'),
-                ('updated_at', 'TIMESTAMP DEFAULT NOW()'),
-                ('content_html', 'TEXT')
-            ]
-
-            for field_name, field_type in fields_to_add:
-                if field_name not in existing_columns:
-                    logger.info(f"Добавляем поле {field_name}...")
-                    connection.execute(text(f"""
-                        ALTER TABLE news_items 
-                        ADD COLUMN {field_name} {field_type}
-                    """))
-                    connection.commit()
-                    logger.info(f"Поле {field_name} добавлено успешно")
-                else:
-                    logger.info(f"Поле {field_name} уже существует")
+            # Поля, которых может не быть в уже созданных таблицах
+            fields_to_add = {
+                'news_items': [
+                    ('image_url', 'VARCHAR(1000)'),
+                    ('video_url', 'VARCHAR(1000)'),
+                    ('reading_time', 'INTEGER'),
+                    ('views_count', 'INTEGER'),
+                    ('author', 'VARCHAR(200)'),
+                    ('subtitle', 'VARCHAR(500)'),
+                    ('created_at', 'TIMESTAMP DEFAULT NOW()'),
+                    ('updated_at', 'TIMESTAMP DEFAULT NOW()'),
+                    ('content_html', 'TEXT'),
+                    ('content_hash', 'VARCHAR(64)'),
+                    ('simhash', 'BIGINT'),
+                    ('duplicate_of', 'INTEGER REFERENCES news_items(id) ON DELETE SET NULL')
+                ],
+                'news_sources': [
+                    ('etag', 'VARCHAR(500)'),
+                    ('last_modified', 'VARCHAR(100)'),
+                    ('content_hash', 'VARCHAR(64)'),
+                    ('last_message_id', 'INTEGER'),
+                    ('breaker_state', "VARCHAR(20) DEFAULT 'closed'"),
+                    ('consecutive_failures', 'INTEGER DEFAULT 0'),
+                    ('breaker_opened_at', 'TIMESTAMP'),
+                    ('last_latency_ms', 'INTEGER'),
+                    ('last_error', 'TEXT'),
+                    ('last_success_at', 'TIMESTAMP'),
+                    ('last_failure_at', 'TIMESTAMP'),
+                    ('updated_at', 'TIMESTAMP')
+                ]
+            }
+
+            for table_name, fields in fields_to_add.items():
+                # Проверяем, существуют ли новые поля
+                existing_columns = [column['name'] for column in inspect(connection).get_columns(table_name)]
+                logger.info(f"Существующие поля {table_name}: {existing_columns}")
+
+                for field_name, field_type in fields:
+                    if field_name not in existing_columns:
+                        logger.info(f"Добавляем поле {table_name}.{field_name}...")
+                        connection.execute(text(f"""
+                            ALTER TABLE {table_name} 
+                            ADD COLUMN {field_name} {field_type}
+                        """))
+                        connection.commit()
+                        logger.info(f"Поле {field_name} добавлено успешно")
+                    else:
+                        logger.info(f"Поле {field_name} уже существует")
 
             logger.info("Миграции применены успешно!")
 
     except Exception as e:
         logger.error(f"Ошибка при применении миграций: {e}")
         # Не прерываем запуск приложения из-за ошибки миграции
-        pass
+        success = False
+
+    # Данные заполняются до создания индексов: уникальный индекс по content_hash
+    # строится уже по заполненной колонке
+    success = apply_data_migrations() and success
+    success = apply_index_migrations() and success
+    success = apply_search_migrations() and success
+    return success
+
+def apply_index_migrations() -> bool:
+    """Создает индексы, которых нет в уже существующих таблицах. False - если что-то не удалось"""
+    indexes = [
+        ('ix_news_items_publish_date_id', 'news_items (publish_date, id)', False),
+        ('ix_news_items_category_publish_date_id', 'news_items (category, publish_date, id)', False),
+        ('ix_news_items_content_hash', 'news_items (content_hash)', True),
+    ]
+    # Индексы, которые больше не используются
+    obsolete_indexes = ['ix_news_items_title']
+
+    try:
+        with engine.connect() as connection:
+            for index_name, index_target, unique in indexes:
+                connection.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {index_name} ON {index_target}"))
+                connection.commit()
+                logger.info(f"Индекс {index_name} проверен")
+            for index_name in obsolete_indexes:
+                connection.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+                connection.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Ошибка при создании индексов: {e}")
+        return False
+
+def apply_search_migrations() -> bool:
+    """Создает полнотекстовый индекс. False - если не удалось"""
+    try:
+        with engine.connect() as connection:
+            create_search_index(connection)
+            connection.commit()
+        logger.info("Полнотекстовый индекс проверен")
+        return True
+    except Exception as e:
+        logger.error(f"Ошибка при создании полнотекстового индекса: {e}")
+        return False
+
+def sync_search_index():
+    """
+    Сверяет FTS5 индекс SQLite с news_items при каждом запуске: добавляет новости,
+    записанные в обход ingest (скрипты), и убирает удаленные. Операция инкрементальная
+    """
+    try:
+        with get_db_session() as session:
+            indexed = backfill_search_index(session)
+            logger.info(f"В полнотекстовый индекс добавлено {indexed} новостей")
+    except Exception as e:
+        logger.error(f"Ошибка при сверке полнотекстового индекса: {e}")
+
+def apply_data_migrations() -> bool:
+    """Заполняет производные таблицы по уже накопленным данным. False - если какой-то шаг не удался"""
+    success = True
+    try:
+        with get_db_session() as session:
+            registered = register_default_sources(session)
+            logger.info(f"Источники по умолчанию зарегистрированы, изменено строк: {registered}")
+    except Exception as e:
+        logger.error(f"Ошибка при регистрации источников: {e}")
+        success = False
+
+    try:
+        with get_db_session() as session:
+            updated = backfill_content_hashes(session)
+            logger.info(f"content_hash заполнен для {updated} новостей")
+    except Exception as e:
+        logger.error(f"Ошибка при заполнении content_hash: {e}")
+        success = False
+
+    try:
+        with get_db_session() as session:
+            updated = backfill_story_clusters(session)
+            logger.info(f"Кластеры почти-дубликатов посчитаны для {updated} новостей")
+    except Exception as e:
+        logger.error(f"Ошибка при расчете кластеров почти-дубликатов: {e}")
+        success = False
+
+    try:
+        with get_db_session() as session:
+            rebuild_category_counters(session)
+            logger.info("Счетчики категорий пересчитаны")
+    except Exception as e:
+        logger.error(f"Ошибка при пересчете счетчиков категорий: {e}")
+        success = False
+    return success
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -113,41 +222,45 @@ async def lifespan(app: FastAPI):
     # Инициализация базы данных
     init_db()
 
-    # Применение миграций
-    apply_migrations()
+    # Применение миграций - только если версия схемы в базе отстает
+    ensure_schema(apply_migrations)
+    sync_search_index()
 
-    # Настройка webhook
-    try:
-        import requests
-        webhook_response = requests.post(
-            f"https://api.telegram.org/bot{TOKEN}/setWebhook",
-            json={"url": f"{WEBHOOK_URL}/webhook"}
-        )
-        if webhook_response.status_code == 200:
-            logger.info("Webhook установлен успешно")
-        else:
-            logger.warning(f"Ошибка установки webhook: {webhook_response.text}")
-    except Exception as e:
-        logger.error(f"Ошибка при установке webhook: {e}")
+    # Настройка webhook через общий асинхронный клиент бота
+    await bot.start()
+    if await bot.set_webhook(f"{WEBHOOK_URL}/webhook"):
+        logger.info("Webhook установлен успешно")
+    else:
+        logger.warning("Ошибка установки webhook")
 
     # Запуск периодических задач
     news_service = TelegramNewsService()
+    await news_service.start()
+
+    # Каждый источник обновляется по собственному адаптивному расписанию
+    scheduler = AdaptiveScheduler(news_service)
+    update_task = asyncio.create_task(scheduler.run())
+
+    # Воркеры очереди обновлений webhook
+    update_queue.start()
 
-    async def periodic_update():
-        while True:
-            try:
-                await news_service.update_news_async()
-                logger.info("Периодическое обновление завершено")
-            except Exception as e:
-                logger.error(f"Ошибка при обновлении новостей: {e}")
-            await asyncio.sleep(300)  # обновляем каждые 5 минут
+    # Рассылки дайджестов, прерванные перезапуском, продолжаются с сохраненной позиции
+    broadcast_task = asyncio.create_task(broadcast_engine.run_pending())
 
-    asyncio.create_task(periodic_update())
+    # Загрузки истории каналов, прерванные перезапуском, продолжаются с сохраненной позиции
+    backfill_task = asyncio.create_task(resume_backfills(news_service))
 
     yield
 
     # Shutdown
     logger.info("Приложение завершает работу")
+    update_task.cancel()
+    await update_queue.stop()
+    backfill_task.cancel()
+    broadcast_task.cancel()
+    await news_service.close()
+    await bot.close()
+    await async_engine.dispose()
 
 # Создаем FastAPI приложение
 app = FastAPI(
@@ -168,7 +281,7 @@ app.add_middleware(
 
 # Импортируем роутеры после создания app
 from server.api.news import router as news_router
-from server.api.telegram import router as telegram_router
+from server.api.telegram import router as telegram_router, update_queue, broadcast_engine
 
 app.include_router(news_router, prefix="/api")
 app.include_router(telegram_router, prefix="/telegram")
@@ -36,6 +36,7 @@ class NewsItemResponse(BaseModel):
     source_name: Optional[str] = None  # Добавьте это
     source_url: Optional[str] = None   # И это
     source: NewsSourceResponse  # Полная информация об источнике
+    duplicate_of: Optional[int] = None  # id первой новости той же истории из другого источника
     
     class Config:
         from_attributes = True
@@ -43,9 +44,23 @@ class NewsItemResponse(BaseModel):
 
 class NewsResponse(BaseModel):
     data: List[NewsItemResponse]
-    total: int
-    page: int
-    pages: int
+    total: Optional[int] = None  # None, если include_total=false
+    page: Optional[int] = None  # None в режиме курсора
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # Курсор следующей страницы, None если это последняя
+
+class SourceHealthResponse(BaseModel):
+    id: int
+    name: str
+    source_type: str
+    is_active: bool
+    breaker_state: str  # closed | open | half_open
+    consecutive_failures: int
+    breaker_opened_at: Optional[datetime] = None
+    last_latency_ms: Optional[int] = None
+    last_error: Optional[str] = None
+    last_success_at: Optional[datetime] = None
+    last_failure_at: Optional[datetime] = None
 
 class CategoryResponse(BaseModel):
     categories: List[str]
@@ -0,0 +1,37 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import aiohttp
+import feedparser
+
+from server.config import FEED_PARSER_WORKERS
+from server.utils.http import ConditionalResponse, fetch_conditional
+
+logger = logging.getLogger(__name__)
+
+# Отдельный пул, чтобы разбор лент не занимал потоки default executor
+_feed_executor = ThreadPoolExecutor(max_workers=FEED_PARSER_WORKERS, thread_name_prefix="feedparser")
+
+
+async def download_feed(
+        session: aiohttp.ClientSession,
+        url: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+) -> ConditionalResponse:
+    """
+    Скачивает RSS ленту через общий асинхронный клиент.
+    С валидаторами делает условный запрос: на 304 тело не скачивается
+    """
+    result = await fetch_conditional(session, url, etag, last_modified)
+    if result.status not in (200, 304):
+        logger.warning(f"Failed to fetch RSS {url}, status: {result.status}")
+    return result
+
+
+async def parse_feed(content: bytes) -> feedparser.FeedParserDict:
+    """Разбирает уже скачанную ленту в пуле потоков, не блокируя event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_feed_executor, feedparser.parse, content)
@@ -1,36 +1,59 @@
-import feedparser
+import asyncio
+import aiohttp
 import logging
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from server.parsers.feed import download_feed, parse_feed
+from server.services.source_registry import source_registry
 
 logger = logging.getLogger(__name__)
 
-async def fetch_rss_feeds(session: Session) -> List[Dict[str, Any]]:
-    """Получение новостей из RSS источников"""
+async def _fetch_source(http_session: aiohttp.ClientSession, source: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Скачивает одну ленту асинхронно и разбирает ее в пуле потоков"""
+    try:
+        result = await download_feed(http_session, source["url"])
+        if result.content is None:
+            return []
+
+        feed = await parse_feed(result.content)
+        articles = []
+        for entry in feed.entries[:5]:  # Берем только 5 последних
+            article = {
+                "title": entry.title,
+                "link": entry.link,
+                "description": getattr(entry, 'summary', ''),
+                "source": source["name"],
+                "category": source["category"]
+            }
+            articles.append(article)
+        return articles
+    except Exception as e:
+        logger.error(f"Error parsing RSS {source['url']}: {e}")
+        return []
+
+async def fetch_rss_feeds(session: Session, http_session: Optional[aiohttp.ClientSession] = None) -> List[Dict[str, Any]]:
+    """
+    Получение новостей из RSS источников.
+    http_session - общий клиент приложения; если не передан, создается временный
+    """
     try:
         logger.info("Fetching RSS feeds...")
 
-        # Список RSS источников
-        rss_sources = [
-            {"url": "https://vc.ru/rss", "name": "VC.ru", "category": "tech"},
-            {"url": "https://forklog.com/feed/", "name": "ForkLog", "category": "crypto"}
-        ]
+        # RSS источники - из реестра news_sources
+        rss_sources = source_registry.get_rss_sources()
 
-        articles = []
-        for source in rss_sources:
-            try:
-                feed = feedparser.parse(source["url"])
-                for entry in feed.entries[:5]:  # Берем только 5 последних
-                    article = {
-                        "title": entry.title,
-                        "link": entry.link,
-                        "description": getattr(entry, 'summary', ''),
-                        "source": source["name"],
-                        "category": source["category"]
-                    }
-                    articles.append(article)
-            except Exception as e:
-                logger.error(f"Error parsing RSS {source['url']}: {e}")
+        own_session = http_session is None
+        if own_session:
+            http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+
+        try:
+            results = await asyncio.gather(*(_fetch_source(http_session, source) for source in rss_sources))
+        finally:
+            if own_session:
+                await http_session.close()
+
+        articles = [article for result in results for article in result]
 
         logger.info(f"RSS feeds fetched successfully, {len(articles)} articles")
         return articles
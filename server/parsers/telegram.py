@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 
 from server.db import NewsItem, NewsSource
 from server.parsers import telegram_news_service
+from server.utils.dedup import post_content_hash
 
 async def fetch_telegram_channels(session: Session):
     try:
@@ -43,11 +44,9 @@ async def fetch_telegram_channels(session: Session):
 
             source_id = sources_cache[source_key]
 
-            # Проверяем, существует ли уже такая новость
-            existing_news = session.query(NewsItem).filter(
-                NewsItem.title == item['title'],
-                NewsItem.source_id == source_id
-            ).first()
+            # Проверяем, существует ли уже такая новость (проба по уникальному content_hash)
+            item_hash = post_content_hash(item)
+            existing_news = session.query(NewsItem.id).filter(NewsItem.content_hash == item_hash).first()
 
             if not existing_news:
                 # Парсим дату
@@ -96,7 +95,8 @@ async def fetch_telegram_channels(session: Session):
                     link=item.get('link', ''),
                     publish_date=publish_date,
                     category=item.get('category', 'general'),
-                    media=media_list  # Сохраняем медиа как JSON
+                    media=media_list,  # Сохраняем медиа как JSON
+                    content_hash=item_hash
                 )
                 session.add(db_item)
 
@@ -0,0 +1,226 @@
+import logging
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml.html
+    from lxml import etree
+    from lxml.cssselect import CSSSelector
+except ImportError:  # lxml/cssselect не установлены - работает только BeautifulSoup
+    lxml = None
+
+# Сколько последних (самых новых) сообщений страницы t.me/s/ разбирается
+MESSAGE_LIMIT = 15
+
+WHITESPACE_RE = re.compile(r'\s+')
+PHOTO_STYLE_URL_RE = re.compile(r'background-image:url\(&quot;([^&]+)&quot;\)')
+TELEGRAM_MESSAGE_ID_RE = re.compile(r'/(\d+)(?:\?.*)?$')
+
+if lxml is not None:
+    _messages = CSSSelector('div.tgme_widget_message')
+    _text_widget = CSSSelector('div.tgme_widget_message_text')
+    _time = CSSSelector('time')
+    _photo_wrap = CSSSelector('a.tgme_widget_message_photo_wrap')
+    _img = CSSSelector('img')
+    _video = CSSSelector('video')
+    _document_wrap = CSSSelector('a.tgme_widget_message_document_wrap')
+    _document_icon = CSSSelector('i.tgme_widget_message_document_icon')
+    # Только текстовые узлы, без комментариев - как get_text() у BeautifulSoup
+    _text_nodes = etree.XPath('.//text()', smart_strings=False)
+
+
+def _absolute_url(url: Optional[str]) -> Optional[str]:
+    if url and url.startswith('//'):
+        return 'https:' + url
+    return url
+
+
+def _clean_text(text_parts: List[str]) -> str:
+    """Аналог get_text(strip=True): куски текста без краевых пробелов, склеенные без разделителя"""
+    text = ''.join(part.strip() for part in text_parts)
+    return WHITESPACE_RE.sub(' ', text).strip()
+
+
+def _parse_date(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).isoformat()
+    except ValueError:
+        return None
+
+
+def _photo_media(style: str, href: Optional[str], img_src: Optional[str]) -> Optional[Dict[str, Any]]:
+    # Способ 1: через style background-image
+    photo_url = None
+    photo_url_match = PHOTO_STYLE_URL_RE.search(style or '')
+    if photo_url_match:
+        photo_url = photo_url_match.group(1).replace('&amp;', '&')
+
+    # Способ 2: через href атрибут, способ 3: через img внутри
+    photo_url = photo_url or _absolute_url(href) or _absolute_url(img_src)
+    if not photo_url:
+        return None
+
+    # Используем прямые ссылки на изображения Telegram
+    if photo_url.startswith('https://t.me/'):
+        msg_id_match = TELEGRAM_MESSAGE_ID_RE.search(photo_url)
+        if msg_id_match:
+            photo_url = f"https://t.me/nextgen_NFT/{msg_id_match.group(1)}?single"
+
+    return {'type': 'photo', 'url': photo_url, 'thumbnail': photo_url, 'width': None, 'height': None}
+
+
+def _video_media(src: Optional[str], poster: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not src:
+        return None
+    return {'type': 'video', 'url': _absolute_url(src), 'thumbnail': _absolute_url(poster), 'width': None, 'height': None}
+
+
+DOCUMENT_MEDIA = {'type': 'document', 'url': None, 'thumbnail': None, 'width': None, 'height': None}
+
+
+def message_number(message_id: Optional[str]) -> Optional[int]:
+    """Номер сообщения из data-post ("channel/123" -> 123)"""
+    if not message_id:
+        return None
+    number = message_id.rsplit('/', 1)[-1]
+    return int(number) if number.isdigit() else None
+
+
+def _is_seen(message_id: Optional[str], after: Optional[int]) -> bool:
+    """Сообщение уже обработано в прошлых циклах (номер не больше after)"""
+    if after is None:
+        return False
+    number = message_number(message_id)
+    return number is not None and number <= after
+
+
+def _message(index: int, message_id: Optional[str], text: str, html: str, date: Optional[str],
+             media: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Сырые поля сообщения; пост из них собирает TelegramNewsService"""
+    return {
+        'index': index, 'message_id': message_id, 'number': message_number(message_id),
+        'text': text, 'html': html, 'date': date, 'media': media
+    }
+
+
+def _latest(message_widgets: list, limit: Optional[int]) -> list:
+    """Последние limit сообщений (на странице t.me/s/ они идут от старых к новым)"""
+    return message_widgets[-limit:] if limit else message_widgets
+
+
+def _first(selector, element):
+    found = selector(element)
+    return found[0] if found else None
+
+
+def parse_messages_lxml(html_content: str, after: Optional[int] = None,
+                        limit: Optional[int] = MESSAGE_LIMIT) -> List[Dict[str, Any]]:
+    """Разбор страницы t.me/s/ через lxml: один проход по каждому сообщению скомпилированными селекторами"""
+    document = lxml.html.fromstring(html_content)
+    messages = []
+
+    for index, message in enumerate(_latest(_messages(document), limit)):
+        if _is_seen(message.get('data-post'), after):
+            continue
+        try:
+            text_widget = _first(_text_widget, message)
+            if text_widget is None:
+                continue
+            text = _clean_text(_text_nodes(text_widget))
+            if not text:
+                continue
+
+            time_element = _first(_time, message)
+            date = _parse_date(time_element.get('datetime')) if time_element is not None else None
+
+            media = None
+            photo_wrap = _first(_photo_wrap, message)
+            if photo_wrap is not None:
+                img = _first(_img, photo_wrap)
+                media = _photo_media(photo_wrap.get('style', ''), photo_wrap.get('href'),
+                                     img.get('src') if img is not None else None)
+
+            video = _first(_video, message)
+            if video is not None:
+                poster = video.get('poster')
+                if not poster:
+                    poster_img = _first(_img, video)
+                    poster = poster_img.get('src') if poster_img is not None else None
+                media = _video_media(video.get('src'), poster) or media
+
+            if media is None:
+                document_wrap = _first(_document_wrap, message)
+                if document_wrap is not None and _first(_document_icon, document_wrap) is not None:
+                    media = dict(DOCUMENT_MEDIA)
+
+            html = etree.tostring(text_widget, encoding='unicode', method='html', with_tail=False)
+            messages.append(_message(index, message.get('data-post'), text, html, date, media))
+        except Exception as e:
+            logger.warning(f"Error parsing message {index}: {e}")
+
+    return messages
+
+
+def parse_messages_bs4(html_content: str, after: Optional[int] = None,
+                       limit: Optional[int] = MESSAGE_LIMIT) -> List[Dict[str, Any]]:
+    """Разбор страницы t.me/s/ через BeautifulSoup (запасной вариант без lxml)"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html_content, 'html.parser')
+    messages = []
+
+    for index, message in enumerate(_latest(soup.find_all('div', class_='tgme_widget_message'), limit)):
+        if _is_seen(message.get('data-post'), after):
+            continue
+        try:
+            text_widget = message.find('div', class_='tgme_widget_message_text')
+            if not text_widget:
+                continue
+            text = _clean_text(list(text_widget.stripped_strings))
+            if not text:
+                continue
+
+            time_element = message.find('time')
+            date = _parse_date(time_element.get('datetime')) if time_element else None
+
+            media = None
+            photo_wrap = message.find('a', class_='tgme_widget_message_photo_wrap')
+            if photo_wrap:
+                img = photo_wrap.find('img')
+                media = _photo_media(photo_wrap.get('style', ''), photo_wrap.get('href'),
+                                     img.get('src') if img else None)
+
+            video = message.find('video')
+            if video:
+                poster = video.get('poster')
+                if not poster:
+                    poster_img = video.find('img')
+                    poster = poster_img.get('src') if poster_img else None
+                media = _video_media(video.get('src'), poster) or media
+
+            if media is None:
+                document_wrap = message.find('a', class_='tgme_widget_message_document_wrap')
+                if document_wrap and document_wrap.find('i', class_='tgme_widget_message_document_icon'):
+                    media = dict(DOCUMENT_MEDIA)
+
+            messages.append(_message(index, message.get('data-post'), text, str(text_widget), date, media))
+        except Exception as e:
+            logger.warning(f"Error parsing message {index}: {e}")
+
+    return messages
+
+
+def parse_messages(html_content: str, after: Optional[int] = None,
+                   limit: Optional[int] = MESSAGE_LIMIT) -> List[Dict[str, Any]]:
+    """
+    Сообщения страницы канала: lxml, если установлен, иначе BeautifulSoup.
+    after - номер последнего обработанного сообщения: более старые пропускаются
+    до извлечения полей
+    """
+    parser: Callable[..., List[Dict[str, Any]]] = parse_messages_lxml if lxml is not None else parse_messages_bs4
+    return parser(html_content, after=after, limit=limit)
@@ -1,101 +1,212 @@
 import aiohttp
 import asyncio
-import feedparser
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import json
 from datetime import datetime, timedelta
 import logging
 import re
 import hashlib
+import time
+from collections import Counter
+
+from server.config import (
+    HTTP_TIMEOUT, HTTP_CONNECT_TIMEOUT, HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_KEEPALIVE_TIMEOUT, HTTP_DNS_CACHE_TTL, INGEST_CONCURRENCY, INGEST_SOURCE_TIMEOUT,
+    TELEGRAM_GAP_MAX_PAGES, ALLOW_MOCK_DATA
+)
+from server.parsers.feed import download_feed, parse_feed
+from server.parsers.telegram_html import parse_messages
+from server.utils.http import content_hash, fetch_conditional
+from server.utils.media import normalize_media
+from server.utils.dedup import post_content_hash
+from server.utils.categorize import categorize
+from server.services.source_health import SourceHealthTracker
+from server.services.source_registry import source_registry
 
 logger = logging.getLogger(__name__)
 
+# Заголовок поста Telegram - первое предложение текста
+SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+# id постов на странице t.me/s/<channel>: меняются только при появлении новых сообщений
+TELEGRAM_POST_ID_RE = re.compile(rb'data-post="([^"]+)"')
+
+
+def telegram_page_message_numbers(html_content: bytes) -> List[int]:
+    """Номера сообщений страницы по data-post, без разбора HTML"""
+    return [int(post_id.rsplit(b'/', 1)[-1]) for post_id in TELEGRAM_POST_ID_RE.findall(html_content)
+            if post_id.rsplit(b'/', 1)[-1].isdigit()]
+
+
+def telegram_page_hash(html_content: bytes) -> str:
+    """
+    Хэш страницы канала по списку id постов.
+    Счётчики просмотров на странице меняются постоянно, поэтому хэш от всего HTML бесполезен
+    """
+    return content_hash(b'|'.join(TELEGRAM_POST_ID_RE.findall(html_content)))
+
 
 class TelegramNewsService:
     """Сервис для получения новостей из Telegram каналов и RSS источников"""
 
     def __init__(self):
-        # Только канал @nextgen_NFT по запросу пользователя
-        self.channels = [
-            {'username': 'nextgen_NFT', 'name': 'NextGen NFT', 'category': 'nft'}
-        ]
-
-        # RSS источники согласно ТЗ - до 5 проверенных лент
-        self.rss_sources = [
-            {'url': 'https://vc.ru/rss', 'name': 'VC.ru', 'category': 'tech'},
-            {'url': 'https://www.coindesk.com/arc/outboundfeeds/rss/', 'name': 'CoinDesk', 'category': 'crypto'},
-            {'url': 'https://cointelegraph.com/rss', 'name': 'Cointelegraph', 'category': 'crypto'},
-            {'url': 'https://habr.com/ru/rss/articles/', 'name': 'Habr NFT', 'category': 'nft'}
-        ]
+        # Каналы и RSS ленты - из реестра news_sources (server/services/source_registry.py)
+        self.registry = source_registry
 
         self.cache = {}
         self.cache_ttl = timedelta(minutes=30)  # Кэш на 30 минут согласно ТЗ
 
-        # Ключевые слова для категоризации согласно ТЗ
-        self.keywords = {
-            'gifts': [
-                'подарок', 'подарки', 'бесплатно', 'халява', 'промокод', 'скидка',
-                'акция', 'розыгрыш', 'бонус', 'даром', 'гифт', 'gift', 'freebie',
-                'раздача', 'конкурс', 'приз', 'награда', 'cashback', 'кэшбек'
-            ],
-            'nft': [
-                'nft', 'нфт', 'токен', 'коллекция', 'мета', 'opensea', 'digital art',
-                'коллекционный', 'цифровое искусство', 'метавселенная', 'avatar',
-                'аватар', 'pfp', 'mint', 'минт', 'drop', 'дроп', 'rare', 'раритет'
-            ],
-            'crypto': [
-                'криптовалюта', 'биткоин', 'bitcoin', 'ethereum', 'блокчейн', 'деф',
-                'defi', 'торги', 'курс', 'btc', 'eth', 'usdt', 'binance', 'трейдинг',
-                'стейкинг', 'майнинг', 'altcoin', 'альткоин', 'pump', 'dump', 'hodl'
-            ],
-            'tech': [
-                'технологии', 'it', 'ит', 'программирование', 'разработка', 'стартап',
-                'инновации', 'ai', 'ии', 'machine learning', 'блокчейн', 'веб3',
-                'app', 'приложение', 'software', 'hardware', 'gadget', 'гаджет'
-            ],
-            'community': [
-                'сообщество', 'чат', 'общение', 'форум', 'дискуссия', 'мнение',
-                'обсуждение', 'новости', 'анонс', 'встреча', 'event', 'мероприятие'
-            ]
-        }
-
-    def categorize_content(self, title: str, description: str = "") -> str:
+        # Общий HTTP клиент для всех источников (создается в start())
+        self.http_session: Optional[aiohttp.ClientSession] = None
+
+        # Валидаторы условных запросов по имени источника (etag, last_modified, content_hash).
+        # Загружаются из news_sources при первом обращении
+        self.fetch_validators: Optional[Dict[str, Dict[str, Optional[str]]]] = None
+        # Валидаторы текущего цикла - сохраняются только после успешной записи новостей
+        self.pending_validators: Dict[str, Dict[str, Optional[str]]] = {}
+        # Ошибка последней загрузки источника по имени: fetch_* ее логируют и возвращают [],
+        # а планировщику нужно отличать сбой от ленты без новых постов
+        self.fetch_errors: Dict[str, str] = {}
+        # Circuit breaker и здоровье источников (news_sources)
+        self.health = SourceHealthTracker()
+
+    @property
+    def channels(self) -> List[Dict[str, str]]:
+        return self.registry.get_channels()
+
+    @property
+    def rss_sources(self) -> List[Dict[str, str]]:
+        return self.registry.get_rss_sources()
+
+    async def start(self):
         """
-        Автоматическая категоризация контента по ключевым словам согласно ТЗ
-        Приоритет: gifts > crypto > nft > tech > community
+        Создает долгоживущий HTTP клиент с пулом keep-alive соединений и кэшем DNS.
+        Вызывается из lifespan в server/main.py
         """
-        content = (title + " " + description).lower()
-
-        # Подсчитываем совпадения для каждой категории
-        category_scores = {}
-        for category, keywords in self.keywords.items():
-            score = sum(1 for keyword in keywords if keyword in content)
-            if score > 0:
-                category_scores[category] = score
+        if self.http_session is None or self.http_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL
+            )
+            timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+            self.http_session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self):
+        """Закрывает HTTP клиент и его пул соединений"""
+        if self.http_session and not self.http_session.closed:
+            await self.http_session.close()
+        self.http_session = None
+
+    async def _get_http_session(self) -> aiohttp.ClientSession:
+        """Общий HTTP клиент; создается лениво, если сервис используется вне lifespan (скрипты)"""
+        if self.http_session is None or self.http_session.closed:
+            await self.start()
+        return self.http_session
+
+    def _get_validators(self, source_name: str) -> Dict[str, Optional[str]]:
+        """Сохраненные валидаторы источника (пустой dict, если источник еще не загружался)"""
+        if self.fetch_validators is None:
+            self.fetch_validators = self._load_fetch_validators()
+        return self.fetch_validators.get(source_name, {})
+
+    def _load_fetch_validators(self) -> Dict[str, Dict[str, Optional[str]]]:
+        from server.db import NewsSource, get_db_session
 
-        if not category_scores:
-            return 'general'
+        try:
+            with get_db_session() as db:
+                rows = db.query(
+                    NewsSource.name, NewsSource.etag, NewsSource.last_modified,
+                    NewsSource.content_hash, NewsSource.last_message_id
+                ).all()
+            return {
+                name: {
+                    'etag': etag, 'last_modified': last_modified,
+                    'content_hash': page_hash, 'last_message_id': last_message_id
+                }
+                for name, etag, last_modified, page_hash, last_message_id in rows
+            }
+        except Exception as e:
+            logger.warning(f"Could not load fetch validators: {e}")
+            return {}
+
+    def _remember_validators(self, source_name: str, url: str, source_type: str, category: str,
+                             etag: Optional[str], last_modified: Optional[str], page_hash: str,
+                             last_message_id: Optional[int] = None):
+        self.pending_validators[source_name] = {
+            'url': url,
+            'source_type': source_type,
+            'category': category,
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_hash': page_hash,
+            'last_message_id': last_message_id
+        }
 
-        # Возвращаем категорию с наибольшим количеством совпадений
-        # При равенстве очков используем приоритет
-        priority = ['gifts', 'crypto', 'nft', 'tech', 'community']
+    @staticmethod
+    def _store_validators(pending: Dict[str, Dict[str, Any]]):
+        from server.db import get_db_session
+        from server.services.news_service import get_or_create_source
 
-        max_score = max(category_scores.values())
-        best_categories = [cat for cat, score in category_scores.items() if score == max_score]
+        with get_db_session() as db:
+            for name, validators in pending.items():
+                source = get_or_create_source(
+                    db, name, url=validators['url'],
+                    source_type=validators['source_type'], category=validators['category']
+                )
+                source.etag = validators['etag']
+                source.last_modified = validators['last_modified']
+                source.content_hash = validators['content_hash']
+                if validators['last_message_id'] is not None:
+                    source.last_message_id = validators['last_message_id']
+            db.commit()
+
+    async def _commit_validators(self, names: Optional[List[str]] = None):
+        """
+        Сохраняет валидаторы текущего цикла в news_sources (запись - в пуле потоков).
+        names - только эти источники (планировщик сохраняет каждый источник отдельно)
+        """
+        if names is None:
+            names = list(self.pending_validators)
+        pending = {name: self.pending_validators.pop(name) for name in names if name in self.pending_validators}
+        if not pending:
+            return
 
-        for priority_cat in priority:
-            if priority_cat in best_categories:
-                return priority_cat
+        try:
+            await asyncio.to_thread(self._store_validators, pending)
+
+            if self.fetch_validators is None:
+                self.fetch_validators = {}
+            for name, validators in pending.items():
+                last_message_id = validators['last_message_id']
+                if last_message_id is None:
+                    last_message_id = self.fetch_validators.get(name, {}).get('last_message_id')
+                self.fetch_validators[name] = {
+                    'etag': validators['etag'],
+                    'last_modified': validators['last_modified'],
+                    'content_hash': validators['content_hash'],
+                    'last_message_id': last_message_id
+                }
+        except Exception as e:
+            logger.error(f"Error saving fetch validators: {e}")
 
-        return list(category_scores.keys())[0]  # Fallback
+    def categorize_content(self, title: str, description: str = "") -> str:
+        """
+        Автоматическая категоризация контента по ключевым словам (server.utils.categorize)
+        Приоритет: gifts > crypto > nft > tech > community
+        """
+        return categorize(title, description)
 
-    async def fetch_telegram_channel(self, channel_username: str) -> List[Dict[str, Any]]:
+    async def fetch_telegram_channel(self, channel_username: str, conditional: bool = True) -> List[Dict[str, Any]]:
         """
         Получение новостей из Telegram канала через веб-скрапинг
-        Согласно ТЗ - интеграция с Telegram каналами для получения актуальных новостей
+        Согласно ТЗ - интеграция с Telegram каналами для получения актуальных новостей.
+        При conditional=True страница без новых постов не разбирается (возвращается []),
+        а разбираются только сообщения новее последнего обработанного (last_message_id).
+        Если между ним и страницей есть разрыв (простой сервиса), он догружается через ?before=
         """
         try:
-            channel_data = next((ch for ch in self.channels if ch['username'] == channel_username), None)
+            channel_data = self.registry.get_channel(channel_username)
             if not channel_data:
                 logger.warning(f"Channel {channel_username} not found in configured channels")
                 return []
@@ -103,192 +214,180 @@ class TelegramNewsService:
             # Используем публичный API Telegram для получения постов
             url = f"https://t.me/s/{channel_username}"
 
-            async with aiohttp.ClientSession() as session:
-                try:
-                    async with session.get(url, timeout=10) as response:
-                        if response.status == 200:
-                            html_content = await response.text()
-                            return self._parse_telegram_html(html_content, channel_data)
-                        else:
-                            logger.warning(f"Failed to fetch {url}, status: {response.status}")
-                            return self._generate_mock_posts(channel_data)
-                except aiohttp.ClientTimeout:
-                    logger.warning(f"Timeout fetching {url}, using mock data")
-                    return self._generate_mock_posts(channel_data)
-                except Exception as e:
-                    logger.warning(f"Error fetching {url}: {e}, using mock data")
-                    return self._generate_mock_posts(channel_data)
+            self.fetch_errors.pop(channel_data['name'], None)
+            validators = self._get_validators(channel_data['name']) if conditional else {}
+            last_message_id = validators.get('last_message_id')
+            session = await self._get_http_session()
+            try:
+                result = await fetch_conditional(session, url, validators.get('etag'), validators.get('last_modified'))
+                if result.not_modified:
+                    logger.info(f"{url} not modified, skipping")
+                    return []
+                if result.status == 200:
+                    page_hash = telegram_page_hash(result.content)
+                    if page_hash == validators.get('content_hash'):
+                        logger.info(f"No new posts on {url}, skipping parse")
+                        return []
+
+                    # Номера сообщений страницы - без разбора HTML
+                    page_numbers = telegram_page_message_numbers(result.content)
+                    newest = max(page_numbers, default=None)
+                    if last_message_id is not None and newest is not None and newest <= last_message_id:
+                        logger.info(f"No messages after {last_message_id} on {url}, skipping parse")
+                        posts = []
+                    else:
+                        html_content = result.content.decode('utf-8', errors='replace')
+                        posts = self._parse_telegram_html(html_content, channel_data, after=last_message_id)
+
+                        # Разрыв между последним обработанным сообщением и первым на странице
+                        oldest = min(page_numbers, default=None)
+                        if last_message_id is not None and oldest is not None and oldest > last_message_id + 1:
+                            try:
+                                gap_posts = await self._fetch_telegram_gap(channel_username, last_message_id, oldest)
+                            except Exception as e:
+                                # Валидаторы не сохраняем: в следующем цикле разрыв загрузится заново
+                                logger.warning(f"Error fetching missed posts from {channel_username}: {e}")
+                                return posts
+                            posts = gap_posts + posts
+
+                    self._remember_validators(
+                        channel_data['name'], f"https://t.me/{channel_username}", 'telegram',
+                        channel_data['category'], result.etag, result.last_modified, page_hash,
+                        max(newest or 0, last_message_id or 0) or None
+                    )
+                    return posts
+                else:
+                    logger.warning(f"Failed to fetch {url}, status: {result.status}")
+                    return self._failed_channel_posts(channel_data, f"HTTP {result.status}")
+            except asyncio.TimeoutError:
+                logger.warning(f"Timeout fetching {url}")
+                return self._failed_channel_posts(channel_data, "timeout")
+            except Exception as e:
+                logger.warning(f"Error fetching {url}: {e}")
+                return self._failed_channel_posts(channel_data, str(e) or type(e).__name__)
 
         except Exception as e:
             logger.error(f"Error in fetch_telegram_channel for {channel_username}: {e}")
             return []
 
-    def _parse_telegram_html(self, html_content: str, channel_data: Dict) -> List[Dict[str, Any]]:
-        """Парсинг HTML содержимого Telegram канала с поддержкой медиа и полного контента"""
-        import re
-        from html import unescape
-        from bs4 import BeautifulSoup
-
+    async def fetch_telegram_page(self, channel_username: str, before: Optional[int] = None,
+                                  after: Optional[int] = None) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """
+        Одна страница истории канала: t.me/s/<channel>?before=N (сообщения старше N)
+        или ?after=N (новее N). Если заданы оба, запрашивается ?before=, а after
+        отсекает уже обработанные сообщения. Возвращает посты и номера всех сообщений страницы;
+        при ответе не 200 бросает aiohttp.ClientResponseError
+        """
+        channel_data = self.registry.get_channel(channel_username)
+        if not channel_data:
+            logger.warning(f"Channel {channel_username} not found in configured channels")
+            return [], []
+
+        if before is not None:
+            params = {'before': before}
+        elif after is not None:
+            params = {'after': after}
+        else:
+            params = {}
+
+        session = await self._get_http_session()
+        async with session.get(f"https://t.me/s/{channel_username}", params=params) as response:
+            response.raise_for_status()  # пустая страница означает конец истории, ошибку с ней путать нельзя
+            content = await response.read()
+
+        html_content = content.decode('utf-8', errors='replace')
+        messages = parse_messages(html_content, after=after, limit=None)
+        return self._build_telegram_posts(messages, channel_data), telegram_page_message_numbers(content)
+
+    async def _fetch_telegram_gap(self, channel_username: str, after: int, before: int) -> List[Dict[str, Any]]:
+        """Сообщения с номерами (after, before), пропущенные во время простоя; страницы идут от новых к старым"""
         posts = []
+        for _ in range(TELEGRAM_GAP_MAX_PAGES):
+            page_posts, page_numbers = await self.fetch_telegram_page(channel_username, before=before, after=after)
+            posts = page_posts + posts
+            if not page_numbers or min(page_numbers) <= after + 1:
+                break
+            before = min(page_numbers)
+        else:
+            logger.warning(
+                f"Gap in {channel_username} after {after} is longer than {TELEGRAM_GAP_MAX_PAGES} pages, "
+                f"older messages are left to scripts/backfill_telegram.py"
+            )
+
+        logger.info(f"Fetched {len(posts)} missed posts from {channel_username}")
+        return posts
 
+    def _parse_telegram_html(self, html_content: str, channel_data: Dict,
+                             after: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Парсинг HTML содержимого Telegram канала с поддержкой медиа и полного контента.
+        after - номер последнего обработанного сообщения: разбираются только более новые
+        (все на странице, без лимита); пустой результат тогда не ошибка
+        """
         try:
-            # Используем BeautifulSoup для более точного парсинга
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Находим все сообщения
-            message_widgets = soup.find_all('div', class_='tgme_widget_message')
-            
-            for i, message in enumerate(message_widgets[:15]):  # Увеличиваем лимит до 15 постов
-                try:
-                    # Извлекаем полный текст сообщения
-                    text_widget = message.find('div', class_='tgme_widget_message_text')
-                    if not text_widget:
-                        continue
-                    
-                    # Получаем полный текст без обрезки
-                    full_text = text_widget.get_text(strip=True)
-                    if not full_text:
-                        continue
-                    
-                    # Очищаем текст от лишних пробелов
-                    full_text = re.sub(r'\s+', ' ', full_text).strip()
-                    
-                    # Извлекаем HTML контент для сохранения форматирования
-                    html_content = str(text_widget)
-                    
-                    # Извлекаем дату
-                    time_element = message.find('time')
-                    date = datetime.now().isoformat()
-                    if time_element and time_element.get('datetime'):
-                        try:
-                            date_str = time_element['datetime']
-                            date = datetime.fromisoformat(date_str.replace('Z', '+00:00')).isoformat()
-                        except:
-                            pass
-                    
-                    # Извлекаем медиа контент
-                    media = None
-                    
-                    # Проверяем на фото - улучшенный парсинг
-                    photo_wrap = message.find('a', class_='tgme_widget_message_photo_wrap')
-                    if photo_wrap:
-                        # Пробуем разные способы извлечения URL
-                        photo_url = None
-                        
-                        # Способ 1: через style background-image
-                        style = photo_wrap.get('style', '')
-                        photo_url_match = re.search(r'background-image:url\(&quot;([^&]+)&quot;\)', style)
-                        if photo_url_match:
-                            photo_url = photo_url_match.group(1).replace('&amp;', '&')
-                        
-                        # Способ 2: через href атрибут
-                        if not photo_url:
-                            photo_url = photo_wrap.get('href')
-                            if photo_url and photo_url.startswith('//'):
-                                photo_url = 'https:' + photo_url
-                        
-                        # Способ 3: через img внутри
-                        if not photo_url:
-                            img_element = photo_wrap.find('img')
-                            if img_element:
-                                photo_url = img_element.get('src')
-                                if photo_url and photo_url.startswith('//'):
-                                    photo_url = 'https:' + photo_url
-                        
-                        if photo_url:
-                            # Используем прямые ссылки на изображения Telegram
-                            if photo_url.startswith('https://t.me/'):
-                                # Извлекаем ID сообщения и создаем прямую ссылку
-                                msg_id_match = re.search(r'/(\d+)(?:\?.*)?$', photo_url)
-                                if msg_id_match:
-                                    msg_id = msg_id_match.group(1)
-                                    # Создаем прямую ссылку на изображение
-                                    photo_url = f"https://t.me/nextgen_NFT/{msg_id}?single"
-                            
-                            media = {
-                                'type': 'photo',
-                                'url': photo_url,
-                                'thumbnail': photo_url,
-                                'width': None,
-                                'height': None
-                            }
-                            logger.info(f"Found photo: {photo_url}")
-                    
-                    # Проверяем на видео - улучшенный парсинг
-                    video_element = message.find('video')
-                    if video_element:
-                        video_url = video_element.get('src')
-                        poster_url = video_element.get('poster')
-                        
-                        # Если нет poster, пробуем найти thumbnail
-                        if not poster_url:
-                            poster_element = video_element.find('img')
-                            if poster_element:
-                                poster_url = poster_element.get('src')
-                        
-                        if video_url:
-                            if video_url.startswith('//'):
-                                video_url = 'https:' + video_url
-                            if poster_url and poster_url.startswith('//'):
-                                poster_url = 'https:' + poster_url
-                            
-                            media = {
-                                'type': 'video',
-                                'url': video_url,
-                                'thumbnail': poster_url,
-                                'width': None,
-                                'height': None
-                            }
-                            logger.info(f"Found video: {video_url}")
-                    
-                    # Проверяем на документы/файлы
-                    document_wrap = message.find('a', class_='tgme_widget_message_document_wrap')
-                    if document_wrap and not media:
-                        doc_icon = document_wrap.find('i', class_='tgme_widget_message_document_icon')
-                        if doc_icon:
-                            media = {
-                                'type': 'document',
-                                'url': None,
-                                'thumbnail': None,
-                                'width': None,
-                                'height': None
-                            }
-                    
-                    # Генерируем заголовок из первых предложений
-                    sentences = re.split(r'[.!?]+', full_text)
-                    title = sentences[0][:150].strip() if sentences and sentences[0] else f"Пост от {channel_data['name']}"
-                    
-                    # Оценка времени чтения (200 слов в минуту)
-                    word_count = len(full_text.split())
-                    reading_time = max(1, word_count // 200)
-                    
-                    post = {
-                        'id': hashlib.md5(f"{channel_data['username']}_{i}_{full_text[:50]}".encode()).hexdigest(),
-                        'title': title,
-                        'text': full_text,  # Полный текст без сокращений
-                        'content_html': html_content,  # HTML контент для сохранения форматирования
-                        'link': f"https://t.me/{channel_data['username']}",
-                        'date': date,
-                        'source': channel_data['name'],
-                        'category': channel_data['category'],
-                        'channel': channel_data['username'],
-                        'media': media,
-                        'reading_time': reading_time,
-                        'word_count': word_count
-                    }
-                    
-                    posts.append(post)
-                    
-                except Exception as e:
-                    logger.warning(f"Error parsing message {i}: {e}")
-                    continue
-                    
+            # Сырые поля сообщений (lxml, запасной вариант - BeautifulSoup), см. server/parsers/telegram_html.py
+            if after is None:
+                messages = parse_messages(html_content)
+            else:
+                messages = parse_messages(html_content, after=after, limit=None)
         except Exception as e:
             logger.error(f"Error parsing HTML content: {e}")
-        
-        if not posts:  # Если парсинг не удался, используем мок данные
+            messages = []
+
+        posts = self._build_telegram_posts(messages, channel_data)
+
+        if not posts and after is None:  # На первой странице канала не разобралось ни одного поста
+            logger.warning(f"No posts parsed from {channel_data['username']}, page layout may have changed")
+            return self._failed_channel_posts(channel_data, "no posts parsed")
+
+        return posts
+
+    def _failed_channel_posts(self, channel_data: Dict, error: str) -> List[Dict[str, Any]]:
+        """
+        Сбой загрузки канала: ошибка запоминается для circuit breaker.
+        Мок посты возвращаются только при ALLOW_MOCK_DATA (локальная разработка) и
+        в базу не пишутся - _fetch_source отбрасывает результат загрузки с ошибкой
+        """
+        self.fetch_errors[channel_data['name']] = error
+        if ALLOW_MOCK_DATA:
             return self._generate_mock_posts(channel_data)
-        
+        return []
+
+    def _build_telegram_posts(self, messages: List[Dict[str, Any]], channel_data: Dict) -> List[Dict[str, Any]]:
+        """Посты из сырых полей сообщений (server.parsers.telegram_html)"""
+        posts = []
+        for message in messages:
+            full_text = message['text']
+
+            # Генерируем заголовок из первых предложений
+            sentences = SENTENCE_SPLIT_RE.split(full_text)
+            title = sentences[0][:150].strip() if sentences and sentences[0] else f"Пост от {channel_data['name']}"
+
+            # Оценка времени чтения (200 слов в минуту)
+            word_count = len(full_text.split())
+            reading_time = max(1, word_count // 200)
+
+            # data-post ("channel/123") - стабильный id и ссылка на сам пост
+            message_id = message['message_id']
+            post_id = message_id or hashlib.md5(f"{channel_data['username']}_{message['index']}_{full_text[:50]}".encode()).hexdigest()
+
+            posts.append({
+                'id': post_id,
+                'title': title,
+                'text': full_text,  # Полный текст без сокращений
+                'content_html': message['html'],  # HTML контент для сохранения форматирования
+                'link': f"https://t.me/{message_id}" if message_id else f"https://t.me/{channel_data['username']}",
+                'date': message['date'] or datetime.now().isoformat(),
+                'source': channel_data['name'],
+                'category': channel_data['category'],
+                'channel': channel_data['username'],
+                'message_id': message_id,  # часть content_hash
+                'message_number': message['number'],
+                'media': message['media'],
+                'reading_time': reading_time,
+                'word_count': word_count
+            })
+
         return posts
 
     def _generate_mock_posts(self, channel_data: Dict) -> List[Dict[str, Any]]:
@@ -350,20 +449,16 @@ class TelegramNewsService:
             })
 
         return posts
-        """Автоматическая категоризация контента по ключевым словам"""
-        content = (title + " " + description).lower()
-
-        for category, keywords in self.keywords.items():
-            if any(keyword in content for keyword in keywords):
-                return category
-
-        return 'general'
 
     async def fetch_rss_feed(self, source: Dict[str, str]) -> List[Dict[str, Any]]:
         """Получение новостей из RSS источника"""
         try:
-            # Используем feedparser для парсинга RSS
-            feed = feedparser.parse(source['url'])
+            # Скачиваем через общий клиент, разбираем в пуле потоков
+            session = await self._get_http_session()
+            result = await download_feed(session, source['url'])
+            if result.content is None:
+                return []
+            feed = await parse_feed(result.content)
 
             if not feed.entries:
                 logger.warning(f"No entries found in RSS feed: {source['url']}")
@@ -463,7 +558,7 @@ class TelegramNewsService:
         try:
             # В реальной реализации здесь будет вызов к Telegram Bot API
             # Пока возвращаем мок данные
-            channel_data = next((ch for ch in self.channels if ch['username'] == username), None)
+            channel_data = self.registry.get_channel(username)
             if not channel_data:
                 return None
 
@@ -483,7 +578,7 @@ class TelegramNewsService:
         try:
             # В реальной реализации здесь будет вызов к Telegram Bot API
             # Пока генерируем мок данные
-            channel_data = next((ch for ch in self.channels if ch['username'] == username), None)
+            channel_data = self.registry.get_channel(username)
             if not channel_data:
                 return []
 
@@ -577,7 +672,7 @@ class TelegramNewsService:
             # Получаем посты из Telegram каналов
             telegram_tasks = []
             for channel in telegram_channels:
-                telegram_tasks.append(self.fetch_telegram_channel(channel['username']))
+                telegram_tasks.append(self.fetch_telegram_channel(channel['username'], conditional=False))
 
             telegram_results = await asyncio.gather(*telegram_tasks, return_exceptions=True)
 
@@ -610,13 +705,11 @@ class TelegramNewsService:
                     logger.error(f"Error fetching RSS from {rss_sources[i]['url']}: {result}")
 
             # 3. Обработка и дедупликация согласно ТЗ
-            # Удаляем дубликаты по заголовку и ссылке
+            # Удаляем дубликаты по content_hash (тот же ключ, что и в базе)
             seen = set()
             unique_posts = []
             for post in all_posts:
-                # Создаем ключ для дедупликации
-                title_clean = re.sub(r'[^\w\s]', '', post['title'].lower()).strip()
-                key = (title_clean, post.get('link', ''))
+                key = post_content_hash(post)
                 if key not in seen:
                     seen.add(key)
                     unique_posts.append(post)
@@ -677,232 +770,277 @@ class TelegramNewsService:
             logger.error(f"Error getting channels info: {e}")
             return []
 
-    async def update_news_async(self):
+    async def update_news_async(self) -> int:
         """
-        Асинхронное обновление новостей из всех источников
-        Метод для периодического обновления в main.py
+        Однократное обновление всех источников для ручных скриптов: каждый источник
+        проходит через refresh_source, как в планировщике. Возвращает число новых новостей
         """
-        try:
-            logger.info(f"Fetching from {len(self.channels)} Telegram channels")
-
-            # Получаем новости из Telegram каналов
-            all_posts = []
-            for channel in self.channels:
-                try:
-                    posts = await self.fetch_telegram_channel(channel['username'])
-                    logger.info(f"Got {len(posts)} posts from {channel['username']}")
-                    all_posts.extend(posts)
-                except Exception as e:
-                    logger.error(f"Error fetching from channel {channel['username']}: {e}")
-                    continue
+        semaphore = asyncio.Semaphore(INGEST_CONCURRENCY)
 
-            # Получаем новости из RSS источников
-            logger.info(f"Fetching from {len(self.rss_sources)} RSS sources")
-            for source in self.rss_sources:
+        async def refresh(source_type: str, source: Dict[str, str]) -> int:
+            async with semaphore:
                 try:
-                    articles = await self.fetch_rss_source(source['url'], source['name'], source['category'])
-                    logger.info(f"Got {len(articles)} articles from {source['name']}")
-                    all_posts.extend(articles)
+                    return await self.refresh_source(source_type, source)
                 except Exception as e:
-                    logger.error(f"Error fetching from RSS {source['name']}: {e}")
-                    continue
-
-            # Дедуплицируем по заголовкам
-            unique_posts = []
-            seen_titles = set()
+                    logger.error(f"Error refreshing {source['name']}: {e}")
+                    return 0
 
-            for post in all_posts:
-                title_hash = hashlib.md5(post['title'].encode()).hexdigest()
-                if title_hash not in seen_titles:
-                    seen_titles.add(title_hash)
-                    unique_posts.append(post)
+        tasks = [refresh('telegram', channel) for channel in self.channels] + \
+                [refresh('rss', source) for source in self.rss_sources]
+        saved = sum(await asyncio.gather(*tasks))
+        logger.info(f"Refreshed {len(tasks)} sources, saved {saved} new items")
+        return saved
 
-            logger.info(f"After deduplication: {len(unique_posts)} unique posts from {len(all_posts)} total")
+    async def _fetch_source(self, source_type: str, source: Dict[str, str]) -> List[Dict[str, Any]]:
+        """
+        Загрузка одного источника с собственным таймаутом через circuit breaker.
+        Пока breaker открыт, источник не запрашивается вовсе. При сбое бросает RuntimeError -
+        посты неудачной загрузки (мок данные) до записи в базу не доходят
+        """
+        name = source['name']
+        if not self.health.allow(name):
+            raise RuntimeError("circuit breaker is open")
 
-            # Сортируем по дате (новые сначала)
-            try:
-                unique_posts.sort(key=lambda x: x['date'], reverse=True)
-            except Exception as e:
-                logger.warning(f"Error sorting by date: {e}, using original order")
+        if source_type == 'telegram':
+            fetch = self.fetch_telegram_channel(source['username'])
+        else:
+            fetch = self.fetch_rss_source(source['url'], name, source['category'])
 
-            # Сохраняем в базу данных
-            await self.save_to_database(unique_posts[:50])  # Сохраняем только 50 самых свежих
+        started = time.monotonic()
+        try:
+            posts = await asyncio.wait_for(fetch, timeout=INGEST_SOURCE_TIMEOUT)
+            error = self.fetch_errors.get(name)
+        except asyncio.TimeoutError:
+            posts, error = [], f"timeout after {INGEST_SOURCE_TIMEOUT}s"
+        await self.health.record(source_type, source, time.monotonic() - started, error)
+
+        if error:
+            self.pending_validators.pop(name, None)
+            raise RuntimeError(error)
+        return posts
 
-            logger.info(f"Successfully updated {len(unique_posts[:50])} news items")
+    async def refresh_source(self, source_type: str, source: Dict[str, str]) -> int:
+        """
+        Загружает и сохраняет один источник - вызывается планировщиком (server/services/scheduler.py).
+        Возвращает число новых новостей; при сбое загрузки или записи бросает RuntimeError
+        """
+        posts = await self._fetch_source(source_type, source)
 
-        except Exception as e:
-            logger.error(f"Error in update_news_async: {e}")
-            raise
+        saved = await self.save_to_database(posts) if posts else 0
+        if saved is None:
+            # Валидаторы не сохраняем, чтобы посты загрузились в следующий раз
+            self.pending_validators.pop(source['name'], None)
+            raise RuntimeError("save_to_database failed")
+        await self._commit_validators([source['name']])
+        return saved
 
     async def fetch_rss_source(self, url: str, name: str, category: str) -> List[Dict[str, Any]]:
         """Получение новостей из RSS источника"""
+        self.fetch_errors.pop(name, None)
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=10) as response:
-                    if response.status != 200:
-                        logger.warning(f"Failed to fetch RSS {url}, status: {response.status}")
-                        return []
+            validators = self._get_validators(name)
+            session = await self._get_http_session()
+            result = await download_feed(session, url, validators.get('etag'), validators.get('last_modified'))
+            if result.not_modified:
+                logger.info(f"RSS {url} not modified, skipping")
+                return []
+            if result.content is None:
+                self.fetch_errors[name] = f"HTTP {result.status}"
+                return []
 
-                    content = await response.text()
-                    feed = feedparser.parse(content)
+            # Сервер без ETag/Last-Modified: сравниваем хэш тела
+            body_hash = content_hash(result.content)
+            if body_hash == validators.get('content_hash'):
+                logger.info(f"RSS {url} unchanged, skipping parse")
+                return []
 
-                    if not feed.entries:
-                        logger.warning(f"No entries found in RSS feed: {url}")
-                        return []
+            # Разбор ленты в пуле потоков, чтобы не блокировать обработку запросов
+            feed = await parse_feed(result.content)
+            self._remember_validators(name, url, 'rss', category, result.etag, result.last_modified, body_hash)
+
+            if not feed.entries:
+                logger.warning(f"No entries found in RSS feed: {url}")
+                return []
 
-                    articles = []
-                    for entry in feed.entries[:10]:  # Берем только 10 последних статей
-                        # Извлекаем основную информацию
-                        title = entry.get('title', 'Без заголовка')
-                        description = entry.get('description', '') or entry.get('summary', '')
-                        link = entry.get('link', '')
+            articles = []
+            for entry in feed.entries[:10]:  # Берем только 10 последних статей
+                # Извлекаем основную информацию
+                title = entry.get('title', 'Без заголовка')
+                description = entry.get('description', '') or entry.get('summary', '')
+                link = entry.get('link', '')
+
+                # Парсим дату
+                date = datetime.now().isoformat()
+                if hasattr(entry, 'published_parsed') and entry.published_parsed:
+                    try:
+                        import time
+                        date = datetime.fromtimestamp(time.mktime(entry.published_parsed)).isoformat()
+                    except:
+                        pass
 
-                        # Парсим дату
-                        date = datetime.now().isoformat()
-                        if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                            try:
-                                import time
-                                date = datetime.fromtimestamp(time.mktime(entry.published_parsed)).isoformat()
-                            except:
-                                pass
-
-                        # Извлекаем медиа контент
-                        media = None
-
-                        # Проверяем enclosures (вложения)
-                        if hasattr(entry, 'enclosures') and entry.enclosures:
-                            for enclosure in entry.enclosures:
-                                if hasattr(enclosure, 'type'):
-                                    if enclosure.type.startswith('image/'):
-                                        media = {
-                                            'type': 'photo',
-                                            'url': enclosure.href,
-                                            'thumbnail': enclosure.href
-                                        }
-                                        break
-                                    elif enclosure.type.startswith('video/'):
-                                        media = {
-                                            'type': 'video',
-                                            'url': enclosure.href,
-                                            'thumbnail': None
-                                        }
-                                        break
-
-                        # Проверяем media:content (альтернативный способ)
-                        if not media and hasattr(entry, 'media_content') and entry.media_content:
-                            for media_item in entry.media_content:
-                                if media_item.get('type', '').startswith('image/'):
-                                    media = {
-                                        'type': 'photo',
-                                        'url': media_item.get('url', ''),
-                                        'thumbnail': media_item.get('url', '')
-                                    }
-                                    break
-
-                        # Очищаем HTML теги из описания
-                        import re
-                        clean_description = re.sub(r'<[^>]+>', '', description)
-                        clean_description = clean_description.strip()[:300] + "..." if len(clean_description) > 300 else clean_description.strip()
-
-                        article = {
-                            'id': hashlib.md5(f"{url}_{title}".encode()).hexdigest(),
-                            'title': title,
-                            'text': clean_description,
-                            'link': link,
-                            'date': date,
-                            'source': name,
-                            'category': category,
-                            'media': media
-                        }
-
-                        articles.append(article)
-
-                    return articles
+                # Извлекаем медиа контент
+                media = None
+
+                # Проверяем enclosures (вложения)
+                if hasattr(entry, 'enclosures') and entry.enclosures:
+                    for enclosure in entry.enclosures:
+                        if hasattr(enclosure, 'type'):
+                            if enclosure.type.startswith('image/'):
+                                media = {
+                                    'type': 'photo',
+                                    'url': enclosure.href,
+                                    'thumbnail': enclosure.href
+                                }
+                                break
+                            elif enclosure.type.startswith('video/'):
+                                media = {
+                                    'type': 'video',
+                                    'url': enclosure.href,
+                                    'thumbnail': None
+                                }
+                                break
+
+                # Проверяем media:content (альтернативный способ)
+                if not media and hasattr(entry, 'media_content') and entry.media_content:
+                    for media_item in entry.media_content:
+                        if media_item.get('type', '').startswith('image/'):
+                            media = {
+                                'type': 'photo',
+                                'url': media_item.get('url', ''),
+                                'thumbnail': media_item.get('url', '')
+                            }
+                            break
+
+                # Очищаем HTML теги из описания
+                import re
+                clean_description = re.sub(r'<[^>]+>', '', description)
+                clean_description = clean_description.strip()[:300] + "..." if len(clean_description) > 300 else clean_description.strip()
+
+                article = {
+                    'id': hashlib.md5(f"{url}_{title}".encode()).hexdigest(),
+                    'title': title,
+                    'text': clean_description,
+                    'link': link,
+                    'date': date,
+                    'source': name,
+                    'category': category,
+                    'media': media
+                }
+
+                articles.append(article)
+
+            return articles
 
         except Exception as e:
             logger.error(f"Error fetching RSS from {url}: {e}")
+            self.fetch_errors[name] = str(e) or type(e).__name__
             return []
 
-    async def save_to_database(self, posts: List[Dict[str, Any]]):
-        """Сохранение новостей в базу данных"""
+    def _build_news_row(self, post: Dict[str, Any], source_id: int) -> Dict[str, Any]:
+        """Строка news_items для пакетной вставки"""
+        # Приводим медиа к каноническому списку один раз при записи,
+        # чтобы API отдавал его без разбора формата на каждом запросе
+        media_list = normalize_media(post.get('media'))
+        image_url = None
+        video_url = None
+
+        if media_list:
+            first_media = media_list[0]
+            if first_media['type'] == 'photo':
+                image_url = first_media['url']
+            elif first_media['type'] == 'video':
+                video_url = first_media['url']
+                image_url = first_media['thumbnail']
+
+        # Оценка времени чтения (используем сохраненное значение или вычисляем)
+        reading_time = post.get('reading_time', 1)
+        if not reading_time:
+            word_count = len(post['text'].split()) if post.get('text') else 0
+            reading_time = max(1, word_count // 200)
+
+        return {
+            'source_id': source_id,
+            'title': post['title'],
+            'content': post['text'],
+            'content_html': post.get('content_html', ''),  # Сохраняем HTML контент
+            'link': post['link'],
+            'publish_date': datetime.fromisoformat(post['date'].replace('Z', '+00:00')),
+            'category': post.get('category') or 'general',
+            'media': media_list,  # Канонический список медиа
+            'image_url': image_url,
+            'video_url': video_url,
+            'reading_time': reading_time,
+            'views_count': 0,
+            'author': post.get('source'),
+            'subtitle': None,
+            'content_hash': post_content_hash(post)
+        }
+
+    async def save_to_database(self, posts: List[Dict[str, Any]]) -> Optional[int]:
+        """Сохранение новостей в базу данных. Возвращает число новых записей или None при ошибке"""
         try:
             # Импортируем здесь, чтобы избежать циркулярного импорта
-            import server.main as main_module
-            from server.db import NewsItem
+            from server.db import get_db_session
+            from server.services.stats_service import increment_category_counters, invalidate_counts
+            from server.services.response_cache import bot_summary_cache, news_cache
+            from server.services.news_service import get_or_create_sources, insert_news_items
+            from server.services.search_service import index_news_items
+            from server.services.story_clusters import assign_story_clusters, link_batch_duplicates, remember_stored_items
 
-            if main_module.SessionLocal is None:
-                logger.error("Database not initialized")
-                return
-
-            db = main_module.SessionLocal()
+            # Общий движок и пул соединений процесса
+            db = get_db_session()
 
             try:
-                news_items = []
+                # Дедупликация внутри пакета по content_hash
+                unique_posts = {}
+                for post in posts:
+                    unique_posts.setdefault(post_content_hash(post), post)
+                posts = list(unique_posts.values())
+
+                # Все источники пакета - одним запросом
+                source_specs = {}
                 for post in posts:
-                    # Получаем или создаём источник
-                    from server.services.news_service import get_or_create_source
                     # Определяем тип источника и url
                     source_type = 'telegram' if post.get('channel') and not post.get('link', '').startswith('http') else 'rss'
-                    source_url = post.get('link') or ''
-                    category = post.get('category') or 'general'
-                    source = get_or_create_source(db, post.get('source', 'unknown'), url=source_url, source_type=source_type, category=category)
-                    # Проверяем, существует ли уже такая новость
-                    existing = db.query(NewsItem).filter(
-                        NewsItem.title == post['title']
-                    ).first()
-
-                    if existing:
-                        continue  # Пропускаем дубликаты
-
-                    # Извлекаем медиа данные
-                    image_url = None
-                    video_url = None
-                    media_json = None
-
-                    if post.get('media'):
-                        media_json = post['media']  # Сохраняем полный JSON медиа
-                        if post['media']['type'] == 'photo':
-                            image_url = post['media']['url']
-                        elif post['media']['type'] == 'video':
-                            video_url = post['media']['url']
-                            if not image_url and post['media'].get('thumbnail'):
-                                image_url = post['media']['thumbnail']
-
-                    # Получаем HTML контент если есть
-                    content_html = post.get('content_html', '')
-                    
-                    # Оценка времени чтения (используем сохраненное значение или вычисляем)
-                    reading_time = post.get('reading_time', 1)
-                    if not reading_time:
-                        word_count = len(post['text'].split()) if post.get('text') else 0
-                        reading_time = max(1, word_count // 200)
-
-                    news_item = NewsItem(
-                        source_id=source.id,
-                        title=post['title'],
-                        content=post['text'],
-                        content_html=content_html,  # Сохраняем HTML контент
-                        link=post['link'],
-                        publish_date=datetime.fromisoformat(post['date'].replace('Z', '+00:00')),
-                        category=category,
-                        media=media_json,  # Сохраняем JSON медиа
-                        image_url=image_url,
-                        video_url=video_url,
-                        reading_time=reading_time,
-                        views_count=0,
-                        author=post.get('source'),
-                        subtitle=None
-                    )
-
-                    news_items.append(news_item)
-
-                if news_items:
-                    db.bulk_save_objects(news_items)
+                    # Ссылка поста Telegram ведет на сообщение, источник - на канал
+                    source_url = f"https://t.me/{post['channel']}" if post.get('channel') else post.get('link')
+                    source_specs.setdefault(post.get('source', 'unknown'), {
+                        'url': source_url or '',
+                        'source_type': source_type,
+                        'category': post.get('category') or 'general'
+                    })
+                sources = get_or_create_sources(db, source_specs)
+
+                rows = [self._build_news_row(post, sources[post.get('source', 'unknown')].id) for post in posts]
+
+                # Почти-дубликаты из других источников складываются в одну историю
+                batch_duplicates = assign_story_clusters(db, rows)
+
+                # Пакетная вставка: уже сохраненные новости отсекает уникальный индекс по content_hash
+                inserted = insert_news_items(db, rows)
+                inserted_ids = {content_hash: item_id for item_id, _, content_hash in inserted}
+                link_batch_duplicates(db, batch_duplicates, inserted_ids)
+
+                if inserted:
+                    # Полнотекстовый индекс пополняется в той же транзакции, что и вставка
+                    rows_by_hash = {row['content_hash']: row for row in rows}
+                    index_news_items(db, [
+                        (item_id, rows_by_hash[content_hash]['title'], rows_by_hash[content_hash]['content'])
+                        for item_id, _, content_hash in inserted
+                    ])
+                    increment_category_counters(db, Counter(category for _, category, _ in inserted))
                     db.commit()
-                    logger.info(f"Saved {len(news_items)} new items to database")
+                    remember_stored_items(rows, inserted_ids, batch_duplicates)
+                    invalidate_counts()
+                    news_cache.invalidate()
+                    bot_summary_cache.invalidate()
+                    logger.info(f"Saved {len(inserted)} new items to database")
                 else:
+                    db.commit()
                     logger.info("No new items to save")
 
+                return len(inserted)
+
             finally:
                 db.close()
 
@@ -911,3 +1049,4 @@ class TelegramNewsService:
             if 'db' in locals():
                 db.rollback()
                 db.close()
+            return None
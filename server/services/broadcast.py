@@ -0,0 +1,260 @@
+# server/services/broadcast.py
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+
+from server.config import (
+    BROADCAST_BATCH_SIZE, BROADCAST_CONCURRENCY, BROADCAST_GLOBAL_RATE, BROADCAST_MAX_ATTEMPTS,
+    BROADCAST_PER_CHAT_INTERVAL, BROADCAST_RETRY_DELAY
+)
+from server.db import Broadcast, BotSubscription, get_db_session
+from server.utils.categorize import CATEGORY_KEYWORDS
+from server.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# 'all' - общая сводка последних новостей
+DIGEST_CATEGORIES = ['all', *CATEGORY_KEYWORDS, 'general']
+DIGEST_LIMIT = 5
+
+
+def subscribe(chat_id: int, category: str = 'all') -> bool:
+    """Подписывает чат на дайджест категории. False - подписка уже была"""
+    with get_db_session() as db:
+        if db.get(BotSubscription, (chat_id, category)) is not None:
+            return False
+        db.add(BotSubscription(chat_id=chat_id, category=category))
+        db.commit()
+        return True
+
+
+def unsubscribe(chat_id: int, category: Optional[str] = None) -> int:
+    """Отписывает чат от категории (None - от всех). Возвращает число удаленных подписок"""
+    with get_db_session() as db:
+        query = db.query(BotSubscription).filter(BotSubscription.chat_id == chat_id)
+        if category is not None:
+            query = query.filter(BotSubscription.category == category)
+        removed = query.delete(synchronize_session=False)
+        db.commit()
+        return removed
+
+
+def get_subscriptions(chat_id: int) -> List[str]:
+    with get_db_session() as db:
+        rows = db.query(BotSubscription.category).filter(BotSubscription.chat_id == chat_id).order_by(BotSubscription.category).all()
+    return [category for (category,) in rows]
+
+
+def subscribed_categories() -> List[str]:
+    """Категории, на которые есть хотя бы один подписчик"""
+    with get_db_session() as db:
+        rows = db.query(BotSubscription.category).distinct().all()
+    return [category for (category,) in rows]
+
+
+def create_broadcasts(bot, categories: List[str]) -> List[int]:
+    """
+    Создает по рассылке на категорию. Текст дайджеста рендерится здесь один раз
+    и сохраняется в рассылке, а не собирается заново для каждого чата
+    """
+    broadcast_ids = []
+    with get_db_session() as db:
+        for category in categories:
+            text = bot.get_news_summary(DIGEST_LIMIT) if category == 'all' else bot.get_news_by_category(category, DIGEST_LIMIT)
+            broadcast = Broadcast(category=category, text=text, status='pending', sent=0, failed=0)
+            db.add(broadcast)
+            db.flush()
+            broadcast_ids.append(broadcast.id)
+        db.commit()
+    return broadcast_ids
+
+
+def get_broadcast(broadcast_id: int) -> Optional[Dict[str, Any]]:
+    with get_db_session() as db:
+        broadcast = db.get(Broadcast, broadcast_id)
+        if broadcast is None:
+            return None
+        total = db.query(func.count()).select_from(BotSubscription).filter(BotSubscription.category == broadcast.category).scalar()
+        return {
+            'id': broadcast.id,
+            'category': broadcast.category,
+            'status': broadcast.status,
+            'sent': broadcast.sent,
+            'failed': broadcast.failed,
+            'subscribers': total,
+            'last_chat_id': broadcast.last_chat_id,
+            'error': broadcast.error,
+            'created_at': broadcast.created_at.isoformat() if broadcast.created_at else None,
+            'finished_at': broadcast.finished_at.isoformat() if broadcast.finished_at else None
+        }
+
+
+def _start_broadcast(broadcast_id: int) -> Optional[Dict[str, Any]]:
+    """Переводит рассылку в running и возвращает ее состояние; None - рассылки нет или она завершена"""
+    with get_db_session() as db:
+        broadcast = db.get(Broadcast, broadcast_id)
+        if broadcast is None or broadcast.status in ('done', 'failed'):
+            return None
+        state = {
+            'category': broadcast.category, 'text': broadcast.text, 'last_chat_id': broadcast.last_chat_id,
+            'sent': broadcast.sent, 'failed': broadcast.failed
+        }
+        broadcast.status = 'running'
+        db.commit()
+        return state
+
+
+def _next_chat_ids(category: str, last_chat_id: Optional[int], limit: int) -> List[int]:
+    """Следующая пачка подписчиков категории после last_chat_id"""
+    with get_db_session() as db:
+        query = db.query(BotSubscription.chat_id).filter(BotSubscription.category == category)
+        if last_chat_id is not None:
+            query = query.filter(BotSubscription.chat_id > last_chat_id)
+        return [chat_id for (chat_id,) in query.order_by(BotSubscription.chat_id).limit(limit)]
+
+
+def _save_progress(broadcast_id: int, last_chat_id: int, sent: int, failed: int, blocked: List[int]):
+    with get_db_session() as db:
+        if blocked:
+            # Бот заблокирован или чат удален - подписки больше не нужны
+            db.query(BotSubscription).filter(BotSubscription.chat_id.in_(blocked)).delete(synchronize_session=False)
+        db.query(Broadcast).filter(Broadcast.id == broadcast_id).update(
+            {'last_chat_id': last_chat_id, 'sent': sent, 'failed': failed}, synchronize_session=False
+        )
+        db.commit()
+
+
+def _finish_broadcast(broadcast_id: int, status: str, error: Optional[str]):
+    with get_db_session() as db:
+        db.query(Broadcast).filter(Broadcast.id == broadcast_id).update(
+            {'status': status, 'error': error, 'finished_at': datetime.utcnow()}, synchronize_session=False
+        )
+        db.commit()
+
+
+def _pending_broadcast_ids() -> List[int]:
+    with get_db_session() as db:
+        return [
+            broadcast_id for (broadcast_id,) in
+            db.query(Broadcast.id).filter(Broadcast.status.in_(['pending', 'running'])).order_by(Broadcast.id)
+        ]
+
+
+class ChatRateLimiter:
+    """Не чаще одного сообщения в interval секунд в один чат"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._last_sent: Dict[int, float] = {}
+
+    async def acquire(self, chat_id: int):
+        now = time.monotonic()
+        wait = self._last_sent.get(chat_id, 0) + self.interval - now
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._last_sent[chat_id] = time.monotonic()
+        if len(self._last_sent) > 10000:
+            # Чаты, которым давно ничего не отправлялось, ограничение уже не касается
+            threshold = time.monotonic() - self.interval
+            self._last_sent = {chat: sent for chat, sent in self._last_sent.items() if sent > threshold}
+
+
+class BroadcastEngine:
+    """
+    Рассылка дайджестов с соблюдением лимитов Telegram: общий token bucket на все
+    сообщения и интервал между сообщениями в один чат. На 429 вся рассылка ждет
+    retry_after из ответа. Прогресс сохраняется после каждой пачки подписчиков,
+    так что прерванная рассылка продолжается с last_chat_id.
+    """
+
+    def __init__(self, bot, rate: float = BROADCAST_GLOBAL_RATE, per_chat_interval: float = BROADCAST_PER_CHAT_INTERVAL,
+                 concurrency: int = BROADCAST_CONCURRENCY, batch_size: int = BROADCAST_BATCH_SIZE):
+        self.bot = bot
+        self.limiter = TokenBucket(rate, capacity=max(1, int(rate)))
+        self.chat_limiter = ChatRateLimiter(per_chat_interval)
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        # Общая пауза после 429: Telegram ограничивает бота целиком
+        self._paused_until = 0.0
+        # Рассылки выполняются по одной, чтобы вместе не превысить общий лимит
+        self._lock = asyncio.Lock()
+
+    async def _send(self, chat_id: int, text: str) -> str:
+        """Отправляет дайджест в чат: 'sent', 'failed' или 'blocked' (бот заблокирован, чат удален)"""
+        await self.chat_limiter.acquire(chat_id)
+        for attempt in range(1, BROADCAST_MAX_ATTEMPTS + 1):
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await self.limiter.acquire()
+            try:
+                status, payload = await self.bot.request("sendMessage", {"chat_id": chat_id, "text": text, "parse_mode": "HTML"})
+            except Exception as e:
+                logger.warning(f"Ошибка отправки в чат {chat_id} (попытка {attempt}): {e}")
+                if attempt < BROADCAST_MAX_ATTEMPTS:
+                    await asyncio.sleep(BROADCAST_RETRY_DELAY * 2 ** (attempt - 1))
+                continue
+
+            if status == 200:
+                return 'sent'
+            if status == 429:
+                retry_after = (payload.get('parameters') or {}).get('retry_after', 1)
+                logger.warning(f"Telegram 429, пауза рассылки {retry_after}s")
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                continue
+            if status == 403:
+                return 'blocked'
+            logger.warning(f"Не удалось отправить дайджест в чат {chat_id}: {status} {payload.get('description')}")
+            return 'failed'
+        return 'failed'
+
+    async def run(self, broadcast_id: int):
+        """Выполняет (или продолжает) одну рассылку. Запросы к базе идут через пул run_db бота"""
+        # Импортируем здесь, чтобы избежать циркулярного импорта (server.bot импортирует этот модуль)
+        from server.bot import run_db
+
+        state = await run_db(_start_broadcast, broadcast_id)
+        if state is None:
+            return
+        category, text, last_chat_id = state['category'], state['text'], state['last_chat_id']
+        sent, failed = state['sent'], state['failed']
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(chat_id: int) -> str:
+            async with semaphore:
+                return await self._send(chat_id, text)
+
+        try:
+            while True:
+                chat_ids = await run_db(_next_chat_ids, category, last_chat_id, self.batch_size)
+                if not chat_ids:
+                    break
+
+                results = await asyncio.gather(*(send(chat_id) for chat_id in chat_ids))
+                sent += results.count('sent')
+                failed += len(results) - results.count('sent')
+                blocked = [chat_id for chat_id, result in zip(chat_ids, results) if result == 'blocked']
+                last_chat_id = chat_ids[-1]
+
+                await run_db(_save_progress, broadcast_id, last_chat_id, sent, failed, blocked)
+
+            status, error = 'done', None
+        except Exception as e:
+            logger.error(f"Рассылка {broadcast_id} прервана: {e}")
+            status, error = 'failed', str(e) or type(e).__name__
+
+        await run_db(_finish_broadcast, broadcast_id, status, error)
+        logger.info(f"Рассылка {broadcast_id} (#{category}): отправлено {sent}, ошибок {failed}, статус {status}")
+
+    async def run_pending(self):
+        """Выполняет все незавершенные рассылки по порядку, в том числе прерванные перезапуском"""
+        from server.bot import run_db
+
+        async with self._lock:
+            for broadcast_id in await run_db(_pending_broadcast_ids):
+                await self.run(broadcast_id)
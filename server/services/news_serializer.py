@@ -0,0 +1,65 @@
+# server/services/news_serializer.py
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from server.db import NewsItem, NewsSource
+from server.utils.media import normalize_media
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_source(source: NewsSource) -> Dict[str, Any]:
+    """Источник в формате NewsSourceResponse"""
+    return {
+        'id': source.id,
+        'name': source.name,
+        'url': source.url,
+        'source_type': source.source_type,
+        'category': source.category,
+        'is_active': source.is_active is not False
+    }
+
+
+def serialize_news_items(items: List[NewsItem], sources: Dict[int, NewsSource]) -> List[Dict[str, Any]]:
+    """
+    Преобразует строки news_items в формат NewsItemResponse за один проход.
+    Медиа проходит через normalize_media: канонические списки новых строк он только
+    копирует, а старые строки (JSON-строка, один объект, список без type) приводит к MediaItem.
+    Новости без источника пропускаются - source в NewsItemResponse обязателен.
+    """
+    source_payloads = {source_id: serialize_source(source) for source_id, source in sources.items()}
+    now = datetime.now().isoformat()
+
+    data = []
+    for item in items:
+        source = source_payloads.get(item.source_id)
+        if source is None:
+            logger.warning(f"Новость {item.id} пропущена: источник {item.source_id} не найден")
+            continue
+        media = normalize_media(item.media, item.image_url, item.video_url)
+        data.append({
+            'id': item.id,
+            'title': item.title or "",
+            'content': item.content or "",  # Plain text
+            'content_html': item.content_html or "",  # HTML контент
+            'link': item.link or "",
+            'publish_date': item.publish_date.isoformat() if item.publish_date else now,
+            'category': item.category or "general",
+            'media': media,
+            'reading_time': item.reading_time,
+            'views_count': item.views_count or 0,
+            'author': item.author,
+            'source_name': source['name'],
+            'source_url': source['url'],
+            'source': source,
+            'duplicate_of': item.duplicate_of
+        })
+    return data
+
+
+def serialize_news_item(item: NewsItem, source: Optional[NewsSource]) -> Optional[Dict[str, Any]]:
+    """Одна новость в формате NewsItemResponse; None, если у нее нет источника"""
+    sources = {item.source_id: source} if source else {}
+    data = serialize_news_items([item], sources)
+    return data[0] if data else None
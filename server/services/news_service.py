@@ -1,6 +1,13 @@
 # services/news_service.py
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from server.db import NewsSource  # Импортируйте вашу модель NewsSource
+from server.db import NewsItem, NewsSource  # Импортируйте вашу модель NewsSource
+from server.utils.dedup import news_content_hash
+
+BACKFILL_BATCH_SIZE = 500
 
 
 def get_or_create_source(session: Session, source_name: str, url: str = None, source_type: str = None, category: str = None) -> NewsSource:
@@ -33,4 +40,100 @@ def get_or_create_source(session: Session, source_name: str, url: str = None, so
         session.add(source)
         session.flush()  # Получаем ID без коммита всей транзакции
 
-    return source
\ No newline at end of file
+    return source
+
+
+def get_or_create_sources(session: Session, sources: Dict[str, Dict[str, Any]]) -> Dict[str, NewsSource]:
+    """
+    Пакетный вариант get_or_create_source: один SELECT по всем именам
+    и один INSERT для недостающих источников.
+
+    Args:
+        session: SQLAlchemy сессия
+        sources: name -> {'url', 'source_type', 'category'}
+
+    Returns:
+        name -> NewsSource
+    """
+    if not sources:
+        return {}
+
+    found = session.query(NewsSource).filter(NewsSource.name.in_(list(sources))).all()
+    result = {source.name: source for source in found}
+
+    missing = [
+        NewsSource(
+            name=name,
+            url=spec.get('url') or '',
+            source_type=spec.get('source_type') or 'telegram',
+            category=spec.get('category'),
+            is_active=True
+        )
+        for name, spec in sources.items() if name not in result
+    ]
+    if missing:
+        session.add_all(missing)
+        session.flush()  # Получаем ID без коммита всей транзакции
+        result.update({source.name: source for source in missing})
+
+    return result
+
+
+def insert_news_items(session: Session, rows: List[Dict[str, Any]]) -> List[Tuple[int, str, str]]:
+    """
+    Вставляет новости одним выражением INSERT ... ON CONFLICT (content_hash) DO NOTHING
+    (PostgreSQL и SQLite). Уже сохраненные новости пропускаются пробой по уникальному индексу.
+
+    Returns:
+        (id, category, content_hash) для реально вставленных строк
+    """
+    if not rows:
+        return []
+
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        statement = postgresql.insert(NewsItem).on_conflict_do_nothing(index_elements=[NewsItem.content_hash])
+    elif dialect == 'sqlite':
+        statement = sqlite.insert(NewsItem).on_conflict_do_nothing(index_elements=[NewsItem.content_hash])
+    else:
+        statement = insert(NewsItem)
+
+    result = session.execute(statement.returning(NewsItem.id, NewsItem.category, NewsItem.content_hash), rows)
+    return [(row.id, row.category, row.content_hash) for row in result]
+
+
+def backfill_content_hashes(session: Session) -> int:
+    """
+    Заполняет content_hash у новостей, сохраненных до его появления.
+    Среди дубликатов ключ получает самая ранняя запись, у остальных он
+    остается NULL, чтобы уникальный индекс можно было построить без удаления данных.
+
+    Returns:
+        Количество записей, получивших content_hash
+    """
+    seen = set(session.scalars(select(NewsItem.content_hash).where(NewsItem.content_hash.isnot(None))))
+    source_names = dict(session.execute(select(NewsSource.id, NewsSource.name)).all())
+
+    updated = 0
+    last_id = 0
+    while True:
+        items = session.scalars(
+            select(NewsItem)
+            .where(NewsItem.id > last_id, NewsItem.content_hash.is_(None))
+            .order_by(NewsItem.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not items:
+            break
+
+        for item in items:
+            item_hash = news_content_hash(source_names.get(item.source_id), item.link, item.content or item.title)
+            if item_hash not in seen:
+                seen.add(item_hash)
+                item.content_hash = item_hash
+                updated += 1
+
+        session.commit()
+        last_id = items[-1].id
+
+    return updated
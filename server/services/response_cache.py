@@ -0,0 +1,94 @@
+# server/services/response_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+from server.config import RESPONSE_CACHE_TTL
+
+T = TypeVar('T')
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+
+
+class RenderCache(Generic[T]):
+    """
+    LRU кэш готовых отрендеренных значений (тексты сводок бота) с TTL.
+    Кэш живет внутри процесса: ingest этого процесса сбрасывает его целиком,
+    а изменения из других воркеров и скриптов видны не позже чем через ttl секунд.
+    Потокобезопасен: сводки бота рендерятся в пуле run_db, а сбрасывает кэш
+    ingest в потоке event loop.
+    """
+
+    def __init__(self, max_entries: int = 64, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[T, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[T]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if time.monotonic() - stored_at >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: T) -> T:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return value
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class ResponseCache(RenderCache[CachedResponse]):
+    """
+    Кэш готовых JSON ответов с сильными ETag. Как и RenderCache, сбрасывается
+    при сохранении новых новостей и устаревает через ttl секунд - за это время
+    клиенты могут получать 304 по уже измененным данным (удаления скриптами,
+    views_count, ingest в другом воркере).
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = RESPONSE_CACHE_TTL):
+        super().__init__(max_entries, ttl)
+
+    def set(self, key: Hashable, body: bytes) -> CachedResponse:
+        return super().set(key, CachedResponse(body=body, etag=make_etag(body)))
+
+
+def make_etag(body: bytes) -> str:
+    """Сильный ETag - хэш от байтов ответа"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверка If-None-Match (RFC 7232: для GET используется слабое сравнение)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return any(candidate.removeprefix('W/') == etag for candidate in candidates)
+
+
+# Кэш ответов ленты новостей (/api/news/)
+news_cache = ResponseCache()
+
+# Сводки бота (/news, /nft, /crypto и кнопки) по (категория, limit)
+bot_summary_cache: RenderCache[str] = RenderCache()
@@ -0,0 +1,182 @@
+# server/services/scheduler.py
+import asyncio
+import heapq
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from server.config import INGEST_CONCURRENCY, SCHEDULER_INITIAL_INTERVAL, SCHEDULER_INTERVALS
+
+logger = logging.getLogger(__name__)
+
+# Интервал подбирается так, чтобы за один опрос в среднем появлялось столько новых постов
+TARGET_ITEMS_PER_POLL = 1
+# Вес последнего наблюдения в скользящей оценке частоты постов
+RATE_SMOOTHING = 0.3
+# Рост интервала после опроса без новых постов и после ошибки (степень - число ошибок подряд)
+UNCHANGED_BACKOFF = 1.5
+ERROR_BACKOFF = 2
+# Случайный разброс времени опроса, чтобы источники не синхронизировались
+JITTER = 0.1
+# Как часто сверять расписание с реестром источников, сек
+SYNC_INTERVAL = 60
+
+SourceKey = Tuple[str, str]
+
+
+@dataclass
+class SourceSchedule:
+    source_type: str  # 'telegram' | 'rss'
+    source: Dict[str, str]
+    interval: float
+    next_due: float
+    rate: Optional[float] = None  # новых постов в секунду (скользящее среднее)
+    failures: int = 0
+    last_success: Optional[float] = None
+
+    @property
+    def name(self) -> str:
+        return self.source['name']
+
+
+class AdaptiveScheduler:
+    """
+    Планировщик обновления источников вместо общего цикла раз в 5 минут.
+    Время следующего опроса каждого источника хранится в куче; интервал подстраивается
+    под наблюдаемую частоту новых постов, растет после опросов без изменений и
+    экспоненциально после ошибок, оставаясь в границах SCHEDULER_INTERVALS для типа источника.
+    """
+
+    def __init__(self, service, concurrency: int = INGEST_CONCURRENCY):
+        self.service = service
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.schedules: Dict[SourceKey, SourceSchedule] = {}
+        # (время опроса, порядковый номер, ключ источника); устаревшие записи пропускаются при извлечении
+        self._heap: List[Tuple[float, int, SourceKey]] = []
+        self._counter = 0
+        self._running: Set[SourceKey] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._registry_version = None
+
+    def _limits(self, source_type: str) -> Tuple[float, float]:
+        return SCHEDULER_INTERVALS.get(source_type, SCHEDULER_INTERVALS['rss'])
+
+    def _push(self, key: SourceKey, schedule: SourceSchedule):
+        self._counter += 1
+        heapq.heappush(self._heap, (schedule.next_due, self._counter, key))
+
+    async def sync_sources(self):
+        """
+        Сверяет расписание с реестром источников (перечитывается, если news_sources изменилась):
+        новые источники опрашиваются сразу, удаленные и отключенные забываются.
+        Запросы реестра к базе выполняются в пуле потоков
+        """
+        registry = self.service.registry
+        await asyncio.to_thread(registry.refresh)
+        if registry.version == self._registry_version:
+            return
+        self._registry_version = registry.version
+
+        current = {('telegram', channel['name']): ('telegram', channel) for channel in self.service.channels}
+        current.update({('rss', source['name']): ('rss', source) for source in self.service.rss_sources})
+
+        now = time.monotonic()
+        for key, (source_type, source) in current.items():
+            schedule = self.schedules.get(key)
+            if schedule is not None:
+                schedule.source = source
+                continue
+            min_interval, max_interval = self._limits(source_type)
+            schedule = SourceSchedule(
+                source_type=source_type, source=source, next_due=now,
+                interval=min(max(SCHEDULER_INITIAL_INTERVAL, min_interval), max_interval)
+            )
+            self.schedules[key] = schedule
+            self._push(key, schedule)
+
+        for key in set(self.schedules) - set(current):
+            del self.schedules[key]
+
+    def _on_success(self, schedule: SourceSchedule, new_items: int, now: float) -> float:
+        min_interval, max_interval = self._limits(schedule.source_type)
+        schedule.failures = 0
+
+        if schedule.last_success is not None:
+            elapsed = max(now - schedule.last_success, 1.0)
+            observed = new_items / elapsed
+            schedule.rate = observed if schedule.rate is None else (
+                RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * schedule.rate
+            )
+        schedule.last_success = now
+
+        if new_items and schedule.rate:
+            interval = TARGET_ITEMS_PER_POLL / schedule.rate
+        elif new_items:
+            interval = schedule.interval  # первый опрос: частоту оценивать еще не по чему
+        else:
+            interval = schedule.interval * UNCHANGED_BACKOFF
+        schedule.interval = min(max(interval, min_interval), max_interval)
+        return schedule.interval
+
+    def _on_error(self, schedule: SourceSchedule) -> float:
+        # Обычный интервал не меняется: после восстановления источник опрашивается как раньше
+        _, max_interval = self._limits(schedule.source_type)
+        schedule.failures += 1
+        return min(schedule.interval * ERROR_BACKOFF ** schedule.failures, max_interval)
+
+    async def _refresh(self, key: SourceKey, schedule: SourceSchedule):
+        try:
+            async with self.semaphore:
+                try:
+                    new_items = await self.service.refresh_source(schedule.source_type, schedule.source)
+                except Exception as e:
+                    delay = self._on_error(schedule)
+                    logger.warning(f"Error updating {schedule.name} ({schedule.failures} in a row): {e}, retry in {delay:.0f}s")
+                else:
+                    delay = self._on_success(schedule, new_items, time.monotonic())
+                    logger.info(f"Updated {schedule.name}: {new_items} new, next in {delay:.0f}s")
+        finally:
+            self._running.discard(key)
+
+        schedule.next_due = time.monotonic() + delay * random.uniform(1 - JITTER, 1 + JITTER)
+        if self.schedules.get(key) is schedule:
+            self._push(key, schedule)
+            self._wakeup.set()
+
+    def _start_due(self, now: float):
+        while self._heap and self._heap[0][0] <= now:
+            due, _, key = heapq.heappop(self._heap)
+            schedule = self.schedules.get(key)
+            if schedule is None or schedule.next_due != due or key in self._running:
+                continue
+            self._running.add(key)
+            task = asyncio.create_task(self._refresh(key, schedule))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def run(self):
+        """Основной цикл (запускается из lifespan); при отмене отменяет и текущие загрузки"""
+        last_sync = None
+        try:
+            while True:
+                now = time.monotonic()
+                if last_sync is None or now - last_sync >= SYNC_INTERVAL:
+                    await self.sync_sources()
+                    last_sync = now
+
+                self._start_due(now)
+
+                timeout = SYNC_INTERVAL
+                if self._heap:
+                    timeout = min(max(self._heap[0][0] - time.monotonic(), 0), timeout)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
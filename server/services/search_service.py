@@ -0,0 +1,226 @@
+# server/services/search_service.py
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from server.config import SEARCH_CANDIDATE_LIMIT, SEARCH_RECENT_WINDOW
+from server.db import NewsItem
+
+# Вес заголовка выше веса текста: в PostgreSQL через setweight (A/B), в SQLite - весами bm25
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+
+# PostgreSQL: вектор хранится в генерируемой колонке и пересчитывается самой базой
+# при каждой вставке из ingest. Русская и английская конфигурации объединяются,
+# чтобы находились обе формы слова в смешанных текстах
+_PG_SEARCH_VECTOR = (
+    "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(content, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+)
+_PG_QUERY = "(websearch_to_tsquery('russian', :query) || websearch_to_tsquery('english', :query))"
+
+# Сначала ранжируются совпадения среди SEARCH_RECENT_WINDOW самых свежих новостей: окно берется
+# по индексу (category, publish_date, id) и стоит одинаково для частых и редких слов. Проверка
+# @@ на строке - это чтение и распаковка вектора (~5мкс), поэтому последовательный обход строк
+# до SEARCH_CANDIDATE_LIMIT совпадений на 1M новостей стоил сотни миллисекунд для слов
+# средней частоты. Запрос разбирается один раз в CTE q: в generic плане asyncpg подзапрос
+# (SELECT websearch_to_tsquery(...)) иначе разворачивался и разбирал запрос на каждой строке окна.
+# total - число совпадений в окне до фильтра курсора
+_PG_RECENT_SQL = f"""
+    WITH q AS MATERIALIZED (SELECT {_PG_QUERY} AS query)
+    SELECT id, score, total FROM (
+        SELECT recent.id, ts_rank_cd(recent.search_vector, q.query) AS score, count(*) OVER () AS total
+        FROM (
+            SELECT id, search_vector FROM news_items
+            {{category_filter}}
+            ORDER BY publish_date DESC, id DESC
+            LIMIT :window
+        ) AS recent, q
+        WHERE recent.search_vector @@ q.query
+    ) AS ranked
+    {{cursor_filter}}
+    ORDER BY score DESC, id DESC
+    LIMIT :limit
+"""
+
+# Если в окне не набирается страница, слово редкое: ранжируются SEARCH_CANDIDATE_LIMIT самых
+# свежих совпадений из GIN индекса. MATERIALIZED не дает планировщику заменить bitmap по GIN
+# обратным обходом первичного ключа с проверкой каждой строки, а категория проверяется уже
+# у кандидатов - BitmapAnd с индексом категории читал бы ее целиком
+_PG_SEARCH_SQL = f"""
+    WITH q AS MATERIALIZED (SELECT {_PG_QUERY} AS query),
+    matches AS MATERIALIZED (
+        SELECT id FROM news_items WHERE search_vector @@ (SELECT query FROM q)
+    )
+    SELECT id, score FROM (
+        SELECT candidates.id, ts_rank_cd(candidates.search_vector, q.query) AS score
+        FROM news_items AS candidates, q
+        WHERE candidates.id IN (SELECT id FROM matches ORDER BY id DESC LIMIT :candidates) {{category_filter}}
+    ) AS ranked
+    {{cursor_filter}}
+    ORDER BY score DESC, id DESC
+    LIMIT :limit
+"""
+
+# SQLite: отдельная FTS5 таблица с rowid = news_items.id, ее пополняет ingest (index_news_items).
+# Ранжируются SEARCH_CANDIDATE_LIMIT самых свежих совпадений; bm25 меньше у лучших, поэтому score = -bm25
+_SQLITE_SEARCH_SQL = f"""
+    SELECT id, score FROM (
+        SELECT news_items_fts.rowid AS id, -bm25(news_items_fts, {TITLE_WEIGHT}, {CONTENT_WEIGHT}) AS score
+        FROM news_items_fts
+        JOIN news_items ON news_items.id = news_items_fts.rowid
+        WHERE news_items_fts MATCH :query {{category_filter}}
+        ORDER BY news_items_fts.rowid DESC
+        LIMIT :candidates
+    ) AS ranked
+    {{cursor_filter}}
+    ORDER BY score DESC, id DESC
+    LIMIT :limit
+"""
+
+_CURSOR_FILTER = "WHERE score < :cursor_score OR (score = :cursor_score AND id < :cursor_id)"
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Длина слова, до которой SQLite ищет его по префиксу (см. _fts5_query)
+PREFIX_MAX_LENGTH = 3
+
+
+def create_search_index(connection) -> None:
+    """
+    Создает полнотекстовый индекс, если его еще нет:
+    PostgreSQL - генерируемая колонка news_items.search_vector (STORAGE MAIN) и GIN индекс по ней,
+    SQLite - FTS5 таблица news_items_fts
+    """
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        connection.execute(text(
+            f"ALTER TABLE news_items ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({_PG_SEARCH_VECTOR}) STORED"
+        ))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_news_items_search_vector ON news_items USING GIN (search_vector)"
+        ))
+        # Вектор держится в самой строке (STORAGE MAIN), а не в TOAST: поиск по окну свежих
+        # новостей читает его у каждой строки, и выборка из TOAST удваивала стоимость проверки @@
+        storage = connection.execute(text(
+            "SELECT attstorage FROM pg_attribute "
+            "WHERE attrelid = 'news_items'::regclass AND attname = 'search_vector'"
+        )).scalar()
+        if storage != 'm':
+            connection.execute(text("ALTER TABLE news_items ALTER COLUMN search_vector SET STORAGE MAIN"))
+            # Уже сохраненные векторы переезжают в строку только при перезаписи: UPDATE
+            # пересчитывает генерируемую колонку
+            connection.execute(text("UPDATE news_items SET title = title"))
+    elif dialect == 'sqlite':
+        # Префиксные индексы ускоряют запросы вида "слово"* (см. _fts5_query)
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS news_items_fts USING fts5("
+            "title, content, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        ))
+
+
+def index_news_items(session: Session, rows: Iterable[Tuple[int, str, str]]) -> int:
+    """
+    Добавляет новые новости (id, title, content) в FTS5 индекс SQLite в той же транзакции,
+    что и вставка. В PostgreSQL ничего не делает: вектор считает генерируемая колонка
+    """
+    rows = [{'id': item_id, 'title': title or '', 'content': content or ''} for item_id, title, content in rows]
+    if not rows or session.get_bind().dialect.name != 'sqlite':
+        return 0
+    # REPLACE: id удаленной новости может достаться новой строке
+    session.execute(text("INSERT OR REPLACE INTO news_items_fts (rowid, title, content) VALUES (:id, :title, :content)"), rows)
+    return len(rows)
+
+
+def backfill_search_index(session: Session) -> int:
+    """
+    Добавляет в FTS5 индекс SQLite новости, сохраненные до его появления, и убирает
+    из индекса удаленные новости. Возвращает число добавленных записей
+    """
+    if session.get_bind().dialect.name != 'sqlite':
+        return 0
+    result = session.execute(text(
+        "INSERT INTO news_items_fts (rowid, title, content) "
+        "SELECT id, coalesce(title, ''), coalesce(content, '') FROM news_items "
+        "WHERE id NOT IN (SELECT rowid FROM news_items_fts)"
+    ))
+    session.execute(text("DELETE FROM news_items_fts WHERE rowid NOT IN (SELECT id FROM news_items)"))
+    session.commit()
+    return result.rowcount
+
+
+def _fts5_query(query: str) -> Optional[str]:
+    """
+    Переводит пользовательский запрос в синтаксис FTS5: все слова обязательны, однобуквенные
+    пропускаются. По префиксу ищутся только слова до PREFIX_MAX_LENGTH букв (их обслуживают
+    префиксные индексы '2 3'), длинные - точной формой: префиксный запрос по длинному слову
+    FTS5 собирает из полного списка документов, и частые слова на 1M новостей стоили p95 > 50ms.
+    None - в запросе нет ни одного слова
+    """
+    tokens = _TOKEN_RE.findall(query.lower())
+    if not tokens:
+        return None
+    # Однобуквенные слова (в, и, a) по префиксу совпадают почти со всем индексом
+    tokens = [token for token in tokens if len(token) > 1] or tokens
+    return ' '.join(f'"{token}"*' if len(token) <= PREFIX_MAX_LENGTH else f'"{token}"' for token in tokens)
+
+
+async def search_news(db: AsyncSession, query: str, category: Optional[str] = None, limit: int = 20,
+                      cursor: Optional[Tuple[float, int]] = None) -> Tuple[List[NewsItem], List[float], bool]:
+    """
+    Полнотекстовый поиск по заголовку и тексту новостей.
+    Результаты упорядочены по релевантности (score DESC, id DESC); cursor - (score, id)
+    последнего результата предыдущей страницы.
+
+    Курсор не защищает от изменений между страницами: новые новости меняют набор
+    кандидатов, а в SQLite еще и IDF в bm25, поэтому score уже выданных результатов
+    пересчитывается - при листании во время ingest результаты могут повториться или пропасть.
+
+    Returns:
+        (новости, их score, есть ли следующая страница)
+    """
+    dialect = db.bind.dialect.name
+    params: Dict[str, Any] = {'candidates': SEARCH_CANDIDATE_LIMIT, 'limit': limit + 1}
+    if category:
+        params['category'] = category
+    cursor_filter = ''
+    if cursor:
+        cursor_filter = _CURSOR_FILTER
+        params['cursor_score'], params['cursor_id'] = cursor
+
+    if dialect == 'postgresql':
+        params['query'] = query
+        params['window'] = SEARCH_RECENT_WINDOW
+        recent_sql = _PG_RECENT_SQL.format(category_filter='WHERE category = :category' if category else '',
+                                           cursor_filter=cursor_filter)
+        ranked = (await db.execute(text(recent_sql), params)).all()
+        # Решение зависит только от числа совпадений в окне, а не от курсора,
+        # поэтому все страницы одного запроса берутся из одного набора кандидатов
+        if not ranked or ranked[0].total <= limit:
+            search_sql = _PG_SEARCH_SQL.format(category_filter='AND candidates.category = :category' if category else '',
+                                               cursor_filter=cursor_filter)
+            ranked = (await db.execute(text(search_sql), params)).all()
+    elif dialect == 'sqlite':
+        params['query'] = _fts5_query(query)
+        if params['query'] is None:
+            return [], [], False
+        search_sql = _SQLITE_SEARCH_SQL.format(category_filter='AND news_items.category = :category' if category else '',
+                                               cursor_filter=cursor_filter)
+        ranked = (await db.execute(text(search_sql), params)).all()
+    else:
+        raise RuntimeError(f"Полнотекстовый поиск не поддерживается для {dialect}")
+
+    has_more = len(ranked) > limit
+    ranked = ranked[:limit]
+    if not ranked:
+        return [], [], False
+
+    items = {item.id: item for item in (await db.execute(select(NewsItem).where(NewsItem.id.in_([row.id for row in ranked])))).scalars()}
+    ranked = [row for row in ranked if row.id in items]
+    return [items[row.id] for row in ranked], [row.score for row in ranked], has_more
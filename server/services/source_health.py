@@ -0,0 +1,125 @@
+# server/services/source_health.py
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Set
+
+from server.config import BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+BREAKER_CLOSED = 'closed'
+BREAKER_OPEN = 'open'
+BREAKER_HALF_OPEN = 'half_open'
+
+
+class SourceHealthTracker:
+    """
+    Здоровье источников и circuit breaker для каждого из них.
+    После failure_threshold ошибок подряд breaker открывается, и источник не загружается
+    reset_timeout секунд; затем одна пробная загрузка (half_open) либо закрывает его,
+    либо снова открывает. Состояние хранится в news_sources и переживает перезапуск.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = timedelta(seconds=reset_timeout)
+        # Загружаются из news_sources при первом обращении
+        self.states: Optional[Dict[str, Dict[str, Any]]] = None
+        # Источники, пробная загрузка которых сейчас идет
+        self._probing: Set[str] = set()
+
+    def _load_states(self) -> Dict[str, Dict[str, Any]]:
+        from server.db import NewsSource, get_db_session
+
+        try:
+            with get_db_session() as db:
+                rows = db.query(
+                    NewsSource.name, NewsSource.breaker_state, NewsSource.consecutive_failures,
+                    NewsSource.breaker_opened_at
+                ).all()
+            return {
+                name: {
+                    'breaker_state': breaker_state or BREAKER_CLOSED,
+                    'consecutive_failures': consecutive_failures or 0,
+                    'breaker_opened_at': breaker_opened_at
+                }
+                for name, breaker_state, consecutive_failures, breaker_opened_at in rows
+            }
+        except Exception as e:
+            logger.warning(f"Could not load source health: {e}")
+            return {}
+
+    def _state(self, name: str) -> Dict[str, Any]:
+        if self.states is None:
+            self.states = self._load_states()
+        return self.states.setdefault(name, {
+            'breaker_state': BREAKER_CLOSED, 'consecutive_failures': 0, 'breaker_opened_at': None
+        })
+
+    def allow(self, name: str) -> bool:
+        """Можно ли загружать источник сейчас"""
+        state = self._state(name)
+        if state['breaker_state'] == BREAKER_CLOSED:
+            return True
+        if name in self._probing:
+            return False
+
+        opened_at = state['breaker_opened_at']
+        if state['breaker_state'] == BREAKER_OPEN and opened_at and datetime.utcnow() - opened_at < self.reset_timeout:
+            return False
+
+        # Таймаут истек (или пробная загрузка прервалась перезапуском) - пропускаем одну загрузку
+        state['breaker_state'] = BREAKER_HALF_OPEN
+        self._probing.add(name)
+        return True
+
+    async def record(self, source_type: str, source: Dict[str, str], latency: float, error: Optional[str] = None):
+        """
+        Результат загрузки источника: обновляет breaker в памяти и сохраняет здоровье
+        в news_sources в пуле потоков, не блокируя event loop
+        """
+        name = source['name']
+        state = self._state(name)
+        self._probing.discard(name)
+        now = datetime.utcnow()
+
+        if error is None:
+            if state['breaker_state'] != BREAKER_CLOSED:
+                logger.info(f"Source {name} recovered, closing circuit breaker")
+            state.update(breaker_state=BREAKER_CLOSED, consecutive_failures=0, breaker_opened_at=None)
+        else:
+            state['consecutive_failures'] += 1
+            if state['breaker_state'] == BREAKER_HALF_OPEN or state['consecutive_failures'] >= self.failure_threshold:
+                if state['breaker_state'] != BREAKER_OPEN:
+                    logger.warning(
+                        f"Opening circuit breaker for {name} after {state['consecutive_failures']} failures, "
+                        f"next attempt in {self.reset_timeout.total_seconds():.0f}s"
+                    )
+                state.update(breaker_state=BREAKER_OPEN, breaker_opened_at=now)
+
+        await asyncio.to_thread(self._save, source_type, source, dict(state), latency, error, now)
+
+    def _save(self, source_type: str, source: Dict[str, str], state: Dict[str, Any], latency: float,
+              error: Optional[str], now: datetime):
+        from server.db import get_db_session
+        from server.services.news_service import get_or_create_source
+
+        url = source.get('url') or f"https://t.me/{source['username']}"
+        try:
+            with get_db_session() as db:
+                row = get_or_create_source(db, source['name'], url=url, source_type=source_type,
+                                           category=source.get('category'))
+                row.breaker_state = state['breaker_state']
+                row.consecutive_failures = state['consecutive_failures']
+                row.breaker_opened_at = state['breaker_opened_at']
+                row.last_latency_ms = int(latency * 1000)
+                if error is None:
+                    row.last_success_at = now
+                else:
+                    row.last_error = error[:1000]
+                    row.last_failure_at = now
+                db.commit()
+        except Exception as e:
+            logger.error(f"Error saving health of {source['name']}: {e}")
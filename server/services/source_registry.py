@@ -0,0 +1,148 @@
+# server/services/source_registry.py
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from server.db import NewsSource, get_db_session
+
+logger = logging.getLogger(__name__)
+
+# Источники, которые регистрируются в news_sources при первой миграции.
+# Дальше список ведется в таблице (scripts/manage_sources.py), без деплоя
+DEFAULT_CHANNELS = [
+    {'username': 'nextgen_NFT', 'name': 'NextGen NFT', 'category': 'nft'}
+]
+DEFAULT_RSS_SOURCES = [
+    {'url': 'https://vc.ru/rss', 'name': 'VC.ru', 'category': 'tech'},
+    {'url': 'https://www.coindesk.com/arc/outboundfeeds/rss/', 'name': 'CoinDesk', 'category': 'crypto'},
+    {'url': 'https://cointelegraph.com/rss', 'name': 'Cointelegraph', 'category': 'crypto'},
+    {'url': 'https://habr.com/ru/rss/articles/', 'name': 'Habr NFT', 'category': 'nft'}
+]
+
+TELEGRAM_CHANNEL_URL_RE = re.compile(r'^https?://t\.me/(?:s/)?([A-Za-z0-9_]+)/?$')
+
+
+def channel_url(username: str) -> str:
+    return f"https://t.me/{username}"
+
+
+def register_default_sources(session: Session) -> int:
+    """
+    Регистрирует DEFAULT_CHANNELS / DEFAULT_RSS_SOURCES в news_sources (data-миграция).
+    Строки, которые save_to_database раньше создавал сам, получают правильный url ленты:
+    для RSS туда записывалась ссылка на первую статью
+    """
+    specs = [(channel_url(channel['username']), 'telegram', channel) for channel in DEFAULT_CHANNELS]
+    specs += [(source['url'], 'rss', source) for source in DEFAULT_RSS_SOURCES]
+
+    existing = {
+        source.name: source
+        for source in session.query(NewsSource).filter(NewsSource.name.in_([spec['name'] for _, _, spec in specs]))
+    }
+    now = datetime.utcnow()
+    changed = 0
+    for url, source_type, spec in specs:
+        source = existing.get(spec['name'])
+        if source is None:
+            session.add(NewsSource(name=spec['name'], url=url, source_type=source_type,
+                                   category=spec['category'], is_active=True, updated_at=now))
+            changed += 1
+        elif source.url != url or source.source_type != source_type:
+            source.url = url
+            source.source_type = source_type
+            source.updated_at = now
+            changed += 1
+    session.commit()
+    return changed
+
+
+class SourceRegistry:
+    """
+    Реестр источников из news_sources с индексами в памяти:
+    поиск канала по username и ленты по имени - O(1) вместо обхода списка.
+    refresh() дешево проверяет, менялась ли таблица (max(updated_at) и число строк),
+    и перечитывает ее только тогда - так источники добавляются и отключаются без перезапуска
+    """
+
+    def __init__(self):
+        self.channels: List[Dict[str, str]] = []
+        self.rss_sources: List[Dict[str, str]] = []
+        self._channels_by_username: Dict[str, Dict[str, str]] = {}
+        self._rss_by_name: Dict[str, Dict[str, str]] = {}
+        # Увеличивается при каждой перезагрузке - по нему планировщик понимает, что список изменился
+        self.version = 0
+        self._stamp: Optional[Tuple[Any, int]] = None
+
+    def _current_stamp(self, session: Session) -> Tuple[Any, int]:
+        return tuple(session.execute(select(func.max(NewsSource.updated_at), func.count(NewsSource.id))).one())
+
+    def load(self, session: Session):
+        """Перечитывает активные источники и перестраивает индексы"""
+        stamp = self._current_stamp(session)
+        rows = session.execute(
+            select(NewsSource.name, NewsSource.url, NewsSource.source_type, NewsSource.category)
+            .where(NewsSource.is_active.isnot(False), NewsSource.source_type.in_(['telegram', 'rss']))
+            .order_by(NewsSource.id)
+        ).all()
+
+        channels_by_username = {}
+        rss_by_name = {}
+        for name, url, source_type, category in rows:
+            category = category or 'general'
+            if source_type == 'telegram':
+                match = TELEGRAM_CHANNEL_URL_RE.match(url or '')
+                if not match:
+                    logger.warning(f"Telegram source {name} has no channel url ({url}), skipping")
+                    continue
+                channels_by_username[match.group(1)] = {
+                    'username': match.group(1), 'name': name, 'category': category, 'url': url
+                }
+            elif url:
+                rss_by_name[name] = {'url': url, 'name': name, 'category': category}
+
+        self._channels_by_username = channels_by_username
+        self._rss_by_name = rss_by_name
+        self.channels = list(channels_by_username.values())
+        self.rss_sources = list(rss_by_name.values())
+        self._stamp = stamp
+        self.version += 1
+        logger.info(f"Реестр источников загружен: {len(self.channels)} каналов, {len(self.rss_sources)} RSS лент")
+
+    def refresh(self) -> bool:
+        """Перезагружает реестр, если news_sources изменилась. Возвращает True при перезагрузке"""
+        try:
+            with get_db_session() as session:
+                if self._stamp is not None and self._current_stamp(session) == self._stamp:
+                    return False
+                self.load(session)
+                return True
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке реестра источников: {e}")
+            return False
+
+    def _ensure_loaded(self):
+        if self._stamp is None:
+            self.refresh()
+
+    def get_channel(self, username: str) -> Optional[Dict[str, str]]:
+        self._ensure_loaded()
+        return self._channels_by_username.get(username)
+
+    def get_rss_source(self, name: str) -> Optional[Dict[str, str]]:
+        self._ensure_loaded()
+        return self._rss_by_name.get(name)
+
+    def get_channels(self) -> List[Dict[str, str]]:
+        self._ensure_loaded()
+        return self.channels
+
+    def get_rss_sources(self) -> List[Dict[str, str]]:
+        self._ensure_loaded()
+        return self.rss_sources
+
+
+source_registry = SourceRegistry()
@@ -0,0 +1,100 @@
+# server/services/stats_service.py
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from server.db import NewsItem, NewsCategoryCounter
+
+# Снимок счётчиков news_category_counters: (category -> count, timestamp).
+# Живет между циклами ingest, TTL - страховка от удалений в обход сервиса
+COUNT_CACHE_TTL = 60  # секунд
+_counts_cache: Optional[Tuple[Dict[str, int], float]] = None
+
+_counts_query = select(NewsCategoryCounter.category, NewsCategoryCounter.count)
+
+
+def _cached_counts() -> Optional[Dict[str, int]]:
+    if _counts_cache and time.monotonic() - _counts_cache[1] < COUNT_CACHE_TTL:
+        return _counts_cache[0]
+    return None
+
+
+def _store_counts(rows) -> Dict[str, int]:
+    global _counts_cache
+    counts = {category: count for category, count in rows if count}
+    _counts_cache = (counts, time.monotonic())
+    return counts
+
+
+def get_category_counts(db: Session) -> Dict[str, int]:
+    """Количество новостей по категориям (синхронная сессия - для бота и скриптов)"""
+    counts = _cached_counts()
+    if counts is None:
+        counts = _store_counts(db.execute(_counts_query).all())
+    return dict(counts)
+
+
+async def get_category_counts_async(db: AsyncSession) -> Dict[str, int]:
+    """Количество новостей по категориям (асинхронная сессия - для API)"""
+    counts = _cached_counts()
+    if counts is None:
+        counts = _store_counts((await db.execute(_counts_query)).all())
+    return dict(counts)
+
+
+async def count_news(db: AsyncSession, category: Optional[str] = None) -> int:
+    """
+    Возвращает количество новостей (всего или по категории).
+    Читается из таблицы счётчиков, а не COUNT(*) по news_items.
+    """
+    counts = await get_category_counts_async(db)
+    if category:
+        return counts.get(category, 0)
+    return sum(counts.values())
+
+
+async def count_stories(db: AsyncSession, category: Optional[str] = None) -> int:
+    """
+    Количество историй - новостей без duplicate_of (лента с collapse_duplicates).
+    Таблица счётчиков дубликаты не различает, поэтому здесь COUNT(*).
+    """
+    query = select(func.count(NewsItem.id)).where(NewsItem.duplicate_of.is_(None))
+    if category:
+        query = query.where(NewsItem.category == category)
+    return (await db.execute(query)).scalar_one()
+
+
+def increment_category_counters(db: Session, increments: Dict[str, int]):
+    """
+    Увеличивает счётчики категорий в текущей транзакции ingest.
+    Коммит делает вызывающий код вместе с самими новостями.
+    """
+    for category, amount in increments.items():
+        result = db.execute(
+            update(NewsCategoryCounter)
+            .where(NewsCategoryCounter.category == category)
+            .values(count=NewsCategoryCounter.count + amount)
+        )
+        if result.rowcount == 0:
+            db.add(NewsCategoryCounter(category=category, count=amount))
+    db.flush()
+
+
+def rebuild_category_counters(db: Session):
+    """Пересчитывает таблицу счётчиков одним GROUP BY (миграция, массовое удаление)"""
+    rows = db.execute(
+        select(NewsItem.category, func.count(NewsItem.id)).group_by(NewsItem.category)
+    ).all()
+    db.execute(delete(NewsCategoryCounter))
+    db.add_all(NewsCategoryCounter(category=category, count=count) for category, count in rows if category)
+    db.commit()
+    invalidate_counts()
+
+
+def invalidate_counts():
+    """Сбрасывает снимок счётчиков (после сохранения новых новостей)"""
+    global _counts_cache
+    _counts_cache = None
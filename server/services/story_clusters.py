@@ -0,0 +1,132 @@
+# server/services/story_clusters.py
+import logging
+from typing import Any, Dict, List
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from server.config import NEAR_DUPLICATE_INDEX_SIZE
+from server.db import NewsItem
+from server.utils.simhash import SimHashIndex, from_signed, simhash, to_signed
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 500
+
+# Индекс последних новостей процесса. Загружается из базы при первом ingest
+# и пополняется после каждого сохранения, так что сравнение идет только
+# с кандидатами из совпадающих LSH-полос
+story_index = SimHashIndex(NEAR_DUPLICATE_INDEX_SIZE)
+_index_loaded = False
+
+
+def _ensure_index_loaded(session: Session):
+    global _index_loaded
+    if _index_loaded:
+        return
+
+    rows = session.execute(
+        select(NewsItem.id, NewsItem.simhash, NewsItem.duplicate_of, NewsItem.source_id)
+        .where(NewsItem.simhash.isnot(None))
+        .order_by(NewsItem.id.desc())
+        .limit(NEAR_DUPLICATE_INDEX_SIZE)
+    ).all()
+    for item_id, fingerprint, duplicate_of, source_id in reversed(rows):
+        story_index.add(item_id, from_signed(fingerprint), duplicate_of, source_id)
+
+    _index_loaded = True
+    logger.info(f"Индекс почти-дубликатов загружен: {len(story_index)} новостей")
+
+
+def assign_story_clusters(session: Session, rows: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Заполняет simhash и duplicate_of у строк перед вставкой.
+    Строка, похожая на уже сохраненную новость другого источника, сразу получает duplicate_of.
+    Совпадения внутри пакета id еще не имеют и возвращаются как
+    content_hash строки -> content_hash первой строки истории (см. link_batch_duplicates).
+    """
+    _ensure_index_loaded(session)
+
+    fingerprints = [simhash(row['title'], row['content']) for row in rows]
+    matches = [story_index.find(fingerprint, row['source_id']) for row, fingerprint in zip(rows, fingerprints)]
+
+    # Новости могли удалить (clear_old_news) после попадания в индекс
+    candidate_ids = {match for match in matches if match is not None}
+    live_ids = set(session.scalars(select(NewsItem.id).where(NewsItem.id.in_(candidate_ids)))) if candidate_ids else set()
+
+    batch_index = SimHashIndex(len(rows) or 1)
+    batch_duplicates = {}
+    for position, (row, fingerprint, match) in enumerate(zip(rows, fingerprints, matches)):
+        row['simhash'] = to_signed(fingerprint)
+        row['duplicate_of'] = match if match in live_ids else None
+
+        if row['duplicate_of'] is None:
+            root_position = batch_index.find(fingerprint, row['source_id'])
+            if root_position is not None:
+                batch_duplicates[row['content_hash']] = rows[root_position]['content_hash']
+            batch_index.add(position, fingerprint, root_position, row['source_id'])
+
+    return batch_duplicates
+
+
+def link_batch_duplicates(session: Session, batch_duplicates: Dict[str, str], inserted_ids: Dict[str, int]):
+    """Проставляет duplicate_of для совпадений внутри пакета, когда id уже известны"""
+    links = [
+        {'item_id': inserted_ids[content_hash], 'root_id': inserted_ids[root_hash]}
+        for content_hash, root_hash in batch_duplicates.items()
+        if content_hash in inserted_ids and root_hash in inserted_ids
+    ]
+    if links:
+        session.connection().execute(
+            update(NewsItem.__table__)
+            .where(NewsItem.__table__.c.id == bindparam('item_id'))
+            .values(duplicate_of=bindparam('root_id')),
+            links
+        )
+
+
+def remember_stored_items(rows: List[Dict[str, Any]], inserted_ids: Dict[str, int], batch_duplicates: Dict[str, str]):
+    """Добавляет сохраненные (уже закоммиченные) новости в индекс"""
+    for row in rows:
+        item_id = inserted_ids.get(row['content_hash'])
+        if item_id is None:
+            continue
+        root_id = row['duplicate_of']
+        if root_id is None and row['content_hash'] in batch_duplicates:
+            root_id = inserted_ids.get(batch_duplicates[row['content_hash']])
+        story_index.add(item_id, from_signed(row['simhash']), root_id, row['source_id'])
+
+
+def backfill_story_clusters(session: Session) -> int:
+    """
+    Считает simhash и duplicate_of для новостей, сохраненных до появления кластеров.
+    Новости обходятся в порядке id, поэтому первой новостью истории становится самая ранняя.
+
+    Returns:
+        Количество обработанных новостей
+    """
+    _ensure_index_loaded(session)
+
+    updated = 0
+    last_id = 0
+    while True:
+        items = session.scalars(
+            select(NewsItem)
+            .where(NewsItem.id > last_id, NewsItem.simhash.is_(None))
+            .order_by(NewsItem.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not items:
+            break
+
+        for item in items:
+            fingerprint = simhash(item.title, item.content)
+            item.simhash = to_signed(fingerprint)
+            item.duplicate_of = story_index.find(fingerprint, item.source_id)
+            story_index.add(item.id, fingerprint, item.duplicate_of, item.source_id)
+            updated += 1
+
+        session.commit()
+        last_id = items[-1].id
+
+    return updated
@@ -0,0 +1,163 @@
+# server/services/telegram_backfill.py
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from server.config import (
+    INGEST_SOURCE_TIMEOUT, TELEGRAM_BACKFILL_CONCURRENCY, TELEGRAM_BACKFILL_PAGE_SIZE, TELEGRAM_BACKFILL_RATE
+)
+from server.db import TelegramBackfillCheckpoint, get_db_session
+from server.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+def _get_checkpoint(channel: str) -> Dict[str, Any]:
+    with get_db_session() as db:
+        checkpoint = db.get(TelegramBackfillCheckpoint, channel)
+        if checkpoint is None:
+            checkpoint = TelegramBackfillCheckpoint(channel=channel, status='running', pages_done=0, posts_saved=0)
+            db.add(checkpoint)
+            db.commit()
+        return {
+            'channel': checkpoint.channel,
+            'next_before': checkpoint.next_before,
+            'status': checkpoint.status,
+            'pages_done': checkpoint.pages_done,
+            'posts_saved': checkpoint.posts_saved,
+            'error': checkpoint.error
+        }
+
+
+def _save_checkpoint(checkpoint: Dict[str, Any]):
+    with get_db_session() as db:
+        row = db.get(TelegramBackfillCheckpoint, checkpoint['channel'])
+        for field in ('next_before', 'status', 'pages_done', 'posts_saved', 'error'):
+            setattr(row, field, checkpoint[field])
+        db.commit()
+
+
+def get_unfinished_backfills() -> List[str]:
+    """Каналы, загрузка истории которых прервалась (перезапуск сервиса)"""
+    with get_db_session() as db:
+        rows = db.query(TelegramBackfillCheckpoint.channel).filter(TelegramBackfillCheckpoint.status == 'running').all()
+    return [channel for (channel,) in rows]
+
+
+async def backfill_channel(service, channel: str, max_pages: Optional[int] = None,
+                           concurrency: int = TELEGRAM_BACKFILL_CONCURRENCY,
+                           rate: float = TELEGRAM_BACKFILL_RATE) -> Dict[str, Any]:
+    """
+    Загружает историю канала назад от первой страницы через t.me/s/<channel>?before=N.
+
+    Страницы запрашиваются волнами по concurrency штук с шагом TELEGRAM_BACKFILL_PAGE_SIZE:
+    страница ?before=N содержит 20 сообщений младше N, поэтому окна перекрываются, но не
+    оставляют разрывов (повторы отсекает content_hash). Посты каждой волны сразу уходят
+    в save_to_database, после чего позиция сохраняется в telegram_backfill_checkpoints -
+    повторный запуск продолжает с нее.
+
+    Args:
+        service: запущенный TelegramNewsService (общий HTTP клиент)
+        channel: username канала из реестра источников
+        max_pages: ограничение страниц за этот запуск (None - до начала канала)
+
+    Returns:
+        Состояние checkpoint после запуска
+    """
+    if service.registry.get_channel(channel) is None:
+        raise ValueError(f"Channel {channel} not found in configured channels")
+
+    checkpoint = _get_checkpoint(channel)
+    if checkpoint['status'] == 'done':
+        logger.info(f"Backfill of {channel} is already done")
+        return checkpoint
+
+    checkpoint['status'] = 'running'
+    checkpoint['error'] = None
+
+    limiter = TokenBucket(rate, capacity=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_page(before: int):
+        async with semaphore:
+            await limiter.acquire()
+            return await asyncio.wait_for(service.fetch_telegram_page(channel, before=before), INGEST_SOURCE_TIMEOUT)
+
+    try:
+        before = checkpoint['next_before']
+        if before is None:
+            # Первая страница уже загружается обычным циклом обновления
+            await limiter.acquire()
+            _, page_numbers = await service.fetch_telegram_page(channel)
+            before = min(page_numbers, default=1)
+
+        pages = 0
+        while before > 1 and (max_pages is None or pages < max_pages):
+            wave_size = concurrency if max_pages is None else min(concurrency, max_pages - pages)
+            wave = [before - i * TELEGRAM_BACKFILL_PAGE_SIZE for i in range(wave_size)]
+            wave = [page_before for page_before in wave if page_before > 1]
+
+            results = await asyncio.gather(*(fetch_page(page_before) for page_before in wave), return_exceptions=True)
+
+            # Страницы принимаются по порядку до первой ошибки, чтобы checkpoint не перепрыгнул разрыв
+            posts = []
+            fetched = 0
+            exhausted = False
+            error = None
+            for result in results:
+                if isinstance(result, BaseException):
+                    error = result
+                    break
+                page_posts, page_numbers = result
+                posts.extend(page_posts)
+                fetched += 1
+                if not page_numbers:
+                    exhausted = True
+                    break
+
+            if posts:
+                saved = await service.save_to_database(posts)
+                if saved is None:
+                    raise RuntimeError("save_to_database failed")
+                checkpoint['posts_saved'] += saved
+
+            if fetched:
+                before = wave[fetched - 1] - TELEGRAM_BACKFILL_PAGE_SIZE
+                pages += fetched
+                checkpoint['pages_done'] += fetched
+            checkpoint['next_before'] = before
+            if exhausted or before <= 1:
+                checkpoint['status'] = 'done'
+            _save_checkpoint(checkpoint)
+
+            if error is not None:
+                raise error
+            if exhausted:
+                break
+
+            logger.info(f"Backfill {channel}: {checkpoint['pages_done']} pages, {checkpoint['posts_saved']} posts, next before={before}")
+
+        if before <= 1:
+            checkpoint['status'] = 'done'
+        elif checkpoint['status'] != 'done':
+            # Остановились по max_pages: продолжит следующий запуск скрипта, но не lifespan
+            checkpoint['status'] = 'paused'
+        _save_checkpoint(checkpoint)
+
+    except Exception as e:
+        logger.error(f"Backfill of {channel} failed at before={checkpoint['next_before']}: {e}")
+        checkpoint['status'] = 'failed'
+        checkpoint['error'] = str(e) or type(e).__name__
+        _save_checkpoint(checkpoint)
+
+    return checkpoint
+
+
+async def resume_backfills(service):
+    """Продолжает загрузки истории, прерванные перезапуском (вызывается из lifespan)"""
+    for channel in get_unfinished_backfills():
+        logger.info(f"Resuming backfill of {channel}")
+        try:
+            await backfill_channel(service, channel)
+        except Exception as e:
+            logger.error(f"Error resuming backfill of {channel}: {e}")
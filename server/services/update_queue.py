@@ -0,0 +1,135 @@
+# server/services/update_queue.py
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from server.config import UPDATE_DEDUP_SIZE, UPDATE_QUEUE_MAXSIZE, UPDATE_QUEUE_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних задержек хранить для перцентилей в метриках
+LAG_WINDOW = 1000
+
+
+def _percentile(values: List[float], percent: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class UpdateQueue:
+    """
+    Очередь обновлений Telegram с пулом воркеров.
+    Webhook только кладет обновление в очередь и сразу отвечает; повторные доставки
+    одного update_id отбрасываются. Очередь ограничена: когда она заполнена, submit
+    возвращает False и webhook отвечает 503 - Telegram повторит доставку позже.
+    """
+
+    def __init__(self, handler: Callable[[Any], Awaitable[None]], workers: int = UPDATE_QUEUE_WORKERS,
+                 maxsize: int = UPDATE_QUEUE_MAXSIZE, dedup_size: int = UPDATE_DEDUP_SIZE):
+        self.handler = handler
+        self.workers = workers
+        self.maxsize = maxsize
+        self.dedup_size = dedup_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # update_id принятых обновлений (последние dedup_size)
+        self._seen: "OrderedDict[int, None]" = OrderedDict()
+
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        # Время от приема обновления до начала его обработки и время обработки, сек
+        self._lags: deque = deque(maxlen=LAG_WINDOW)
+        self._durations: deque = deque(maxlen=LAG_WINDOW)
+
+    def start(self):
+        """Запускает воркеры (из lifespan или лениво при первом обновлении)"""
+        if self._tasks:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker(number)) for number in range(self.workers)]
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """Дает воркерам дообработать очередь и останавливает их"""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Update queue not drained in {drain_timeout}s, dropping {self._queue.qsize()} updates")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, update_id: int, update: Any) -> bool:
+        """
+        Ставит обновление в очередь. True - обновление принято (или уже было принято раньше),
+        False - очередь заполнена, обновление нужно доставить повторно
+        """
+        self.start()
+        if update_id in self._seen:
+            self.duplicates += 1
+            return True
+        try:
+            self._queue.put_nowait((time.monotonic(), update))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+
+        self.accepted += 1
+        self._seen[update_id] = None
+        if len(self._seen) > self.dedup_size:
+            self._seen.popitem(last=False)
+        return True
+
+    async def _worker(self, number: int):
+        while True:
+            enqueued_at, update = await self._queue.get()
+            started = time.monotonic()
+            self._lags.append(started - enqueued_at)
+            try:
+                await self.handler(update)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Update worker {number}: ошибка обработки обновления: {e}")
+            finally:
+                self._durations.append(time.monotonic() - started)
+                self._queue.task_done()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Глубина очереди, счетчики и задержка обработки (lag) в миллисекундах"""
+        lags = list(self._lags)
+        durations = list(self._durations)
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            'depth': self._queue.qsize() if self._queue else 0,
+            'maxsize': self.maxsize,
+            'workers': len(self._tasks),
+            'accepted': self.accepted,
+            'duplicates': self.duplicates,
+            'rejected': self.rejected,
+            'processed': self.processed,
+            'failed': self.failed,
+            'lag_ms': {
+                'last': ms(lags[-1] if lags else None),
+                'p50': ms(_percentile(lags, 50)),
+                'p95': ms(_percentile(lags, 95)),
+                'max': ms(max(lags) if lags else None),
+            },
+            'processing_ms': {
+                'p50': ms(_percentile(durations, 50)),
+                'p95': ms(_percentile(durations, 95)),
+            },
+        }
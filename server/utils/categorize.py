@@ -1 +1,133 @@
+import re
+from typing import Dict, Iterable, List, Set
 
+# Ключевые слова для категоризации согласно ТЗ
+CATEGORY_KEYWORDS: Dict[str, List[str]] = {
+    'gifts': [
+        'подарок', 'подарки', 'бесплатно', 'халява', 'промокод', 'скидка',
+        'акция', 'розыгрыш', 'бонус', 'даром', 'гифт', 'gift', 'freebie',
+        'раздача', 'конкурс', 'приз', 'награда', 'cashback', 'кэшбек'
+    ],
+    'nft': [
+        'nft', 'нфт', 'токен', 'коллекция', 'мета', 'opensea', 'digital art',
+        'коллекционный', 'цифровое искусство', 'метавселенная', 'avatar',
+        'аватар', 'pfp', 'mint', 'минт', 'drop', 'дроп', 'rare', 'раритет'
+    ],
+    'crypto': [
+        'криптовалюта', 'биткоин', 'bitcoin', 'ethereum', 'блокчейн', 'деф',
+        'defi', 'торги', 'курс', 'btc', 'eth', 'usdt', 'binance', 'трейдинг',
+        'стейкинг', 'майнинг', 'altcoin', 'альткоин', 'pump', 'dump', 'hodl'
+    ],
+    'tech': [
+        'технологии', 'it', 'ит', 'программирование', 'разработка', 'стартап',
+        'инновации', 'ai', 'ии', 'machine learning', 'блокчейн', 'веб3',
+        'app', 'приложение', 'software', 'hardware', 'gadget', 'гаджет'
+    ],
+    'community': [
+        'сообщество', 'чат', 'общение', 'форум', 'дискуссия', 'мнение',
+        'обсуждение', 'новости', 'анонс', 'встреча', 'event', 'мероприятие'
+    ]
+}
+
+# При равенстве очков побеждает категория, стоящая раньше
+CATEGORY_PRIORITY = ['gifts', 'crypto', 'nft', 'tech', 'community']
+
+# Короткие ключевые слова ("it", "ai", "eth") должны быть целым словом,
+# иначе они находятся внутри любого текста ("сайт", "said", "ethernet").
+# Длинные совпадают и как начало слова ("токен" -> "токены")
+SHORT_KEYWORD_LENGTH = 3
+
+
+def _end_boundary(keyword: str) -> str:
+    return r'(?!\w)' if len(keyword) <= SHORT_KEYWORD_LENGTH else ''
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    Сворачивает ключевые слова в префиксное дерево и записывает его как одно
+    регулярное выражение: общие префиксы проверяются один раз, а весь текст
+    проходится одним проходом матчера re (на C), без цикла по словам в Python.
+    """
+    keywords = list(keywords)
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = keyword
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return _end_boundary(node[''])
+
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' not in node:
+            return body
+        # Слово заканчивается здесь, но может продолжаться более длинным ключевым словом;
+        # более длинное пробуется первым
+        end = _end_boundary(node[''])
+        return f'(?:{body}|{end})' if end else f'(?:{body})?'
+
+    # Класс первых символов проверяется до lookbehind: большинство позиций текста
+    # отсеиваются одной проверкой множества символов
+    first_chars = ''.join(sorted({keyword[0] for keyword in keywords}))
+    return f'(?=[{re.escape(first_chars)}])' + r'(?<!\w)' + build(trie)
+
+
+class KeywordCategorizer:
+    """
+    Категоризатор по ключевым словам. Таблица компилируется один раз,
+    текст сканируется один раз для всех категорий сразу.
+    """
+
+    def __init__(self, keywords: Dict[str, List[str]], priority: List[str] = CATEGORY_PRIORITY):
+        self.priority = {category: position for position, category in enumerate(priority)}
+
+        # Одно ключевое слово может относиться к нескольким категориям ("блокчейн")
+        self.keyword_categories: Dict[str, List[str]] = {}
+        for category, category_keywords in keywords.items():
+            for keyword in category_keywords:
+                self.keyword_categories.setdefault(keyword.lower(), []).append(category)
+
+        self.pattern = re.compile(_trie_pattern(self.keyword_categories))
+
+        # Матчер возвращает самое длинное слово в позиции; более короткие ключевые слова,
+        # которые при этом тоже совпали ("мета" внутри "метавселенная"), добавляются заранее
+        self.implied: Dict[str, List[str]] = {
+            keyword: [
+                prefix for prefix in self.keyword_categories
+                if prefix != keyword and keyword.startswith(prefix)
+                and (len(prefix) > SHORT_KEYWORD_LENGTH or not re.match(r'\w', keyword[len(prefix)]))
+            ]
+            for keyword in self.keyword_categories
+        }
+
+    def find_keywords(self, text: str) -> Set[str]:
+        found = set(self.pattern.findall(text.lower()))
+        for keyword in list(found):
+            found.update(self.implied[keyword])
+        return found
+
+    def scores(self, text: str) -> Dict[str, int]:
+        """Количество разных ключевых слов каждой категории в тексте"""
+        category_scores: Dict[str, int] = {}
+        for keyword in self.find_keywords(text):
+            for category in self.keyword_categories[keyword]:
+                category_scores[category] = category_scores.get(category, 0) + 1
+        return category_scores
+
+    def categorize(self, text: str, default: str = 'general') -> str:
+        """Категория с наибольшим количеством совпадений, при равенстве - по приоритету"""
+        category_scores = self.scores(text)
+        if not category_scores:
+            return default
+        return min(category_scores, key=lambda category: (-category_scores[category], self.priority.get(category, len(self.priority))))
+
+
+categorizer = KeywordCategorizer(CATEGORY_KEYWORDS)
+
+
+def categorize(title: str, description: str = "") -> str:
+    """Автоматическая категоризация контента по ключевым словам"""
+    return categorizer.categorize(title + " " + description)
@@ -0,0 +1,52 @@
+import hashlib
+import re
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Параметры ссылок, которые не меняют сам материал
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'yclid')
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Текст для сравнения: нижний регистр, без пунктуации и лишних пробелов"""
+    if not text:
+        return ''
+    return _WHITESPACE_RE.sub(' ', _PUNCTUATION_RE.sub(' ', text.lower())).strip()
+
+
+def canonical_link(link: Optional[str]) -> str:
+    """Ссылка без фрагмента, трекинговых параметров и завершающего слэша"""
+    if not link:
+        return ''
+    parts = urlsplit(link.strip())
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    ])
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ''))
+
+
+def news_content_hash(source: Optional[str], link: Optional[str], text: Optional[str],
+                      message_id: Optional[str] = None) -> str:
+    """
+    Естественный ключ новости: sha256 от источника, id сообщения
+    (или канонической ссылки) и нормализованного текста.
+    """
+    key = '\x1f'.join((source or '', message_id or canonical_link(link), normalize_text(text)))
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def post_content_hash(post: Dict[str, Any]) -> str:
+    """content_hash поста из парсеров; вычисляется один раз и сохраняется в посте"""
+    if not post.get('content_hash'):
+        post['content_hash'] = news_content_hash(
+            post.get('source'),
+            post.get('link'),
+            post.get('text') or post.get('title'),
+            post.get('message_id')
+        )
+    return post['content_hash']
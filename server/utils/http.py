@@ -0,0 +1,51 @@
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConditionalResponse:
+    status: int
+    content: Optional[bytes] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+
+async def fetch_conditional(
+        session: aiohttp.ClientSession,
+        url: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+) -> ConditionalResponse:
+    """
+    GET с If-None-Match / If-Modified-Since.
+    На 304 тело не скачивается; на 200 возвращает тело и новые валидаторы.
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+
+    async with session.get(url, headers=headers) as response:
+        if response.status != 200:
+            return ConditionalResponse(status=response.status)
+        return ConditionalResponse(
+            status=200,
+            content=await response.read(),
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified')
+        )
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
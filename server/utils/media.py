@@ -0,0 +1,35 @@
+import json
+from typing import Any, Dict, List, Optional
+
+# Поля канонического медиа-объекта (совпадают с server.models.MediaItem)
+MEDIA_FIELDS = ('type', 'url', 'thumbnail', 'width', 'height')
+
+
+def normalize_media(media: Any, image_url: Optional[str] = None, video_url: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Приводит медиа к каноническому виду - списку словарей с полями MEDIA_FIELDS.
+    Принимает JSON-строку, один объект или список. Если медиа нет,
+    собирает его из image_url / video_url.
+    """
+    if isinstance(media, str):
+        try:
+            media = json.loads(media)
+        except ValueError:
+            media = None
+
+    if isinstance(media, dict):
+        media = [media]
+
+    media_list = []
+    if isinstance(media, list):
+        for media_item in media:
+            if isinstance(media_item, dict) and media_item.get('type'):
+                media_list.append({field: media_item.get(field) for field in MEDIA_FIELDS})
+
+    if not media_list:
+        if image_url:
+            media_list = [{'type': 'photo', 'url': image_url, 'thumbnail': image_url, 'width': None, 'height': None}]
+        elif video_url:
+            media_list = [{'type': 'video', 'url': video_url, 'thumbnail': None, 'width': None, 'height': None}]
+
+    return media_list
@@ -0,0 +1,43 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(publish_date: datetime, item_id: int) -> str:
+    """Кодирует позицию (publish_date, id) в непрозрачный курсор"""
+    raw = f"{publish_date.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Декодирует курсор обратно в (publish_date, id).
+    Бросает ValueError, если курсор повреждён.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        date_part, id_part = raw.rsplit('|', 1)
+        return datetime.fromisoformat(date_part), int(id_part)
+    except Exception as e:
+        raise ValueError(f"Некорректный курсор: {cursor}") from e
+
+
+def encode_rank_cursor(score: float, item_id: int) -> str:
+    """Кодирует позицию в выдаче поиска (score, id) в непрозрачный курсор"""
+    raw = f"{score!r}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, int]:
+    """
+    Декодирует курсор поиска обратно в (score, id).
+    Бросает ValueError, если курсор повреждён.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        score_part, id_part = raw.rsplit('|', 1)
+        return float(score_part), int(id_part)
+    except Exception as e:
+        raise ValueError(f"Некорректный курсор: {cursor}") from e
@@ -0,0 +1,30 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Асинхронный token bucket: не больше rate операций в секунду в среднем,
+    с короткими всплесками до capacity
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1):
+        """Ждет, пока в корзине наберется tokens токенов, и забирает их"""
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
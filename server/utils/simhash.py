@@ -0,0 +1,126 @@
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from server.utils.dedup import normalize_text
+
+SIMHASH_BITS = 64
+# Максимальное расстояние Хэмминга, при котором новости считаются одной историей
+# (тексты короткие - заголовок и лид, поэтому порог выше классических 3 бит)
+MAX_DISTANCE = 7
+# 64 бита режутся на MAX_DISTANCE + 1 полос: если отличаются не больше MAX_DISTANCE бит,
+# хотя бы одна полоса совпадает целиком (принцип Дирихле)
+BANDS = MAX_DISTANCE + 1
+BAND_BITS = SIMHASH_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+# Заголовок весит больше лида: источники переписывают текст сильнее, чем заголовок
+TITLE_WEIGHT = 2
+LEAD_WORDS = 50
+# Грубый стемминг: слово обрезается до префикса, чтобы "продан"/"продали" совпадали
+STEM_LENGTH = 5
+MIN_WORD_LENGTH = 3
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), 'big')
+
+
+def _features(words: List[str]) -> Iterable[str]:
+    """Основы слов; короткие служебные слова ("a", "в", "от") пропускаются"""
+    return (word[:STEM_LENGTH] for word in words if len(word) >= MIN_WORD_LENGTH)
+
+
+def simhash(title: Optional[str], text: Optional[str] = None) -> int:
+    """64-битный SimHash по нормализованному заголовку и началу текста"""
+    weights = [0] * SIMHASH_BITS
+    weighted_features = [
+        (_features(normalize_text(title).split()), TITLE_WEIGHT),
+        (_features(normalize_text(text).split()[:LEAD_WORDS]), 1),
+    ]
+    for features, weight in weighted_features:
+        for feature in features:
+            feature_hash = _feature_hash(feature)
+            for bit in range(SIMHASH_BITS):
+                weights[bit] += weight if feature_hash >> bit & 1 else -weight
+
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+
+def hamming_distance(first: int, second: int) -> int:
+    return bin(first ^ second).count('1')
+
+
+def to_signed(value: int) -> int:
+    """Беззнаковый SimHash -> BIGINT (знаковый 64-битный столбец)"""
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def from_signed(value: int) -> int:
+    """BIGINT из базы -> беззнаковый SimHash"""
+    return value + (1 << SIMHASH_BITS) if value < 0 else value
+
+
+def _bands(value: int) -> Iterable[Tuple[int, int]]:
+    return ((band, value >> (band * BAND_BITS) & BAND_MASK) for band in range(BANDS))
+
+
+class SimHashIndex:
+    """
+    LSH-индекс SimHash отпечатков недавних новостей.
+    Кандидаты ищутся по совпадающим полосам, а не попарным сравнением;
+    старые записи вытесняются, когда индекс превышает max_items.
+    Совпадения из того же источника не учитываются: шаблонные посты одного канала
+    (ежедневные обзоры, сводки объемов) отличаются лишь цифрами, но это разные новости.
+    """
+
+    def __init__(self, max_items: int = 5000):
+        self.max_items = max_items
+        # item_id -> (отпечаток, id первой новости истории, id источника)
+        self._items: "OrderedDict[int, Tuple[int, int, Optional[int]]]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, int], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def find(self, fingerprint: int, source_id: Optional[int] = None) -> Optional[int]:
+        """id первой новости ближайшей истории из другого источника или None"""
+        if not fingerprint:  # пустой текст - сравнивать не с чем
+            return None
+        best_root, best_distance = None, MAX_DISTANCE + 1
+        for band in _bands(fingerprint):
+            for item_id in self._buckets.get(band, ()):
+                candidate, root_id, candidate_source = self._items[item_id]
+                if source_id is not None and source_id in (candidate_source, self._source_of(root_id)):
+                    continue
+                distance = hamming_distance(fingerprint, candidate)
+                if distance < best_distance:
+                    best_root, best_distance = root_id, distance
+        return best_root
+
+    def add(self, item_id: int, fingerprint: int, root_id: Optional[int] = None, source_id: Optional[int] = None):
+        if not fingerprint or item_id in self._items:
+            return
+        self._items[item_id] = (fingerprint, item_id if root_id is None else root_id, source_id)
+        for band in _bands(fingerprint):
+            self._buckets.setdefault(band, []).append(item_id)
+        while len(self._items) > self.max_items:
+            self._evict()
+
+    def _source_of(self, item_id: int) -> Optional[int]:
+        """Источник новости, если она еще в индексе (первая новость истории могла быть вытеснена)"""
+        entry = self._items.get(item_id)
+        return entry[2] if entry else None
+
+    def clear(self):
+        self._items.clear()
+        self._buckets.clear()
+
+    def _evict(self):
+        item_id, (fingerprint, _, _) = self._items.popitem(last=False)
+        for band in _bands(fingerprint):
+            bucket = self._buckets.get(band)
+            if bucket:
+                bucket.remove(item_id)
+                if not bucket:
+                    del self._buckets[band]